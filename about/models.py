@@ -9,6 +9,7 @@ from wagtail.fields import RichTextField
 from rest_framework.fields import Field
 
 from streams import customblocks
+from core.renditions import get_rendition_attrs
 
 
 class StaffMembersFieldSerializer(Field):
@@ -23,8 +24,8 @@ class StaffMembersFieldSerializer(Field):
             "image": {
                 "id": image.id,
                 "title": image.title,
-                "original": image.get_rendition("original").attrs_dict,
-                "thumbnail": image.get_rendition("fill-450x450").attrs_dict,
+                "original": get_rendition_attrs(image, "original", self.context),
+                "thumbnail": get_rendition_attrs(image, "fill-450x450", self.context),
             },
         }
 
@@ -1,6 +1,8 @@
 from wagtail.api.v2.views import PagesAPIViewSet
 from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
 from django.http import Http404
+from django.utils.decorators import method_decorator
 from wagtail.api.v2.router import WagtailAPIRouter
 from wagtail.images.api.v2.views import ImagesAPIViewSet
 from wagtail.documents.api.v2.views import DocumentsAPIViewSet
@@ -9,7 +11,33 @@ from wagtail.documents.api.v2.views import DocumentsAPIViewSet
 from wagtail_headless_preview.models import PagePreview
 from rest_framework.response import Response
 
-api_router = WagtailAPIRouter("wagtailapi")
+from core.api_cache import (
+    get_api_cache_timeout,
+    get_cache_versions,
+    get_page_cache_key,
+    versioned_condition,
+)
+from core.api_relations import (
+    apply_api_relations,
+    get_requested_field_names,
+    prefetch_api_relations,
+)
+from core.async_views import pooled_view
+from core.dependencies import ensure_page_dependencies
+from core.query_budget import InstrumentedPageSerializer, record_page
+from core.renditions import prefetch_page_renditions
+from products.pricing import get_pricing_engine
+
+
+class PooledAPIRouter(WagtailAPIRouter):
+    """Router serving its endpoints as async views, which under ASGI run the viewsets
+    in the API thread pool, see core.async_views"""
+
+    def wrap_view(self, func):
+        return pooled_view(super().wrap_view(func))
+
+
+api_router = PooledAPIRouter("wagtailapi")
 
 
 class PagePreviewAPIViewSet(PagesAPIViewSet):
@@ -42,16 +70,62 @@ class PagePreviewAPIViewSet(PagesAPIViewSet):
         return page
 
 
+def get_page_versions(request, pk):
+    # Drafts have no validators
+    if not request.GET.get("draft"):
+        return get_cache_versions(pk)
+
+
 class DraftPagesAPIViewSet(PagesAPIViewSet):
+    base_serializer_class = InstrumentedPageSerializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "listing_view":
+            # Listings only show a few fields by default, so only load the relations
+            # of the fields asked for
+            queryset = apply_api_relations(
+                queryset, get_requested_field_names(self.request)
+            )
+        return queryset
+
+    @method_decorator(versioned_condition(get_page_versions))
     def detail_view(self, request, pk):
+        # Drafts are never cached
+        draft = request.GET.get("draft")
+        timeout = get_api_cache_timeout()
+        cache_key = None
+        if timeout and not draft:
+            # Get the key first so a publish during serialization is not cached as new
+            cache_key = get_page_cache_key(request, pk)
+            data = cache.get(cache_key)
+            if data is not None:
+                return Response(data)
+
         instance = self.get_object()
 
-        if request.GET.get("draft"):
+        if draft:
             instance = instance.get_latest_revision_as_object()
         elif not instance.live:
             raise Http404
+        else:
+            # Drafts keep their orderables in the revision rather than the database
+            prefetch_api_relations(instance)
+
+        record_page(instance)
+
+        if hasattr(instance, "get_priced_product_service_ids"):
+            # Price all plans on the page in one go at a single point in time
+            get_pricing_engine({"request": request}).prime(
+                instance.get_priced_product_service_ids()
+            )
+
+        prefetch_page_renditions(instance, request)
 
         serializer = self.get_serializer(instance)
+        if cache_key:
+            ensure_page_dependencies(instance)
+            cache.set(cache_key, serializer.data, timeout)
         return Response(serializer.data)
 
 
@@ -127,6 +127,7 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "wagtail.contrib.redirects.middleware.RedirectMiddleware",
+    "core.query_budget.QueryBudgetMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -209,6 +210,9 @@ STATIC_URL = "/static/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 MEDIA_URL = "/media/"
 
+# Where the prebake_api command exports the page API to
+PREBAKE_ROOT = os.getenv("PREBAKE_ROOT", os.path.join(BASE_DIR, "prebake"))
+
 
 # Wagtail settings
 
@@ -228,11 +232,24 @@ WAGTAIL_HEADLESS_PREVIEW = {
 
 # Search
 # https://docs.wagtail.org/en/stable/topics/search/backends.html
+# On PostgreSQL this indexes into a tsvector column with a GIN index. Japanese text is
+# also indexed as character pairs, see search.tokenize, so run reindex_search after
+# changing a page model's search_fields. Saved pages are queued and indexed by the
+# index_search command rather than during the request, see search.queue. The
+# Dockerfile runs it with --loop next to the server. Without that worker the index is
+# not updated, so set SEARCH_INDEX_QUEUE=0 to index inline instead
+SEARCH_INDEX_QUEUE = os.getenv("SEARCH_INDEX_QUEUE", "1") == "1"
 WAGTAILSEARCH_BACKENDS = {
     "default": {
         "BACKEND": "wagtail.search.backends.database",
+        "AUTO_UPDATE": not SEARCH_INDEX_QUEUE,
     }
 }
+# Search hits are counted in memory and saved to the search promotions daily hits
+# every SEARCH_HITS_FLUSH_INTERVAL seconds, or sooner once SEARCH_HITS_MAX_PENDING
+# queries are counted, see search.hits
+SEARCH_HITS_FLUSH_INTERVAL = int(os.getenv("SEARCH_HITS_FLUSH_INTERVAL", 60))
+SEARCH_HITS_MAX_PENDING = int(os.getenv("SEARCH_HITS_MAX_PENDING", 1000))
 
 # Auth Validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -269,6 +286,12 @@ REST_FRAMEWORK = {
         "dj_rest_auth.jwt_auth.JWTCookieAuthentication",
     ),
     "TEST_REQUEST_DEFAULT_FORMAT": "json",
+    # Token bucket sizes and refill periods of core.throttles, eg. 10/hour allows a
+    # burst of 10 then one request every 6 minutes
+    "DEFAULT_THROTTLE_RATES": {
+        "contact_ip": os.getenv("CONTACT_IP_RATE", "10/hour"),
+        "contact_email": os.getenv("CONTACT_EMAIL_RATE", "5/hour"),
+    },
 }
 # AllAuth Settings
 SITE_ID = 1
@@ -309,6 +332,59 @@ SIMPLE_JWT = {
 WAGTAILADMIN_BASE_URL = "https://front-school-app-nine.vercel.app"
 WAGTAILAPI_LIMIT_MAX = 30
 
+# Caches
+# Local memory by default. Local memory is per process, so with several workers set
+# CACHE_BACKEND to the file based cache and CACHE_LOCATION to a shared directory so
+# that cache invalidation reaches every worker
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+SHARED_CACHE = not CACHES["default"]["BACKEND"].endswith(("LocMemCache", "DummyCache"))
+# The banned email Bloom filter, see contacts.bloom, answers most banned email checks
+# without a query. It is rebuilt every EMAIL_FILTER_MAX_AGE seconds to catch writes
+# that skip signals, and by then at the latest sees emails banned by other processes,
+# at once with a shared cache
+EMAIL_FILTER_ENABLED = os.getenv("EMAIL_FILTER_ENABLED", "1") == "1"
+EMAIL_FILTER_MAX_AGE = int(os.getenv("EMAIL_FILTER_MAX_AGE", 5 * 60))
+# The contact form spam classifier, see contacts.spam, is trained by the
+# train_spam_model command and shared through the cache. Run it from cron with a
+# shared cache. Otherwise each process trains it in a background thread whenever it
+# is over SPAM_MODEL_MAX_AGE seconds old
+SPAM_MODEL_MAX_AGE = int(os.getenv("SPAM_MODEL_MAX_AGE", 60 * 60))
+SPAM_MODEL_TRAIN_IN_PROCESS = (
+    os.getenv("SPAM_MODEL_TRAIN_IN_PROCESS", str(int(not SHARED_CACHE))) == "1"
+)
+# Seconds a page API detail response is cached for. 0 disables the cache
+API_CACHE_TIMEOUT = int(os.getenv("API_CACHE_TIMEOUT", 60 * 60))
+# Log the query count, duplicate SQL and time of every API request as JSON, with a
+# breakdown per API field. API_QUERY_REPORT also appends them to a JSON lines file
+API_QUERY_LOGGING = os.getenv("API_QUERY_LOGGING", "") == "1"
+API_QUERY_REPORT = os.getenv("API_QUERY_REPORT")
+
+# Threads for sync code called by async API views under ASGI, see core.async_views
+API_SYNC_THREADS = int(os.getenv("API_SYNC_THREADS", 8))
+
+# Connection pool used by the core.backends.postgresql_pool database ENGINE, per
+# process and database. Give it at least API_SYNC_THREADS + 1 connections, and leave
+# CONN_MAX_AGE at 0 so connections go back to the pool after each request. A
+# DATABASES entry can override these with a "POOL" dict
+DB_POOL = {
+    "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+    # Seconds before a connection is closed and replaced
+    "MAX_AGE": int(os.getenv("DB_POOL_MAX_AGE", 30 * 60)),
+    # Seconds to wait for a free connection before raising OperationalError
+    "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+    # Connections idle for longer are checked with SELECT 1 before reuse
+    "HEALTH_CHECK_AFTER": float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", 30)),
+    # Waits for a connection over this many seconds are logged
+    "SLOW_WAIT": float(os.getenv("DB_POOL_SLOW_WAIT", 0.1)),
+}
+
 # auto field for id settings
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
@@ -39,6 +39,7 @@ urlpatterns = urlpatterns + [
     path(f"{v2}/users/", include("users.urls")),
     path(f"{v2}/contact/", include("contacts.urls")),
     path(f"{v2}/lesson-categories/", include("lessons.urls")),
+    path(f"{v2}/search/", include("search.urls")),
     path(f"{v2}/auth/", include("dj_rest_auth.urls")),
     path(f"{v2}/auth/registration/", include("dj_rest_auth.registration.urls")),
     path(f"{v2}/", api_router.urls),
@@ -10,6 +10,14 @@ from telnumbers.admin import TelNumberInline
 class ContactEmailInlineFormSet(BaseInlineFormSet):
     count = 0
 
+    def save_existing_objects(self, commit=True):
+        # Save the unset primary email before the new one, as only one may be primary
+        initial_count = self.initial_form_count()
+        self.forms[:initial_count] = sorted(
+            self.forms[:initial_count], key=lambda form: form.instance.is_primary
+        )
+        return super().save_existing_objects(commit)
+
     def validate_unique(self) -> None:
         super().validate_unique()
         count = 0
@@ -0,0 +1,170 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+
+
+def normalize_email(email):
+    return (email or "").strip().lower()
+
+
+class BloomFilter:
+    """Set of strings that can answer "definitely not in the set" from memory. A string
+    reported as present may not be, with probability around error_rate once capacity
+    strings are added"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, value):
+        # Double hashing, deriving all positions from two 64 bit halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+
+# Emails added since a process's filter was built that it fetches from the cache before
+# rebuilding instead
+MAX_FETCHED_ADDITIONS = 1000
+
+
+class EmailFilter:
+    """
+    Bloom filter of a model's normalized email column, built in each
+    process and rebuilt every EMAIL_FILTER_MAX_AGE seconds.
+
+    Emails added by any process are appended to a log in the cache, see
+    added, and other processes add them to their filters on their next
+    lookup, so a flood of additions never rebuilds the filter. Changes
+    and deletions move a version in the cache, which rebuilds it. Writes
+    that skip signals, eg. queryset.update, are only seen once the filter
+    is EMAIL_FILTER_MAX_AGE seconds old, so a "no" may be stale: only use
+    it for read only checks.
+
+    Without a shared cache other processes' changes are only seen on
+    rebuild. Set EMAIL_FILTER_ENABLED=0 to always answer maybe.
+    """
+
+    def __init__(self, model_label, field, error_rate=0.01, clock=time.monotonic):
+        self.model_label = model_label
+        self.field = field
+        self.error_rate = error_rate
+        self.clock = clock
+        self.version_key = f"contacts:email-filter:{model_label.lower()}"
+        self.added_key = f"{self.version_key}:added"
+        self.filter = None
+        self.version = None
+        self.added_count = 0
+        self.built_at = None
+        self._lock = threading.Lock()
+
+    def get_state(self):
+        """The rebuild version and the number of emails added to the log"""
+        state = cache.get_many([self.version_key, self.added_key])
+        if self.version_key not in state:
+            cache.add(self.version_key, time.time_ns(), None)
+            state[self.version_key] = cache.get(self.version_key)
+        return state[self.version_key], state.get(self.added_key, 0)
+
+    def build(self):
+        model = apps.get_model(self.model_label)
+        emails = [
+            normalize_email(email)
+            for email in model._default_manager.values_list(self.field, flat=True)
+        ]
+        # Room to grow before the error rate rises
+        bloom = BloomFilter(len(emails) * 2 + 1000, self.error_rate)
+        for email in emails:
+            bloom.add(email)
+        return bloom
+
+    def is_stale(self, version):
+        return (
+            self.filter is None
+            or self.version != version
+            or self.clock() - self.built_at >= settings.EMAIL_FILTER_MAX_AGE
+        )
+
+    def fetch_added(self, added_count):
+        """Add the emails logged since the filter was built or last fetched. False if
+        they are too many or have expired from the cache, when the filter is rebuilt"""
+        if added_count - self.added_count > MAX_FETCHED_ADDITIONS:
+            return False
+        keys = [
+            f"{self.added_key}:{n}"
+            for n in range(self.added_count + 1, added_count + 1)
+        ]
+        emails = cache.get_many(keys)
+        if len(emails) < len(keys):
+            return False
+        for email in emails.values():
+            self.filter.add(email)
+        self.added_count = added_count
+        return True
+
+    def might_contain(self, email):
+        """False if no row had email when the filter was built or last changed, so the
+        database need not be asked"""
+        if not settings.EMAIL_FILTER_ENABLED:
+            return True
+        version, added_count = self.get_state()
+        with self._lock:
+            if self.is_stale(version) or (
+                added_count > self.added_count and not self.fetch_added(added_count)
+            ):
+                # The log position is read before the table, so emails added while
+                # building are fetched next time
+                self.filter = self.build()
+                self.version = version
+                self.added_count = added_count
+                self.built_at = self.clock()
+            return normalize_email(email) in self.filter
+
+    def add(self, email):
+        """Add email to this process's filter as soon as it is saved, so that lookups
+        later in the same transaction find it"""
+        with self._lock:
+            if self.filter is not None:
+                self.filter.add(normalize_email(email))
+
+    def added(self, email):
+        """Log a committed email in the cache for other processes to add to their
+        filters. Entries outlive any filter built before them"""
+        cache.add(self.added_key, 0, None)
+        try:
+            count = cache.incr(self.added_key)
+        except ValueError:
+            return self.changed()
+        cache.set(
+            f"{self.added_key}:{count}",
+            normalize_email(email),
+            settings.EMAIL_FILTER_MAX_AGE * 2,
+        )
+
+    def changed(self):
+        """Record an email changed or removed, so every process rebuilds"""
+        try:
+            cache.incr(self.version_key)
+        except ValueError:
+            cache.set(self.version_key, time.time_ns(), None)
+
+
+banned_email_filter = EmailFilter("contacts.BannedEmail", "email_lower")
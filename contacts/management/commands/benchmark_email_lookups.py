@@ -0,0 +1,92 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from contacts.models import Contact, ContactEmail
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare contact email lookups by email__iexact against email__lower, which "
+        'can use the Lower("email") unique index, on a synthetic table of --rows '
+        "emails. Everything is inserted in a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=1_000_000,
+            help="Synthetic contact emails to insert. Default 1000000",
+        )
+        parser.add_argument(
+            "--lookups",
+            type=int,
+            default=200,
+            help="Lookups timed for each query. Default 200",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+
+    def insert_rows(self, rows):
+        contact = Contact.objects.create(name="Benchmark")
+        batch_size = 10000
+        for start in range(0, rows, batch_size):
+            ContactEmail.objects.bulk_create(
+                [
+                    ContactEmail(contact=contact, email=f"User{i}@Example{i % 97}.com")
+                    for i in range(start, min(start + batch_size, rows))
+                ],
+                batch_size=batch_size,
+            )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {ContactEmail._meta.db_table}")
+
+    def explain(self, queryset):
+        return queryset.explain().splitlines()[0]
+
+    def time_lookups(self, label, lookup, emails):
+        start = time.perf_counter()
+        for email in emails:
+            lookup(email).exists()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            f"{label:<8} {elapsed / len(emails) * 1000:.3f} ms/lookup  "
+            f"plan: {self.explain(lookup(emails[0]))}"
+        )
+
+    def handle(self, *args, **options):
+        rows = options["rows"]
+        rng = random.Random(options["seed"])
+        emails = [
+            f"user{i}@example{i % 97}.com"
+            for i in (rng.randrange(rows) for _ in range(options["lookups"]))
+        ]
+        try:
+            with transaction.atomic():
+                start = time.perf_counter()
+                self.insert_rows(rows)
+                self.stdout.write(
+                    f"Inserted {rows} email(s) in {time.perf_counter() - start:.1f} s"
+                )
+                self.time_lookups(
+                    "iexact",
+                    lambda email: ContactEmail.objects.filter(email__iexact=email),
+                    emails,
+                )
+                self.time_lookups(
+                    "lower",
+                    lambda email: ContactEmail.objects.filter(
+                        email__lower=email.lower()
+                    ),
+                    emails,
+                )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from contacts.spam import train_classifier
+
+
+class Command(BaseCommand):
+    help = (
+        "Train the contact form spam classifier on banned emails and contact notes, "
+        "and store it in the cache for the web processes to load. Run from cron."
+    )
+
+    def handle(self, *args, **options):
+        classifier = train_classifier()
+        naive_bayes = next(
+            scorer for scorer in classifier.scorers if scorer.name == "naive_bayes"
+        )
+        self.stdout.write(
+            f"Trained on {naive_bayes.spam_total} spam and {naive_bayes.ham_total} "
+            "genuine message(s)"
+        )
@@ -0,0 +1,33 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:35
+
+from django.db import migrations, models
+
+
+def set_email_lower(apps, schema_editor):
+    BannedEmail = apps.get_model("contacts", "BannedEmail")
+    banned = list(BannedEmail.objects.only("email"))
+    for banned_email in banned:
+        banned_email.email_lower = banned_email.email.strip().lower()
+    BannedEmail.objects.bulk_update(banned, ["email_lower"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contacts", "0032_bannedemail_message"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="bannedemail",
+            name="email_lower",
+            field=models.CharField(
+                db_index=True,
+                default="",
+                editable=False,
+                help_text="Email stripped and lowercased on save, for indexed lookups",
+                max_length=150,
+                verbose_name="lowercase email address",
+            ),
+        ),
+        migrations.RunPython(set_email_lower, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:40
+
+from django.db import migrations, models
+import django.db.models.functions.text
+from django.db.models.functions import Lower
+
+
+def merge_case_duplicates(apps, schema_editor):
+    # Emails differing only in case would break the constraint. Those of one contact
+    # are merged, keeping the primary or else the oldest. Those shared by several
+    # contacts are reported, as merging the contacts needs a person to decide
+    ContactEmail = apps.get_model("contacts", "ContactEmail")
+    groups = {}
+    for email in ContactEmail.objects.annotate(email_lower=Lower("email")).order_by(
+        "-is_primary", "created", "pk"
+    ):
+        groups.setdefault(email.email_lower, []).append(email)
+    extra = []
+    shared = []
+    for email_lower, emails in groups.items():
+        if len({email.contact_id for email in emails}) > 1:
+            shared.extend(f"{e.email} (contact {e.contact_id})" for e in emails)
+        else:
+            extra.extend(email.pk for email in emails[1:])
+    if shared:
+        raise RuntimeError(
+            "Contacts share emails differing only in case. Merge these contacts or "
+            "change their emails, then migrate again:\n" + "\n".join(shared)
+        )
+    ContactEmail.objects.filter(pk__in=extra).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contacts", "0033_bannedemail_email_lower"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="contactemail",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="contacts_contactemail_email_lower_unique",
+            ),
+        ),
+    ]
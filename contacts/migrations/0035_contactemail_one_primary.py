@@ -0,0 +1,35 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:43
+
+from django.db import migrations, models
+
+
+def keep_one_primary(apps, schema_editor):
+    # Keep the most recently modified primary email of contacts with several
+    ContactEmail = apps.get_model("contacts", "ContactEmail")
+    seen = set()
+    extra = []
+    for email in ContactEmail.objects.filter(is_primary=True).order_by(
+        "contact_id", "-modified"
+    ):
+        if email.contact_id in seen:
+            extra.append(email.pk)
+        seen.add(email.contact_id)
+    ContactEmail.objects.filter(pk__in=extra).update(is_primary=False)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contacts", "0034_email_lower_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(keep_one_primary, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="contactemail",
+            constraint=models.UniqueConstraint(
+                condition=models.Q(("is_primary", True)),
+                fields=("contact",),
+                name="contacts_contactemail_one_primary",
+            ),
+        ),
+    ]
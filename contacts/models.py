@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -10,6 +12,7 @@ from wagtail.api import APIField
 from wagtail.fields import RichTextField
 
 from core.models import TimeStampedModel
+from .bloom import normalize_email
 from users.models import CustomUser
 from streams import customblocks
 
@@ -347,15 +350,19 @@ def create_or_update_contact(sender, instance, created, **kwargs):
     relate contact with same email address to new user. In case of update of user,
     check to see if mail is same as primary email of contact, if not update it to match
     """
-    qs = ContactEmail.objects.filter(email__iexact=instance.email)
+    connected_email = (
+        ContactEmail.objects.filter(email__lower=instance.email.lower())
+        .select_related("contact")
+        .first()
+    )
     if created:
         # new user so find if there is a contact entry
         # with the same email address. If so
         # connect them, and if not create a new contact
         # with an email registered as primary contact email
-        if qs.exists():
+        if connected_email:
             # contact with that email exists so conect them
-            contact = qs.first().contact
+            contact = connected_email.contact
             contact.user = instance
             contact.save()
         else:
@@ -366,30 +373,29 @@ def create_or_update_contact(sender, instance, created, **kwargs):
             email = ContactEmail(contact=contact, is_primary=True, email=instance.email)
             email.save()
     else:
-        # Updating a current user
-        if qs.exists():
-            connected_email = qs.first()
-            contact = connected_email.contact
-            # Set all this contacts mails is_primary to false
-            contact_emails = ContactEmail.objects.filter(contact=contact)
-            for email in contact_emails:
-                # set all connected emals to false first
-                email.is_primary = False
-                email.save()
-            # set this one to True
-            connected_email.is_primary = True
-            connected_email.save()
+        # Updating a current user. Move the contact's primary email to the user's
+        # email with one update for the old primary and one for the new, whatever the
+        # number of emails. The old one is cleared first as only one may be primary
+        if connected_email:
+            contact_id = connected_email.contact_id
         else:
             # No email found so this must be a new email for this user
-            # Set all other addresses for this user to be False
-            contact_emails = ContactEmail.objects.filter(contact=instance.contact)
-            for email in contact_emails:
-                email.is_primary = False
-                email.save()
-            new_primary_email = ContactEmail(
-                contact=instance.contact, is_primary=True, email=instance.email
+            contact_id = instance.contact.pk
+        with transaction.atomic():
+            old_primary = ContactEmail.objects.filter(
+                contact_id=contact_id, is_primary=True
             )
-            new_primary_email.save()
+            if connected_email:
+                old_primary = old_primary.exclude(pk=connected_email.pk)
+            old_primary.update(is_primary=False, modified=timezone.now())
+            if not connected_email:
+                ContactEmail.objects.create(
+                    contact_id=contact_id, is_primary=True, email=instance.email
+                )
+            elif not connected_email.is_primary:
+                ContactEmail.objects.filter(pk=connected_email.pk).update(
+                    is_primary=True, modified=timezone.now()
+                )
 
 
 class ContactEmail(TimeStampedModel):
@@ -414,6 +420,18 @@ class ContactEmail(TimeStampedModel):
         null=False,
     )
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                Lower("email"), name="contacts_contactemail_email_lower_unique"
+            ),
+            models.UniqueConstraint(
+                fields=["contact"],
+                condition=models.Q(is_primary=True),
+                name="contacts_contactemail_one_primary",
+            ),
+        ]
+
     def __str__(self):
         return self.email
 
@@ -474,6 +492,14 @@ class BannedEmail(TimeStampedModel):
         unique=True,
         help_text="Required. Is unique so can only be one row for this email address. Max 150",
     )
+    email_lower = models.CharField(
+        _("lowercase email address"),
+        max_length=150,
+        db_index=True,
+        editable=False,
+        default="",
+        help_text="Email stripped and lowercased on save, for indexed lookups",
+    )
     message = models.TextField(
         _("message"),
         null=False,
@@ -482,5 +508,9 @@ class BannedEmail(TimeStampedModel):
         help_text="Required. Email sent for post mail analysis, for safety sake",
     )
 
+    def save(self, *args, **kwargs):
+        self.email_lower = normalize_email(self.email)
+        super().save(*args, **kwargs)
+
     def __str__(self) -> str:
         return f"{self.name} <{self.email}>"
@@ -58,7 +58,8 @@ class ContactFormSerializer(serializers.ModelSerializer):
         contact_email = None
         for email in email_data:
             email_dict = dict(email)
-            email_dict["is_primary"] = True
+            # The first email is primary, as only one may be
+            email_dict["is_primary"] = contact_email is None
             contact_email = email_dict["email"]
             ContactEmail.objects.create(contact=contact, **email_dict)
         for note in note_data:
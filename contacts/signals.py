@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .bloom import banned_email_filter
+from .models import BannedEmail
+
+
+@receiver(post_save, sender=BannedEmail)
+def banned_email_saved(sender, instance, **kwargs):
+    """Add saved emails to the banned email filter. A changed email leaves its old value
+    in the filter, which only costs a database lookup"""
+    email = instance.email
+    banned_email_filter.add(email)
+    transaction.on_commit(lambda: banned_email_filter.added(email))
+
+
+@receiver(post_delete, sender=BannedEmail)
+def banned_email_deleted(sender, instance, **kwargs):
+    """Rebuild the banned email filter without deleted emails"""
+    transaction.on_commit(banned_email_filter.changed)
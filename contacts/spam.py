@@ -0,0 +1,282 @@
+import logging
+import math
+import pickle
+import re
+import string
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Cache keys of the trained classifier, stored with its version, and of the version
+MODEL_KEY = "contacts:spam-model"
+MODEL_VERSION_KEY = "contacts:spam-model-version"
+
+# Characters counted as ASCII by the character class scorer, deleted with str.translate
+# so that counting them needs no Python level loop
+ASCII_CHARS = string.ascii_letters + string.whitespace + string.punctuation
+_DELETE_ASCII = str.maketrans("", "", ASCII_CHARS)
+
+LINK_RE = re.compile(
+    r"(?:https?://|www\.)\S+|\b[\w-]+\.(?:com|net|org|info|biz|ru|xyz)\b"
+)
+# ASCII words, and runs of Japanese which are split into character bigrams as Japanese
+# has no spaces between words
+ASCII_WORD_RE = re.compile(r"[a-z0-9']{2,}")
+JAPANESE_RUN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uff66-\uff9f]+")
+
+
+def tokenize(text):
+    text = text.lower()
+    tokens = ASCII_WORD_RE.findall(text)
+    for run in JAPANESE_RUN_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        tokens += [run[i : i + 2] for i in range(len(run) - 1)]
+    return tokens
+
+
+def get_domain(email):
+    return email.rpartition("@")[2].lower()
+
+
+class Submission:
+    """A contact form submission being scored"""
+
+    def __init__(self, name, email, message):
+        self.name = name or ""
+        self.email = email or ""
+        self.message = message or ""
+
+
+class CharacterClassScorer:
+    """Scores messages that are mostly ASCII, as contact mails are expected in Japanese.
+    Positive above ascii_cutoff, so on its own it rejects the same messages as the old
+    ASCII percentage check"""
+
+    name = "character_class"
+
+    def __init__(self, ascii_cutoff=0.6, weight=10):
+        self.ascii_cutoff = ascii_cutoff
+        self.weight = weight
+
+    def score(self, submission):
+        message = submission.message
+        if not message:
+            return 0
+        ascii_count = len(message) - len(message.translate(_DELETE_ASCII))
+        return self.weight * (ascii_count / len(message) - self.ascii_cutoff)
+
+
+class LinkDensityScorer:
+    """Scores messages by links, counting up to max_links"""
+
+    name = "link_density"
+
+    def __init__(self, weight=1.5, max_links=4):
+        self.weight = weight
+        self.max_links = max_links
+
+    def score(self, submission):
+        links = len(LINK_RE.findall(submission.message))
+        return self.weight * min(links, self.max_links)
+
+
+class NaiveBayesScorer:
+    """Naive Bayes over the tokens in a message, trained on banned messages against
+    genuine contact notes. Scores the log odds of the message being spam, limited to
+    +-limit. Scores 0 until both corpora have messages"""
+
+    name = "naive_bayes"
+
+    def __init__(self, spam_messages=(), ham_messages=(), limit=8):
+        self.limit = limit
+        # Messages each token appears in
+        self.spam_counts = Counter()
+        self.ham_counts = Counter()
+        self.spam_total = self.ham_total = 0
+        for message in spam_messages:
+            self.spam_counts.update(set(tokenize(message)))
+            self.spam_total += 1
+        for message in ham_messages:
+            self.ham_counts.update(set(tokenize(message)))
+            self.ham_total += 1
+
+    def score(self, submission):
+        if not self.spam_total or not self.ham_total:
+            return 0
+        log_odds = 0
+        for token in set(tokenize(submission.message)):
+            spam_p = (self.spam_counts[token] + 1) / (self.spam_total + 2)
+            ham_p = (self.ham_counts[token] + 1) / (self.ham_total + 2)
+            log_odds += math.log(spam_p / ham_p)
+        return max(-self.limit, min(self.limit, log_odds))
+
+
+class DomainReputationScorer:
+    """Scores email domains by how many banned and genuine addresses use them, limited
+    to +-limit so that a domain alone never outweighs the message"""
+
+    name = "domain_reputation"
+
+    def __init__(self, spam_emails=(), ham_emails=(), limit=3):
+        self.limit = limit
+        self.spam_domains = Counter(get_domain(email) for email in spam_emails)
+        self.ham_domains = Counter(get_domain(email) for email in ham_emails)
+
+    def score(self, submission):
+        domain = get_domain(submission.email)
+        log_ratio = math.log(
+            (self.spam_domains[domain] + 1) / (self.ham_domains[domain] + 1)
+        )
+        return max(-self.limit, min(self.limit, log_ratio))
+
+
+class SpamVerdict:
+    def __init__(self, scores, threshold):
+        self.scores = scores
+        self.score = sum(scores.values())
+        self.is_spam = self.score > threshold
+
+    def __repr__(self):
+        return f"SpamVerdict(score={self.score:.2f}, is_spam={self.is_spam})"
+
+
+class SpamClassifier:
+    """Adds up the scores of its scorers. A total over threshold is spam"""
+
+    def __init__(self, scorers, threshold=0):
+        self.scorers = scorers
+        self.threshold = threshold
+
+    def classify(self, name, email, message):
+        submission = Submission(name, email, message)
+        return SpamVerdict(
+            {scorer.name: scorer.score(submission) for scorer in self.scorers},
+            self.threshold,
+        )
+
+
+def build_classifier(spam=(), ham=()):
+    """Classifier trained on (email, message) pairs of spam and genuine submissions"""
+    spam, ham = list(spam), list(ham)
+    return SpamClassifier(
+        [
+            CharacterClassScorer(),
+            LinkDensityScorer(),
+            NaiveBayesScorer(
+                [message for _, message in spam], [message for _, message in ham]
+            ),
+            DomainReputationScorer(
+                [email for email, _ in spam], [email for email, _ in ham]
+            ),
+        ],
+        threshold=getattr(settings, "SPAM_THRESHOLD", 0),
+    )
+
+
+def get_training_data():
+    """(email, message) pairs of banned submissions and of genuine contact notes"""
+    from .models import BannedEmail, Note
+
+    spam = BannedEmail.objects.values_list("email", "message")
+    ham = Note.objects.filter(contact__contact_emails__is_primary=True).values_list(
+        "contact__contact_emails__email", "note"
+    )
+    return spam, ham
+
+
+def train_classifier():
+    """Train a classifier on the database and store it in the cache, where every
+    process's get_classifier loads it from"""
+    classifier = build_classifier(*get_training_data())
+    version = time.time()
+    # The model is stored before its version so a process seeing a new version finds
+    # the model too
+    cache.set(MODEL_KEY, (version, pickle.dumps(classifier)), None)
+    cache.set(MODEL_VERSION_KEY, version, None)
+    return classifier
+
+
+class StoredClassifier:
+    """
+    The classifier last stored by train_classifier, eg. by the
+    train_spam_model command run from cron. Only its version is read from
+    the cache per request, and the model is loaded when that changes.
+
+    Nothing is trained while a request waits. If no classifier is stored,
+    or it is over SPAM_MODEL_MAX_AGE seconds old, and
+    SPAM_MODEL_TRAIN_IN_PROCESS is set, one is trained in a background
+    thread. Until then the last one is used, or an untrained one scoring
+    only character classes and links.
+    """
+
+    def __init__(self, background=True):
+        self.background = background
+        self.classifier = None
+        self.version = None
+        self.lock = threading.Lock()
+        self.training = False
+
+    def get(self):
+        version = cache.get(MODEL_VERSION_KEY)
+        if version is not None and version != self.version:
+            stored = cache.get(MODEL_KEY)
+            if stored is not None:
+                with self.lock:
+                    self.version, model = stored
+                    self.classifier = pickle.loads(model)
+        if settings.SPAM_MODEL_TRAIN_IN_PROCESS and (
+            version is None or time.time() - version > settings.SPAM_MODEL_MAX_AGE
+        ):
+            self.train()
+        with self.lock:
+            if self.classifier is None:
+                self.classifier = build_classifier()
+            return self.classifier
+
+    def train(self):
+        with self.lock:
+            if self.training:
+                return
+            self.training = True
+        if self.background:
+            threading.Thread(target=self.train_in_thread, daemon=True).start()
+        else:
+            self._train()
+
+    def _train(self):
+        try:
+            classifier = train_classifier()
+            with self.lock:
+                self.classifier = classifier
+        except Exception:
+            logger.exception("Failed to train the spam classifier")
+        finally:
+            with self.lock:
+                self.training = False
+
+    def train_in_thread(self):
+        try:
+            self._train()
+        finally:
+            close_old_connections()
+
+    def reset(self):
+        """Forget the loaded classifier, eg. between tests"""
+        with self.lock:
+            self.classifier = None
+            self.version = None
+
+
+spam_classifier = StoredClassifier()
+
+
+def get_classifier():
+    """The stored classifier, see StoredClassifier"""
+    return spam_classifier.get()
@@ -1,7 +1,11 @@
 import json
+from django.conf import settings
+from django.core.cache import cache
+from django.test import override_settings
 from rest_framework import status
 from rest_framework.test import APITestCase
-from contacts.models import Contact, ContactEmail, Note, NoteTypeChoices
+from contacts.models import BannedEmail, Contact, ContactEmail, Note, NoteTypeChoices
+from core.throttles import reset_buckets
 
 URL = "/api/v2/contact/form/"
 NAME = "Bob Jones"
@@ -20,7 +24,14 @@ DATA2 = {
 }
 
 
+# The spam classifier is not trained in a background thread, which would not see the
+# test transaction
+@override_settings(SPAM_MODEL_TRAIN_IN_PROCESS=False)
 class ContactFormTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_buckets()
+
     def test_create_contact(self):
         """
         Ensure we can create a new contact.
@@ -94,6 +105,17 @@ class ContactFormTests(APITestCase):
             json.dumps({"contact_notes": [{"note": ["This field may not be blank."]}]}),
         )
 
+    def test_spam_is_rejected_without_banning(self):
+        """
+        Ensure spam is rejected and logged for review, but not banned.
+        """
+        with self.assertLogs("contacts.views", "INFO") as logs:
+            response = self.client.post(URL, DATA)
+        self.assertEqual(response.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertIn(MSG, logs.output[0])
+        self.assertEqual(Contact.objects.count(), 0)
+        self.assertEqual(BannedEmail.objects.count(), 0)
+
     def test_ip_block(self):
         """
         Ensure if ip address not in safe ips, blocked and no contact created.
@@ -101,3 +123,36 @@ class ContactFormTests(APITestCase):
         response = self.client.post(URL, DATA, REMOTE_ADDR="10.82.6.98")
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
         self.assertEqual(Contact.objects.count(), 0)
+
+
+@override_settings(
+    REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK,
+        "DEFAULT_THROTTLE_RATES": {"contact_ip": "3/hour", "contact_email": "2/hour"},
+    },
+    SPAM_MODEL_TRAIN_IN_PROCESS=False,
+)
+class ContactFormThrottleTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        reset_buckets()
+
+    def post(self, email, ip="127.0.0.1"):
+        data = {**DATA, "contact_emails": [{"email": email}]}
+        return self.client.post(URL, data, HTTP_X_FORWARDED_FOR=f"1.1.1.1, {ip}")
+
+    def test_email_throttle(self):
+        for _ in range(2):
+            self.assertNotEqual(self.post(EMAIL).status_code, 429)
+        response = self.post(f" {EMAIL.upper()}", ip="127.0.0.2")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn("Retry-After", response.headers)
+
+    def test_ip_throttle_rejects_before_database_work(self):
+        for i in range(3):
+            self.assertNotEqual(self.post(f"{i}{EMAIL}").status_code, 429)
+        banned = BannedEmail.objects.count()
+        with self.assertNumQueries(0):
+            response = self.post(f"other{EMAIL}")
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(BannedEmail.objects.count(), banned)
@@ -0,0 +1,116 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, SimpleTestCase, override_settings
+
+from contacts.bloom import BloomFilter, EmailFilter, banned_email_filter
+from contacts.models import BannedEmail, Contact, ContactEmail
+
+
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(1000)
+        emails = [f"user{i}@example.com" for i in range(1000)]
+        for email in emails:
+            bloom.add(email)
+        self.assertTrue(all(email in bloom for email in emails))
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"user{i}@example.com")
+        false_positives = sum(f"other{i}@example.com" in bloom for i in range(10000))
+        self.assertLess(false_positives, 200)
+
+
+@override_settings(EMAIL_FILTER_ENABLED=True, EMAIL_FILTER_MAX_AGE=60)
+class EmailFilterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.now = 0
+        self.email_filter = EmailFilter(
+            "contacts.BannedEmail", "email_lower", clock=lambda: self.now
+        )
+
+    def test_unknown_email_needs_no_query(self):
+        BannedEmail.objects.create(name="Spam", email="Spam@Example.com")
+        banned_email_filter.might_contain("anyone@example.com")
+        with self.assertNumQueries(0):
+            self.assertFalse(banned_email_filter.might_contain("other@example.com"))
+        self.assertTrue(banned_email_filter.might_contain(" spam@example.COM"))
+        self.assertEqual(
+            BannedEmail.objects.get(email_lower="spam@example.com").email,
+            "Spam@Example.com",
+        )
+
+    def test_saved_email_is_found(self):
+        self.assertFalse(banned_email_filter.might_contain("spam@example.jp"))
+        BannedEmail.objects.create(name="Spam", email="Spam@example.jp")
+        self.assertTrue(banned_email_filter.might_contain("spam@example.jp"))
+
+    def test_other_process_change_rebuilds(self):
+        self.assertFalse(self.email_filter.might_contain("spam@example.jp"))
+        # As saved by another process, which adds to its own filter only
+        BannedEmail.objects.bulk_create(
+            [
+                BannedEmail(
+                    name="Spam", email="spam@example.jp", email_lower="spam@example.jp"
+                )
+            ]
+        )
+        self.email_filter.changed()
+        self.assertTrue(self.email_filter.might_contain("spam@example.jp"))
+
+    def test_other_process_additions_need_no_rebuild(self):
+        self.assertFalse(self.email_filter.might_contain("spam@example.jp"))
+        for i in range(3):
+            BannedEmail.objects.bulk_create(
+                [
+                    BannedEmail(
+                        name="Spam",
+                        email=f"spam{i}@example.jp",
+                        email_lower=f"spam{i}@example.jp",
+                    )
+                ]
+            )
+            self.email_filter.added(f"Spam{i}@example.jp")
+        with self.assertNumQueries(0):
+            self.assertTrue(self.email_filter.might_contain("spam2@example.jp"))
+            self.assertTrue(self.email_filter.might_contain("spam0@example.jp"))
+
+    def test_expired_additions_rebuild(self):
+        self.assertFalse(self.email_filter.might_contain("spam@example.jp"))
+        BannedEmail.objects.create(name="Spam", email="spam@example.jp")
+        self.email_filter.added("spam@example.jp")
+        cache.delete(f"{self.email_filter.added_key}:1")
+        self.assertTrue(self.email_filter.might_contain("spam@example.jp"))
+
+    def test_writes_skipping_signals_are_seen_after_max_age(self):
+        self.assertFalse(self.email_filter.might_contain("spam@example.jp"))
+        BannedEmail.objects.bulk_create(
+            [
+                BannedEmail(
+                    name="Spam", email="spam@example.jp", email_lower="spam@example.jp"
+                )
+            ]
+        )
+        self.assertFalse(self.email_filter.might_contain("spam@example.jp"))
+        self.now = 60
+        self.assertTrue(self.email_filter.might_contain("spam@example.jp"))
+
+    @override_settings(EMAIL_FILTER_ENABLED=False)
+    def test_disabled_filter_always_asks_the_database(self):
+        with self.assertNumQueries(0):
+            self.assertTrue(self.email_filter.might_contain("anyone@example.com"))
+
+
+class ContactEmailWriteTests(TestCase):
+    def test_user_save_finds_emails_saved_without_signals(self):
+        contact = Contact.objects.create()
+        ContactEmail.objects.bulk_create(
+            [ContactEmail(contact=contact, email="Taro@example.jp")]
+        )
+        user = get_user_model().objects.create_user(
+            email="taro@example.jp", password="password"
+        )
+        user.save()
+        self.assertEqual(user.contact, contact)
@@ -1,3 +1,4 @@
+from django.db import IntegrityError
 from django.test import TestCase
 
 from contacts.models import Contact, ContactEmail, Note
@@ -45,3 +46,27 @@ class ContactModelTests(TestCase):
         self.assertEqual(ContactEmail.objects.count(), 1)
         email = ContactEmail.objects.first()
         self.assertEqual(contact, email.contact)
+
+    def test_user_email_change_moves_primary_in_constant_queries(self):
+        user = User.objects.create_user(**USER1)
+        contact = user.contact
+        for i in range(20):
+            ContactEmail.objects.create(contact=contact, email=f"other{i}@user.com")
+        user.email = "other5@user.com"
+        with self.assertNumQueries(6):
+            # User update, email lookup, 2 updates and the savepoint around them
+            user.save()
+        primary = ContactEmail.objects.get(contact=contact, is_primary=True)
+        self.assertEqual(primary.email, "other5@user.com")
+
+        user.email = "new@user.com"
+        user.save()
+        primary = ContactEmail.objects.get(contact=contact, is_primary=True)
+        self.assertEqual(primary.email, "new@user.com")
+
+    def test_one_primary_email_per_contact(self):
+        user = User.objects.create_user(**USER1)
+        with self.assertRaises(IntegrityError):
+            ContactEmail.objects.create(
+                contact=user.contact, email=USER2["email"], is_primary=True
+            )
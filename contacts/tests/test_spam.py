@@ -0,0 +1,106 @@
+import json
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from contacts.models import BannedEmail
+from contacts.spam import (
+    CharacterClassScorer,
+    StoredClassifier,
+    Submission,
+    build_classifier,
+    tokenize,
+)
+
+JAPANESE = "体験レッスンを予約したいです。よろしくお願いします。"
+ENGLISH = "Hi, I was hoping for a trial lesson"
+SPAM = "Cheap SEO services, visit https://spam.example.com and www.spam.xyz now"
+
+
+class SpamClassifierTests(SimpleTestCase):
+    def test_character_class_matches_old_ascii_check(self):
+        scorer = CharacterClassScorer()
+        self.assertGreater(scorer.score(Submission("", "", ENGLISH)), 0)
+        self.assertLess(scorer.score(Submission("", "", JAPANESE)), 0)
+        self.assertEqual(scorer.score(Submission("", "", "")), 0)
+
+    def test_link_density(self):
+        verdict = build_classifier().classify("", "", SPAM)
+        self.assertEqual(verdict.scores["link_density"], 3)
+
+    def test_tokenize_splits_japanese_into_bigrams(self):
+        self.assertEqual(tokenize("Trial 体験"), ["trial", "体験"])
+        self.assertEqual(tokenize("予約する"), ["予約", "約す", "する"])
+
+    def test_untrained_classifier_rejects_english(self):
+        classifier = build_classifier()
+        self.assertTrue(classifier.classify("Bob", "bob@example.com", ENGLISH).is_spam)
+        self.assertFalse(
+            classifier.classify("Taro", "taro@example.jp", JAPANESE).is_spam
+        )
+
+    def test_trained_scores_learn_from_corpora(self):
+        classifier = build_classifier(
+            spam=[("junk@spam.example", SPAM)] * 5,
+            ham=[("taro@example.jp", JAPANESE)] * 5,
+        )
+        verdict = classifier.classify("", "other@spam.example", "SEO services")
+        self.assertGreater(verdict.scores["naive_bayes"], 0)
+        self.assertGreater(verdict.scores["domain_reputation"], 0)
+        verdict = classifier.classify("", "hanako@example.jp", JAPANESE)
+        self.assertLess(verdict.scores["naive_bayes"], 0)
+        self.assertFalse(verdict.is_spam)
+
+    def test_domain_reputation_is_limited(self):
+        classifier = build_classifier(spam=[("junk@spam.example", SPAM)] * 1000)
+        verdict = classifier.classify("Taro", "taro@spam.example", JAPANESE)
+        self.assertEqual(verdict.scores["domain_reputation"], 3)
+        self.assertFalse(verdict.is_spam)
+
+    def test_benchmark_command(self):
+        rows = [{"email": "junk@spam.example", "message": SPAM, "spam": True}] * 4
+        rows += [{"email": "taro@example.jp", "message": JAPANESE, "spam": False}] * 4
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl") as corpus:
+            corpus.write("\n".join(json.dumps(row) for row in rows))
+            corpus.flush()
+            out = StringIO()
+            call_command("benchmark_spam", corpus=corpus.name, stdout=out)
+        self.assertIn("legacy", out.getvalue())
+        self.assertIn("classifier   accuracy 1.000", out.getvalue())
+
+
+class StoredClassifierTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        BannedEmail.objects.create(name="Junk", email="junk@spam.example", message=SPAM)
+
+    def naive_bayes(self, classifier):
+        return next(s for s in classifier.scorers if s.name == "naive_bayes")
+
+    @override_settings(SPAM_MODEL_TRAIN_IN_PROCESS=False)
+    def test_untrained_until_stored(self):
+        stored = StoredClassifier(background=False)
+        with self.assertNumQueries(0):
+            classifier = stored.get()
+        self.assertEqual(self.naive_bayes(classifier).spam_total, 0)
+        out = StringIO()
+        call_command("train_spam_model", stdout=out)
+        self.assertIn("Trained on 1 spam", out.getvalue())
+        with self.assertNumQueries(0):
+            self.assertEqual(self.naive_bayes(stored.get()).spam_total, 1)
+
+    @override_settings(SPAM_MODEL_TRAIN_IN_PROCESS=True, SPAM_MODEL_MAX_AGE=60)
+    def test_trained_in_process_when_stale(self):
+        stored = StoredClassifier(background=False)
+        self.assertEqual(self.naive_bayes(stored.get()).spam_total, 1)
+        BannedEmail.objects.create(name="More", email="more@spam.example")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.naive_bayes(stored.get()).spam_total, 1)
+        with mock.patch("contacts.spam.time.time", return_value=time.time() + 61):
+            # Still the old model in the meantime with a background thread
+            self.assertEqual(self.naive_bayes(stored.get()).spam_total, 2)
@@ -1,10 +1,9 @@
 import html
+import logging
 import re
-import string
 
 from django.shortcuts import render
 from django.http import JsonResponse
-from django.core.mail import send_mail
 from rest_framework.permissions import AllowAny
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -12,12 +11,17 @@ from rest_framework import status
 from django.conf import settings
 
 from core.custom_permissions import SafeIPsPermission
+from core.outbox import enqueue_email
+from core.throttles import ContactEmailThrottle, ContactIPThrottle
+from .bloom import banned_email_filter, normalize_email
 from .models import Contact, ContactEmail, BannedEmail
 from .serializers import (
     ContactFormSerializer,
     ContactFormEmailSerializer,
-    BannedEmailSerializer,
 )
+from .spam import get_classifier
+
+logger = logging.getLogger(__name__)
 
 
 class ContactFormView(APIView):
@@ -28,22 +32,8 @@ class ContactFormView(APIView):
     """
 
     permission_classes = [AllowAny]
-
-    def ascii_percentage_analysis(self, s, per):
-        """Function to analyze if a string contains mostly ascii strings by percentage.
-        Will take the string to analyse and a percentage integer and return True if over
-        percentage and False if below.
-        """
-        # change string to set to get 0(1)
-        test_set = set(string.ascii_letters + string.whitespace + string.punctuation)
-        total_char = 0
-        total_ascii = 0
-        per = int(per)
-        for char in s:
-            total_char += 1
-            if char in test_set:
-                total_ascii += 1
-        return (total_ascii / total_char) * 100 > per
+    # Checked before any database work, so a flood is rejected cheaply
+    throttle_classes = [ContactIPThrottle, ContactEmailThrottle]
 
     def send_notification_email(self, email, validated_data):
         note = validated_data.get("contact_notes")[0].get("note")
@@ -75,16 +65,16 @@ class ContactFormView(APIView):
             "Thanks\n\n "
             "Xlingual Server"
         )
-        send_mail(
+        # Sent by the send_outbox command so the request does not wait on the mail server
+        enqueue_email(
             subject=subject,
             message=msg,
             from_email=from_who,
             recipient_list=to_who,
-            fail_silently=False,
         )
 
     def get_object(self, email):
-        qs = ContactEmail.objects.filter(email__iexact=email)
+        qs = ContactEmail.objects.filter(email__lower=email.lower())
         if qs.exists():
             contact_email = qs.first()
             contact = contact_email.contact
@@ -111,11 +101,15 @@ class ContactFormView(APIView):
         # 1. Check to see if email in banned emails, if yes return 422 to front
         # NOTE This code is valid while we consider that we are only getting contact mails in Japanese.
         # A new strategy will be needed when the emails are for Japanese lessons.
-        # 2. Check to see if email contains too much english. For now (2025.01) probably junk so.
-        #   2.1 If yes then save the details in banned emails along with mail for future junk analysis purposes.
-
-        if BannedEmail.objects.filter(email__iexact=email).exists():
+        # 2. Score the message with the spam classifier, see contacts.spam. Mostly
+        #   english messages are still the strongest signal (2025.01).
+        #   2.1 If spam then log it for review. Rejections are not banned automatically, as
+        #   banned emails are the classifier's training data and its mistakes would be
+        #   learned. Ban them from the admin once reviewed.
 
+        if banned_email_filter.might_contain(email) and (
+            BannedEmail.objects.filter(email_lower=normalize_email(email)).exists()
+        ):
             return Response(
                 {"message": "banned email"},
                 status=status.HTTP_422_UNPROCESSABLE_ENTITY,
@@ -129,19 +123,18 @@ class ContactFormView(APIView):
             )
         else:
             message_dict = notes[0]
-            if self.ascii_percentage_analysis(message_dict["note"], 60):
-                name = request.data.get("name")
-                data = {"name": name, "email": email, "message": message_dict["note"]}
-                banned_email_serializer = BannedEmailSerializer(data=data)
-                if banned_email_serializer.is_valid():
-                    banned_email_serializer.save()
-                # In both is_valid() and not valid case use, 422
+            name = request.data.get("name") or ""
+            message = message_dict.get("note") or ""
+            verdict = get_classifier().classify(name, email, message)
+            if verdict.is_spam:
+                logger.info(
+                    f"Rejected contact form from {name} <{email}>: {verdict.scores}\n"
+                    f"{message}"
+                )
                 return Response(
                     {"message": "banned email"},
                     status=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 )
-            else:
-                pass
         # Now get the contact if any, associated with this mail
         contact = self.get_object(email)
 
@@ -150,7 +143,6 @@ class ContactFormView(APIView):
             serializer = ContactFormSerializer(data=request.data)
             if serializer.is_valid():
                 serializer.save()
-                # NOTE send alert email here with Celery if needed
                 self.send_notification_email(email, serializer.validated_data)
                 return Response({"details": "ok"}, status=status.HTTP_201_CREATED)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -164,7 +156,6 @@ class ContactFormView(APIView):
             serializer = ContactFormSerializer(instance=contact, data=request.data)
             if serializer.is_valid():
                 serializer.save()
-                # NOTE send alert email here with Celery if needed
                 self.send_notification_email(email, serializer.validated_data)
                 return Response({"details": "ok"}, status=status.HTTP_200_OK)
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
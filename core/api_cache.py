@@ -0,0 +1,172 @@
+import hashlib
+import time
+from calendar import timegm
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date, urlencode
+from django.views.decorators.http import condition
+
+from .async_views import run_sync
+
+VERSION_KEY = "api:pages:version"
+
+# Models embedded in page API responses by custom serializers. Saving or deleting one of
+# them invalidates the cached responses of the pages that embed it, as recorded by
+# core.dependencies. Pages themselves invalidate on publish.
+API_CACHE_DEPENDENCIES = [
+    "products.ProductService",
+    "products.ProductServicePrice",
+    "products.LearningExperience",
+    "taxes.Tax",
+    "campaigns.Campaign",
+    "courses.Course",
+    "lessons.LessonCategory",
+    "core.Language",
+    "addresses.ExperienceAddress",
+    "languageschools.LanguageSchool",
+]
+
+# Models whose saves and deletes move their model version, used as the validators of
+# the custom API views that serialize them
+API_VERSIONED_MODELS = [
+    "lessons.LessonCategory",
+    "schedules.SuperSaasSchedule",
+    "users.CustomUser",
+    "contacts.Contact",
+    "languageschools.LanguageSchool",
+    "auth.Group",
+]
+
+
+def _page_version_key(page_id):
+    return f"api:page-version:{page_id}"
+
+
+def _model_version_key(label):
+    return f"api:model-version:{label.lower()}"
+
+
+def _get_versions(keys):
+    # Versions start from the current time so that if one is evicted its new value is
+    # still newer than any cached one
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, time.time_ns(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def get_cache_versions(page_id):
+    """The global and page versions included in a page's response cache keys"""
+    return _get_versions([VERSION_KEY, _page_version_key(page_id)])
+
+
+def get_model_versions(labels):
+    """The versions of the models with labels, eg. lessons.LessonCategory"""
+    return _get_versions([_model_version_key(label) for label in labels])
+
+
+def invalidate_models(labels):
+    """Move the versions of the models with labels"""
+    version = time.time_ns()
+    cache.set_many({_model_version_key(label): version for label in labels}, None)
+
+
+def invalidate_api_cache():
+    """Invalidate every cached page response by moving to a new global version"""
+    cache.set(VERSION_KEY, time.time_ns(), None)
+
+
+def invalidate_pages(page_ids):
+    """Invalidate the cached responses of page_ids only"""
+    version = time.time_ns()
+    cache.set_many({_page_version_key(page_id): version for page_id in page_ids}, None)
+
+
+def _get_request_digest(request):
+    # Urls in responses are absolute and the query params select the fields, so both
+    # the host and the params are part of the key
+    params = urlencode(sorted(request.GET.lists()), doseq=True)
+    return hashlib.md5(
+        f"{request.get_host()}{request.path}?{params}".encode()
+    ).hexdigest()
+
+
+def get_page_cache_key(request, page_id):
+    """Cache key for a page detail response"""
+    global_version, page_version = get_cache_versions(page_id)
+    digest = _get_request_digest(request)
+    return f"api:page:{global_version}:{page_id}:{page_version}:{digest}"
+
+
+def _get_validator_funcs(get_versions):
+    def get_request_versions(request, *args, **kwargs):
+        if not hasattr(request, "_api_versions"):
+            request._api_versions = get_versions(request, *args, **kwargs)
+        return request._api_versions
+
+    def etag(request, *args, **kwargs):
+        versions = get_request_versions(request, *args, **kwargs)
+        if versions:
+            parts = [_get_request_digest(request), *versions]
+            return hashlib.md5(":".join(map(str, parts)).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        versions = get_request_versions(request, *args, **kwargs)
+        if versions:
+            return datetime.fromtimestamp(max(versions) / 1e9, tz=timezone.utc)
+
+    return etag, last_modified
+
+
+def versioned_condition(get_versions):
+    """condition() decorator for a view whose response only changes when one of the
+    versions returned by get_versions(request, *args, **kwargs) does. Gives a strong
+    ETag and Last-Modified, so that conditional requests get a 304 without the view
+    running. get_versions may return None to skip, eg. for drafts"""
+    etag, last_modified = _get_validator_funcs(get_versions)
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def async_versioned_condition(get_versions):
+    """versioned_condition() for the async def handlers of core.async_views.AsyncAPIView.
+    Versions are read from the cache with run_sync"""
+    etag_func, last_modified_func = _get_validator_funcs(get_versions)
+
+    def decorator(handler):
+        @wraps(handler)
+        async def inner(view, request, *args, **kwargs):
+            request._api_versions = await run_sync(
+                request, get_versions, request, *args, **kwargs
+            )
+            etag = etag_func(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag else None
+            last_modified = last_modified_func(request, *args, **kwargs)
+            last_modified = (
+                timegm(last_modified.utctimetuple()) if last_modified else None
+            )
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = await handler(view, request, *args, **kwargs)
+            if request.method in ("GET", "HEAD"):
+                if last_modified and not response.has_header("Last-Modified"):
+                    response.headers["Last-Modified"] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault("ETag", etag)
+            return response
+
+        return inner
+
+    return decorator
+
+
+def get_api_cache_timeout():
+    """Seconds to cache page responses for. 0 disables the cache"""
+    return getattr(settings, "API_CACHE_TIMEOUT", 0)
@@ -0,0 +1,105 @@
+from django.db.models import Prefetch, prefetch_related_objects
+
+# Page models declare the relations their custom API field serializers walk as
+#
+#     api_field_relations = {
+#         "private_price_plans": ["price_plan__class_service__tax_rate"],
+#         "address": [],
+#     }
+#
+# mapping API field names to lookups from the field's value. An empty list loads the
+# field's object itself. Chains of foreign keys are joined with select_related and
+# everything else, eg. orderables and reverse foreign keys, is prefetched.
+
+
+def _is_forward(field):
+    return (
+        field.is_relation and field.concrete and (field.many_to_one or field.one_to_one)
+    )
+
+
+def _split_lookup(model, lookup):
+    """Split lookup into its longest leading chain of forward foreign keys, which can be
+    joined, and the rest. Returns the chain, the model it ends at and the rest"""
+    parts = lookup.split("__")
+    for i, part in enumerate(parts):
+        field = model._meta.get_field(part)
+        if not _is_forward(field):
+            return "__".join(parts[:i]), model, parts[i:]
+        model = field.related_model
+    return lookup, model, []
+
+
+def _build_relations(model, lookups):
+    """select_related and prefetch_related arguments that load lookups from model"""
+    select_related = []
+    prefetches = {}
+    for lookup in lookups:
+        chain, chain_model, rest = _split_lookup(model, lookup)
+        if chain:
+            select_related.append(chain)
+        if not rest:
+            continue
+        prefix = f"{chain}__{rest[0]}" if chain else rest[0]
+        related_model = chain_model._meta.get_field(rest[0]).related_model
+        _, nested = prefetches.setdefault(prefix, (related_model, []))
+        if rest[1:]:
+            nested.append("__".join(rest[1:]))
+    prefetch_related = [
+        Prefetch(
+            prefix,
+            queryset=apply_relations(related_model._default_manager.all(), nested),
+        )
+        for prefix, (related_model, nested) in prefetches.items()
+    ]
+    return select_related, prefetch_related
+
+
+def apply_relations(queryset, lookups):
+    """queryset with lookups joined or prefetched"""
+    select_related, prefetch_related = _build_relations(queryset.model, lookups)
+    if select_related:
+        queryset = queryset.select_related(*select_related)
+    if prefetch_related:
+        queryset = queryset.prefetch_related(*prefetch_related)
+    return queryset
+
+
+def get_api_field_lookups(model, field_names=None):
+    """Lookups declared by model's api_field_relations, for field_names or all fields"""
+    lookups = []
+    for name, relations in getattr(model, "api_field_relations", {}).items():
+        if field_names is None or name in field_names:
+            lookups += [f"{name}__{relation}" for relation in relations] or [name]
+    return lookups
+
+
+def apply_api_relations(queryset, field_names=None):
+    """queryset with the relations of its model's API fields loaded"""
+    return apply_relations(queryset, get_api_field_lookups(queryset.model, field_names))
+
+
+def get_requested_field_names(request):
+    """Field names in a listing request's fields param, or None for all fields"""
+    names = {
+        name.split("(")[0].lstrip("-")
+        for name in request.GET.get("fields", "").split(",")
+    }
+    return None if "*" in names else names
+
+
+def prefetch_api_relations(instance):
+    """Load the relations of instance's API fields onto an instance already fetched,
+    eg. a specific page, with one query per API field"""
+    grouped = {}
+    for lookup in get_api_field_lookups(type(instance)):
+        name, _, relation = lookup.partition("__")
+        relations = grouped.setdefault(name, [])
+        if relation:
+            relations.append(relation)
+    prefetches = []
+    for name, relations in grouped.items():
+        related_model = instance._meta.get_field(name).related_model
+        queryset = apply_relations(related_model._default_manager.all(), relations)
+        prefetches.append(Prefetch(name, queryset=queryset))
+    prefetch_related_objects([instance], *prefetches)
@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+from rest_framework.views import APIView
+
+from .query_budget import get_current_recorder
+
+# Under ASGI, sync code called from async views, eg. DRF authentication or a Wagtail
+# page view, runs in a pool of API_SYNC_THREADS threads rather than Django's single
+# thread for sync code, so a slow query only holds one of them
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.API_SYNC_THREADS, thread_name_prefix="api-sync"
+            )
+        return _executor
+
+
+def uses_pool(request):
+    """Only ASGI requests use the pool. Under WSGI, eg. gunicorn's sync workers or the
+    test client, the request already has a thread of its own"""
+    request = getattr(request, "_request", request)
+    return isinstance(request, ASGIRequest) and settings.API_SYNC_THREADS > 0
+
+
+def _call_in_pool(func, *args, **kwargs):
+    # Pool threads have their own database connections, which are closed like the
+    # request thread's at the start and end of each request. Their queries are added to
+    # the request's QueryRecorder, if QueryBudgetMiddleware is recording
+    close_old_connections()
+    recorder = get_current_recorder()
+    try:
+        with recorder.wrap_connections() if recorder else nullcontext():
+            return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def run_sync(request, func, *args, **kwargs):
+    """Call sync func from an async view"""
+    if uses_pool(request):
+        call = sync_to_async(
+            _call_in_pool, thread_sensitive=False, executor=get_executor()
+        )
+        return await call(func, *args, **kwargs)
+    return await sync_to_async(func)(*args, **kwargs)
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView with async def handlers, which can use the async ORM.
+
+    Authentication, permissions and throttles may query the database,
+    so they run with run_sync. Serialize data loaded by the handler,
+    eg. with select_related, as lazy loading raises in async code.
+    """
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await run_sync(request, self.initial, request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(
+                    self, request.method.lower(), self.http_method_not_allowed
+                )
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if asyncio.iscoroutine(response):
+                # OPTIONS and not allowed methods are handled by APIView
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def pooled_view(view):
+    """Async view calling the sync view with run_sync, and rendering its response there
+    too, eg. for Wagtail's API viewsets"""
+
+    @wraps(view)
+    async def pooled(request, *args, **kwargs):
+        def call():
+            response = view(request, *args, **kwargs)
+            if hasattr(response, "render"):
+                response.render()
+            return response
+
+        return await run_sync(request, call)
+
+    return pooled
@@ -0,0 +1,81 @@
+from functools import partial
+
+from django.conf import settings
+from django.db.backends.postgresql import base
+
+from core.db_pool import get_pool
+
+# Transaction status of an idle connection in both psycopg2 and psycopg 3
+TRANSACTION_STATUS_IDLE = 0
+
+
+def health_check(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+
+
+def reset_session(connection):
+    """Roll back any open transaction and reset session state, eg. SET or temporary
+    tables, so the next checkout starts clean. Django sets up its session state again
+    on every checkout"""
+    if connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+        connection.rollback()
+    # DISCARD ALL cannot run in a transaction block
+    connection.autocommit = True
+    with connection.cursor() as cursor:
+        cursor.execute("DISCARD ALL")
+
+
+def connect(settings_dict, alias, conn_params):
+    # Opened by a wrapper of its own rather than the one that first used the pool, so
+    # the pool keeps no request's wrapper alive
+    return base.DatabaseWrapper(settings_dict, alias).get_new_connection(conn_params)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    PostgreSQL backend taking connections from a process wide pool, see
+    core.db_pool. Closing the connection, eg. at the end of each request,
+    returns it to the pool after rolling back any open transaction and
+    resetting the session.
+    """
+
+    def get_pool(self, conn_params):
+        config = {**settings.DB_POOL, **self.settings_dict.get("POOL", {})}
+        # Keyed on the connection details too, as tests switch NAME to the test database
+        key = (self.alias, repr(sorted(conn_params.items())))
+        return get_pool(
+            key,
+            partial(connect, dict(self.settings_dict), self.alias, conn_params),
+            config,
+            health_check=health_check,
+            name=self.alias,
+        )
+
+    def get_new_connection(self, conn_params):
+        self.pool = self.get_pool(conn_params)
+        connection = self.pool.checkout()
+        # Set by the parent on the wrapper that opened the connection, which may be
+        # another thread's
+        self.isolation_level = base.IsolationLevel(
+            self.settings_dict["OPTIONS"].get(
+                "isolation_level", base.IsolationLevel.READ_COMMITTED
+            )
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        broken = bool(connection.closed)
+        if not broken and self.errors_occurred:
+            broken = not self.is_usable()
+        if not broken:
+            try:
+                reset_session(connection)
+            except self.Database.Error:
+                broken = True
+        self.pool.checkin(connection, broken=broken)
@@ -6,6 +6,17 @@ from django.conf import settings
 logger = logging.getLogger(__name__)
 
 
+def get_client_ip(request):
+    """
+    The client IP, taken as the last address in X-Forwarded-For
+    as added by our proxy, else REMOTE_ADDR
+    """
+    ip = request.META.get("HTTP_X_FORWARDED_FOR", "")
+    if ip:
+        return ip.split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
 class SafeIPsPermission(permissions.BasePermission):
     """
     Global permission to allow access to a
@@ -13,10 +24,6 @@ class SafeIPsPermission(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        ip = request.META.get("HTTP_X_FORWARDED_FOR", "")
-        if ip:
-            ip = ip.split(",")[-1]
-        else:
-            ip = request.META.get("REMOTE_ADDR")
+        ip = get_client_ip(request)
         ip_start = ip.split(".")[0]
         return ip_start in settings.SAFE_IP_STARTS
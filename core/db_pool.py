@@ -0,0 +1,205 @@
+import atexit
+import logging
+import threading
+import time
+from collections import deque
+
+from django.db import OperationalError
+from django.dispatch import Signal
+
+logger = logging.getLogger(__name__)
+
+# Sent on every checkout with the pool, the seconds the checkout took, whether it
+# waited for a connection to be returned and whether a new connection was opened.
+# Connect a receiver to export pool waits, eg. to a metrics backend
+connection_checked_out = Signal()
+
+
+class PoolTimeout(OperationalError):
+    pass
+
+
+class ConnectionPool:
+    """
+    Thread safe pool of up to max_size DB-API connections made by connect().
+
+    Connections are discarded once max_age seconds old. One idle for more
+    than health_check_after seconds is checked with health_check(conn)
+    before reuse, and replaced if that returns False or raises. Checkouts
+    wait up to timeout seconds for a connection when all are in use, and
+    waits over slow_wait seconds are logged.
+    """
+
+    def __init__(
+        self,
+        connect,
+        max_size=10,
+        max_age=30 * 60,
+        timeout=10,
+        health_check=None,
+        health_check_after=30,
+        slow_wait=0.1,
+        name="default",
+        clock=time.monotonic,
+    ):
+        self.connect = connect
+        self.max_size = max_size
+        self.max_age = max_age
+        self.timeout = timeout
+        self.health_check = health_check
+        self.health_check_after = health_check_after
+        self.slow_wait = slow_wait
+        self.name = name
+        self.clock = clock
+        self._condition = threading.Condition()
+        # (connection, opened at, returned at), most recently returned last
+        self._idle = deque()
+        self._opened_at = {}
+        self.size = 0
+        self.stats = {
+            "checkouts": 0,
+            "opened": 0,
+            "discarded": 0,
+            "waits": 0,
+            "wait_seconds": 0.0,
+            "max_wait_seconds": 0.0,
+        }
+
+    def _expired(self, opened_at, now):
+        return self.max_age is not None and now - opened_at >= self.max_age
+
+    def _discard(self, conn):
+        # Called with the condition held
+        self.size -= 1
+        self.stats["discarded"] += 1
+        self._opened_at.pop(id(conn), None)
+        self._condition.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _healthy(self, conn):
+        try:
+            return self.health_check(conn) is not False
+        except Exception:
+            return False
+
+    def _take_idle(self, now):
+        """An idle connection still within max_age, or None. Called with the
+        condition held"""
+        while self._idle:
+            conn, opened_at, returned_at = self._idle.pop()
+            if self._expired(opened_at, now):
+                self._discard(conn)
+                continue
+            return conn, returned_at
+        return None
+
+    def checkout(self):
+        start = self.clock()
+        deadline = start + self.timeout
+        waited = False
+        while True:
+            with self._condition:
+                while True:
+                    now = self.clock()
+                    idle = self._take_idle(now)
+                    if idle or self.size < self.max_size:
+                        break
+                    if now >= deadline:
+                        raise PoolTimeout(
+                            f"No connection free in the {self.name} pool of "
+                            f"{self.max_size} after {self.timeout} seconds"
+                        )
+                    waited = True
+                    self._condition.wait(deadline - now)
+                if not idle:
+                    # Reserve a place, then connect outside the lock
+                    self.size += 1
+            if idle:
+                conn, returned_at = idle
+                if (
+                    self.health_check is None
+                    or self.clock() - returned_at < self.health_check_after
+                    or self._healthy(conn)
+                ):
+                    return self._checked_out(conn, start, waited, opened=False)
+                with self._condition:
+                    self._discard(conn)
+                continue
+            try:
+                conn = self.connect()
+            except Exception:
+                with self._condition:
+                    self.size -= 1
+                    self._condition.notify()
+                raise
+            with self._condition:
+                self._opened_at[id(conn)] = self.clock()
+                self.stats["opened"] += 1
+            return self._checked_out(conn, start, waited, opened=True)
+
+    def _checked_out(self, conn, start, waited, opened):
+        wait = self.clock() - start
+        with self._condition:
+            self.stats["checkouts"] += 1
+            self.stats["waits"] += waited
+            self.stats["wait_seconds"] += wait
+            self.stats["max_wait_seconds"] = max(self.stats["max_wait_seconds"], wait)
+        if self.slow_wait is not None and wait > self.slow_wait:
+            logger.warning(
+                f"Waited {wait * 1000:.0f} ms for a connection from the "
+                f"{self.name} pool of {self.max_size}"
+            )
+        connection_checked_out.send(
+            sender=self.__class__, pool=self, wait=wait, waited=waited, opened=opened
+        )
+        return conn
+
+    def checkin(self, conn, broken=False):
+        """Return conn to the pool, or close it if broken or past max_age"""
+        with self._condition:
+            now = self.clock()
+            opened_at = self._opened_at.get(id(conn), now)
+            if broken or self._expired(opened_at, now):
+                self._discard(conn)
+                return
+            self._idle.append((conn, opened_at, now))
+            self._condition.notify()
+
+    def close(self):
+        """Close the idle connections, eg. at exit"""
+        with self._condition:
+            while self._idle:
+                self._discard(self._idle.pop()[0])
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(key, connect, config, **kwargs):
+    """The process wide pool for key, made on first use from a DB_POOL style config"""
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(
+                connect,
+                max_size=config["MAX_SIZE"],
+                max_age=config["MAX_AGE"],
+                timeout=config["TIMEOUT"],
+                health_check_after=config["HEALTH_CHECK_AFTER"],
+                slow_wait=config["SLOW_WAIT"],
+                **kwargs,
+            )
+        return _pools[key]
+
+
+def close_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+
+
+# Close idle connections cleanly rather than leaving the server to notice they dropped
+atexit.register(close_pools)
@@ -0,0 +1,176 @@
+import hashlib
+from collections import defaultdict
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Max
+from modelcluster.models import get_all_child_relations
+from wagtail.fields import StreamField
+from wagtail.models import Page
+
+from .models import PageDependency
+
+# How many foreign keys deep to follow from a page, eg. LearningExperienceDetailPage ->
+# LearningExperience -> ProductService -> Tax
+DEPENDENCY_DEPTH = 3
+
+# Models that are embedded through their parent rather than by a foreign key from the
+# page, mapped to the foreign key of the parent. A change to one counts as a change to
+# its parent, eg. a new price changes its Product Service
+DEPENDENCY_PARENTS = {
+    "products.productserviceprice": "product_service",
+}
+
+
+def _is_own_field(field):
+    # Skip the fields wagtail defines on Page itself (owner, revisions etc.)
+    return field.model._meta.app_label != "wagtailcore"
+
+
+def _dependency_model(model):
+    # Pages are recorded against Page so that references from page choosers, which
+    # only know about Page, match the specific page that is published
+    return Page if issubclass(model, Page) else model
+
+
+def _walk(instance, depth, found):
+    for field in instance._meta.concrete_fields:
+        if not _is_own_field(field):
+            continue
+        if field.is_relation:
+            object_id = getattr(instance, field.attname)
+            if object_id is None:
+                continue
+            key = (_dependency_model(field.related_model), str(object_id))
+            if key in found:
+                continue
+            found.add(key)
+            if depth > 1:
+                _walk(getattr(instance, field.name), depth - 1, found)
+        elif isinstance(field, StreamField):
+            value = getattr(instance, field.attname)
+            for model, object_id, *_ in field.extract_references(value):
+                found.add((_dependency_model(model), str(object_id)))
+    for relation in get_all_child_relations(instance):
+        if not _is_own_field(relation.field):
+            continue
+        for child in getattr(instance, relation.get_accessor_name()).all():
+            _walk(child, depth, found)
+
+
+def collect_page_dependencies(page, depth=DEPENDENCY_DEPTH):
+    """(model, object id) pairs of every object the page embeds, following foreign keys
+    and orderables up to depth foreign keys away, plus stream field references"""
+    found = set()
+    _walk(page, depth, found)
+    found.discard((Page, str(page.pk)))
+    return found
+
+
+def update_page_dependencies(page):
+    """Replace the recorded dependencies of page with its current ones"""
+    found = collect_page_dependencies(page)
+    content_types = ContentType.objects.get_for_models(*{model for model, _ in found})
+    dependencies = [
+        PageDependency(
+            page_id=page.pk,
+            content_type=content_types[model],
+            object_id=object_id,
+        )
+        for model, object_id in found
+    ]
+    with transaction.atomic():
+        PageDependency.objects.filter(page_id=page.pk).delete()
+        PageDependency.objects.bulk_create(dependencies, ignore_conflicts=True)
+
+
+def ensure_page_dependencies(page):
+    """Record the dependencies of page if it has none recorded yet, eg. pages published
+    before dependencies were tracked"""
+    if not PageDependency.objects.filter(page_id=page.pk).exists():
+        update_page_dependencies(page)
+
+
+def get_dependent_page_ids(model, object_ids):
+    """Ids of the pages that embed any of the objects of model with object_ids"""
+    content_type = ContentType.objects.get_for_model(_dependency_model(model))
+    return set(
+        PageDependency.objects.filter(
+            content_type=content_type,
+            object_id__in=[str(object_id) for object_id in object_ids],
+        ).values_list("page_id", flat=True)
+    )
+
+
+def get_instance_dependent_page_ids(instance):
+    """Ids of the pages that embed instance, or its parent for DEPENDENCY_PARENTS"""
+    parent_field = DEPENDENCY_PARENTS.get(instance._meta.label_lower)
+    if parent_field:
+        field = instance._meta.get_field(parent_field)
+        return get_dependent_page_ids(
+            field.related_model, [getattr(instance, field.attname)]
+        )
+    return get_dependent_page_ids(type(instance), [instance.pk])
+
+
+def _stamp_fields(model):
+    # Fields that change whenever an object's serialized form may, read from the
+    # database rather than the cache so they survive restarts and cache clears
+    if issubclass(model, Page):
+        return ["last_published_at", "url_path"]
+    fields = [field.attname for field in model._meta.concrete_fields]
+    return ["modified"] if "modified" in fields else fields
+
+
+def get_object_stamps(model, object_ids):
+    """{object id: stamp} of the objects of model with object_ids, a string that
+    changes when the object or, for DEPENDENCY_PARENTS, its children change. Missing
+    objects have no stamp"""
+    stamps = {
+        str(pk): repr(values)
+        for pk, *values in model._default_manager.filter(pk__in=object_ids)
+        .order_by()
+        .values_list("pk", *_stamp_fields(model))
+    }
+    for label, parent_field in DEPENDENCY_PARENTS.items():
+        child_model = apps.get_model(label)
+        field = child_model._meta.get_field(parent_field)
+        if field.related_model is not model:
+            continue
+        children = (
+            child_model._default_manager.filter(**{f"{field.attname}__in": object_ids})
+            .order_by()
+            .values_list(field.attname)
+            .annotate(Count("pk"), Max(_stamp_fields(child_model)[0]))
+        )
+        for parent_id, count, latest in children:
+            if str(parent_id) in stamps:
+                stamps[str(parent_id)] += f" {count} {latest}"
+    return stamps
+
+
+def get_dependency_stamps(page_ids):
+    """{page id: hash} of the recorded dependencies of pages and their stamps, so a
+    page's hash changes when anything it embeds does"""
+    rows = sorted(
+        PageDependency.objects.filter(page_id__in=page_ids).values_list(
+            "page_id", "content_type_id", "object_id"
+        )
+    )
+    ids_by_type = defaultdict(set)
+    for _, content_type_id, object_id in rows:
+        ids_by_type[content_type_id].add(object_id)
+    stamps = {}
+    for content_type_id, object_ids in ids_by_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model is not None:
+            stamps[content_type_id] = get_object_stamps(model, object_ids)
+    lines = defaultdict(list)
+    for page_id, content_type_id, object_id in rows:
+        stamp = stamps.get(content_type_id, {}).get(object_id)
+        lines[page_id].append(f"{content_type_id}:{object_id}:{stamp}")
+    return {
+        page_id: hashlib.sha1("\n".join(lines[page_id]).encode()).hexdigest()
+        for page_id in page_ids
+    }
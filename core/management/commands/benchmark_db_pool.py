@@ -0,0 +1,99 @@
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.db_pool import ConnectionPool
+
+
+def select_one(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT 1")
+    cursor.fetchall()
+    cursor.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare opening a connection per unit of work with checking one out of a "
+        "core.db_pool pool, running SELECT 1 on each. Uses the database's settings when "
+        "it is PostgreSQL, otherwise a temporary SQLite file as a stand-in."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default")
+        parser.add_argument("--iterations", type=int, default=500)
+        parser.add_argument(
+            "--threads",
+            type=int,
+            default=8,
+            help="Threads sharing the pool. Default 8",
+        )
+        parser.add_argument(
+            "--pool-size",
+            type=int,
+            default=4,
+            help="Pool size, less than --threads to show waits. Default 4",
+        )
+
+    def get_connect(self, database):
+        wrapper = connections[database]
+        if wrapper.vendor == "postgresql":
+            conn_params = wrapper.get_connection_params()
+            self.stdout.write(f"PostgreSQL database {conn_params.get('dbname')}")
+            return lambda: wrapper.Database.connect(**conn_params)
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, "benchmark.sqlite3")
+        self.stdout.write(f"SQLite stand-in {path}")
+        return lambda: sqlite3.connect(path, check_same_thread=False)
+
+    def time_threads(self, work, options):
+        per_thread = options["iterations"] // options["threads"]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+            for future in [
+                executor.submit(lambda: [work() for _ in range(per_thread)])
+                for _ in range(options["threads"])
+            ]:
+                future.result()
+        elapsed = time.perf_counter() - start
+        return elapsed, per_thread * options["threads"]
+
+    def handle(self, *args, **options):
+        connect = self.get_connect(options["database"])
+
+        def unpooled():
+            connection = connect()
+            select_one(connection)
+            connection.close()
+
+        pool = ConnectionPool(
+            connect,
+            max_size=options["pool_size"],
+            health_check=select_one,
+            slow_wait=None,
+            name="benchmark",
+        )
+
+        def pooled():
+            connection = pool.checkout()
+            select_one(connection)
+            pool.checkin(connection)
+
+        for label, work in (("connect per use", unpooled), ("pool", pooled)):
+            elapsed, count = self.time_threads(work, options)
+            self.stdout.write(
+                f"  {label}: {count / elapsed:.0f} ops/s  "
+                f"{elapsed / count * 1000:.3f} ms/op"
+            )
+        pool.close()
+        stats = pool.stats
+        self.stdout.write(
+            f"  pool opened {stats['opened']} connections for {stats['checkouts']} "
+            f"checkouts, {stats['waits']} waited, max wait "
+            f"{stats['max_wait_seconds'] * 1000:.1f} ms"
+        )
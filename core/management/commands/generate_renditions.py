@@ -0,0 +1,64 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from wagtail.images import get_image_model
+
+from core.renditions import API_RENDITION_SPECS, generate_renditions_for_ids
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate every rendition used by the API for all images, so that API requests "
+        "never resize images. Images are processed in batches in a process pool."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of worker processes. 0 runs in this process. Default CPU count",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=20,
+            help="Images per worker task. Default 20",
+        )
+        parser.add_argument(
+            "--spec",
+            action="append",
+            dest="specs",
+            help="Only generate this filter spec. Can be repeated. Default all API specs",
+        )
+
+    def handle(self, *args, **options):
+        specs = options["specs"] or API_RENDITION_SPECS
+        ids = list(
+            get_image_model().objects.order_by("pk").values_list("pk", flat=True)
+        )
+        size = options["batch_size"]
+        batches = [ids[i : i + size] for i in range(0, len(ids), size)]
+
+        if options["workers"] == 0:
+            done = sum(generate_renditions_for_ids(batch, specs) for batch in batches)
+        else:
+            # Connections must not be shared with the forked workers
+            connections.close_all()
+            done = 0
+            with ProcessPoolExecutor(
+                max_workers=options["workers"], initializer=django.setup
+            ) as executor:
+                futures = [
+                    executor.submit(generate_renditions_for_ids, batch, specs)
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    done += future.result()
+
+        self.stdout.write(
+            f"Generated {len(specs)} rendition spec(s) for {done} image(s)"
+        )
@@ -0,0 +1,81 @@
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = (
+        "Load test API urls with concurrent requests, reporting requests per second and "
+        "latency for each. Compare servers by giving the same path on each, eg. "
+        "gunicorn config.wsgi on one port and gunicorn config.asgi with uvicorn "
+        "workers on another."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+")
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Requests in flight at once. Default 20",
+        )
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Requests made to each url. Default 500",
+        )
+        parser.add_argument(
+            "--header",
+            action="append",
+            default=[],
+            help='Header sent with every request, eg. "Cookie: __xl-auth__=..."',
+        )
+        parser.add_argument("--timeout", type=float, default=30)
+
+    def fetch(self, url, headers, timeout):
+        request = urllib.request.Request(url, headers=headers)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as error:
+            status = error.code
+        except OSError:
+            status = None
+        return status, time.perf_counter() - start
+
+    def run(self, url, headers, options):
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as executor:
+            start = time.perf_counter()
+            results = list(
+                executor.map(
+                    lambda _: self.fetch(url, headers, options["timeout"]),
+                    range(options["requests"]),
+                )
+            )
+            elapsed = time.perf_counter() - start
+        latencies = sorted(latency * 1000 for _, latency in results)
+        errors = sum(1 for status, _ in results if status is None or status >= 400)
+        percentiles = statistics.quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{url}\n"
+            f"  {len(results) / elapsed:.1f} req/s  errors {errors}  "
+            f"p50 {percentiles[49]:.1f} ms  p95 {percentiles[94]:.1f} ms  "
+            f"p99 {percentiles[98]:.1f} ms  max {latencies[-1]:.1f} ms"
+        )
+
+    def handle(self, *args, **options):
+        headers = dict(
+            (name.strip(), value.strip())
+            for name, _, value in (
+                header.partition(":") for header in options["header"]
+            )
+        )
+        for url in options["urls"]:
+            self.run(url, headers, options)
@@ -0,0 +1,42 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from wagtail.models import Site
+
+from core.prebake import Prebaker
+
+
+class Command(BaseCommand):
+    help = (
+        "Export the page API response of every live page to gzipped JSON files with an "
+        "index, for serving from static storage. Only pages that changed since the last "
+        "export are re-exported."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output",
+            default=settings.PREBAKE_ROOT,
+            help="Directory to export to. Default PREBAKE_ROOT",
+        )
+        parser.add_argument(
+            "--host",
+            help="Host used for absolute urls in responses. Default the default site",
+        )
+        parser.add_argument(
+            "--http",
+            action="store_true",
+            help="Use http rather than https for absolute urls",
+        )
+        parser.add_argument(
+            "--full",
+            action="store_true",
+            help="Re-export every page, not only changed ones",
+        )
+
+    def handle(self, *args, **options):
+        host = options["host"] or Site.objects.get(is_default_site=True).hostname
+        prebaker = Prebaker(options["output"], host, secure=not options["http"])
+        exported, unchanged, removed = prebaker.export(full=options["full"])
+        self.stdout.write(
+            f"Exported {exported} page(s), {unchanged} unchanged, {removed} removed"
+        )
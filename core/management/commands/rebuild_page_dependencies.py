@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from wagtail.models import Page
+
+from core.api_cache import invalidate_api_cache
+from core.dependencies import update_page_dependencies
+
+
+class Command(BaseCommand):
+    help = (
+        "Record the dependencies of every live page, used to invalidate cached API "
+        "responses when an object a page embeds changes."
+    )
+
+    def handle(self, *args, **options):
+        count = 0
+        for page in Page.objects.live().specific().iterator(chunk_size=100):
+            update_page_dependencies(page)
+            count += 1
+        invalidate_api_cache()
+        self.stdout.write(f"Recorded dependencies for {count} page(s)")
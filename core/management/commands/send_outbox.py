@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.outbox import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Send queued outbox emails, retrying failed ones with backoff. "
+        "Run from cron, or with --loop to keep polling the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and send emails as they are queued",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=50,
+            help="Max emails sent over one connection. Default 50",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=int,
+            default=5,
+            help="Seconds to sleep when the queue is empty in --loop mode. Default 5",
+        )
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(batch_size=options["batch_size"])
+        if options["loop"]:
+            worker.run(poll_interval=options["poll_interval"])
+            return
+        sent = 0
+        while count := worker.run_once():
+            sent += count
+        self.stdout.write(f"Sent {sent} email(s)")
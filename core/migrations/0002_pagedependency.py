@@ -0,0 +1,61 @@
+# Generated by Django 4.2.1 on 2026-10-18 16:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("wagtailcore", "0091_remove_revision_submitted_for_moderation"),
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("core", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PageDependency",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.CharField(max_length=255)),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "page",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to="wagtailcore.page",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["content_type", "object_id"],
+                        name="core_pagede_content_18b107_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="pagedependency",
+            constraint=models.UniqueConstraint(
+                fields=("page", "content_type", "object_id"),
+                name="unique_page_dependency",
+            ),
+        ),
+    ]
@@ -1,8 +1,15 @@
+from django.contrib.contenttypes.models import ContentType
 from django.db import models
+from django.db.models.functions import Lower
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from wagtail.admin.panels import FieldPanel
 from wagtail.snippets.models import register_snippet
 
+# email__lower=value.lower() filters on LOWER(email), which can use the Lower("email")
+# unique indexes, where email__iexact compiles to UPPER(email) and scans
+models.CharField.register_lookup(Lower)
+
 
 class TimeStampedModel(models.Model):
     """
@@ -66,6 +73,67 @@ class Language(models.Model):
         verbose_name_plural = "Languages"
 
 
+class PageDependency(models.Model):
+    """An object that a page's API response embeds, eg. the prices of a learning
+    experience or a related lesson. Maintained by core.dependencies when pages are
+    published so that a change to the object invalidates only the pages showing it"""
+
+    page = models.ForeignKey(
+        "wagtailcore.Page",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    content_type = models.ForeignKey(
+        ContentType,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    object_id = models.CharField(max_length=255)
+
+    def __str__(self):
+        return f"{self.page_id} -> {self.content_type_id}:{self.object_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["page", "content_type", "object_id"],
+                name="unique_page_dependency",
+            )
+        ]
+        indexes = [models.Index(fields=["content_type", "object_id"])]
+
+
+class OutboxEmail(TimeStampedModel):
+    """An email waiting to be sent by the send_outbox command, so that requests only
+    enqueue mail rather than waiting on the mail server. See core.outbox"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENDING = "sending", "Sending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    subject = models.CharField(max_length=255)
+    message = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10,
+        choices=Status.choices,
+        default=Status.PENDING,
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "next_attempt_at"])]
+
+
 class SubjectChoices(models.TextChoices):
     """Text choices fields for all subjects. Currently using comma split values so as to
     speed up queries rather than using a foreign key relation to subject model. May change in future. First value is roughly based on ISO 639-1 codes. May develop own code system if subjects go beyond language.
@@ -0,0 +1,152 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(subject, message, from_email, recipient_list):
+    """Queue an email for the send_outbox command. Takes the same arguments as
+    send_mail, and only writes a row so the request does not wait on the mail server"""
+    return OutboxEmail.objects.create(
+        subject=subject,
+        message=message,
+        from_email=from_email,
+        recipients=list(recipient_list),
+    )
+
+
+class OutboxWorker:
+    """Sends queued OutboxEmails in batches over one mail server connection per batch.
+
+    A failed email is retried after base_delay seconds, doubling with each attempt up to
+    max_delay, and marked failed after max_attempts. A batch is claimed by marking its
+    rows sending in a short transaction, skipping rows locked by other workers, so
+    several workers can run at once and no lock is held while the mail server is slow.
+    Each claim counts as an attempt. Rows left sending for claim_timeout seconds, eg. by
+    a worker that died, are claimed again until they run out of attempts. clock and
+    sleep are injectable so tests can use a fake clock.
+    """
+
+    def __init__(
+        self,
+        batch_size=50,
+        max_attempts=8,
+        base_delay=30,
+        max_delay=6 * 60 * 60,
+        claim_timeout=10 * 60,
+        clock=timezone.now,
+        sleep=time.sleep,
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.claim_timeout = claim_timeout
+        self.clock = clock
+        self.sleep = sleep
+
+    def get_backoff(self, attempts):
+        return timedelta(
+            seconds=min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        )
+
+    def fail(self, email, error, now):
+        email.last_error = str(error)
+        if email.attempts >= self.max_attempts:
+            email.status = OutboxEmail.Status.FAILED
+            logger.error(f"Giving up on outbox email {email.pk}: {error}")
+        else:
+            email.status = OutboxEmail.Status.PENDING
+            email.next_attempt_at = now + self.get_backoff(email.attempts)
+
+    def send_batch(self, emails, now):
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()
+        except Exception as error:
+            for email in emails:
+                self.fail(email, error, now)
+            return
+        try:
+            for email in emails:
+                message = EmailMessage(
+                    subject=email.subject,
+                    body=email.message,
+                    from_email=email.from_email,
+                    to=email.recipients,
+                    connection=connection,
+                )
+                try:
+                    message.send()
+                except Exception as error:
+                    self.fail(email, error, now)
+                else:
+                    email.status = OutboxEmail.Status.SENT
+                    email.sent_at = now
+        finally:
+            connection.close()
+
+    def claim(self, now):
+        """Due emails, marked sending so that other workers skip them"""
+        with transaction.atomic():
+            # Abandoned on their last attempt
+            OutboxEmail.objects.filter(
+                status=OutboxEmail.Status.SENDING,
+                next_attempt_at__lte=now,
+                attempts__gte=self.max_attempts,
+            ).update(status=OutboxEmail.Status.FAILED, modified=now)
+            emails = list(
+                OutboxEmail.objects.select_for_update(skip_locked=True)
+                .filter(
+                    status__in=[OutboxEmail.Status.PENDING, OutboxEmail.Status.SENDING],
+                    next_attempt_at__lte=now,
+                )
+                .order_by("next_attempt_at")[: self.batch_size]
+            )
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in emails]).update(
+                status=OutboxEmail.Status.SENDING,
+                attempts=F("attempts") + 1,
+                next_attempt_at=now + timedelta(seconds=self.claim_timeout),
+                modified=now,
+            )
+        for email in emails:
+            email.attempts += 1
+        return emails
+
+    def run_once(self):
+        """Send one batch of due emails. Returns the number sent"""
+        now = self.clock()
+        emails = self.claim(now)
+        if not emails:
+            return 0
+        self.send_batch(emails, now)
+        for email in emails:
+            # bulk_update does not set auto_now fields
+            email.modified = now
+        OutboxEmail.objects.bulk_update(
+            emails,
+            [
+                "status",
+                "attempts",
+                "next_attempt_at",
+                "last_error",
+                "sent_at",
+                "modified",
+            ],
+        )
+        return sum(email.status == OutboxEmail.Status.SENT for email in emails)
+
+    def run(self, poll_interval=5, until=None):
+        """Keep sending, sleeping poll_interval seconds whenever the queue is empty"""
+        while until is None or self.clock() < until:
+            sent = self.run_once()
+            if not sent:
+                self.sleep(poll_interval)
@@ -0,0 +1,126 @@
+import asyncio
+import gzip
+import json
+import os
+
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory
+from django.urls import resolve
+from wagtail.models import Page
+
+from .dependencies import ensure_page_dependencies, get_dependency_stamps
+
+INDEX_FILE = "index.json.gz"
+# Pages read, and their dependency stamps loaded, at once
+CHUNK_SIZE = 100
+
+
+def _write_gzip(path, data):
+    # mtime=0 so that unchanged content gives identical files, and the replace means a
+    # reader never sees a half written file
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(gzip.compress(data, mtime=0))
+    os.replace(tmp_path, path)
+
+
+class Prebaker:
+    """Exports the page API detail response of every live page to gzipped JSON files.
+
+    Responses go through the api_router views, so they are exactly what the API serves.
+    The index records when each page was last published, its url path and a hash of
+    the objects it embeds as recorded by core.dependencies, all read from the database.
+    An incremental export only re-exports pages where any of these changed. Changes to
+    code, eg. a serializer, need a full export.
+    """
+
+    def __init__(self, output_dir, host, secure=True):
+        self.output_dir = output_dir
+        self.pages_dir = os.path.join(output_dir, "pages")
+        self.host = host
+        self.secure = secure
+        self.request_factory = RequestFactory()
+
+    def load_index(self):
+        try:
+            with gzip.open(os.path.join(self.output_dir, INDEX_FILE), "rb") as f:
+                return json.load(f)["pages"]
+        except FileNotFoundError:
+            return {}
+
+    def serialize(self, page):
+        """The API detail response content of page, or None if it is not served"""
+        path = f"/api/v2/pages/{page.pk}/"
+        request = self.request_factory.get(
+            path, HTTP_HOST=self.host, secure=self.secure
+        )
+        match = resolve(path)
+        view = match.func
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        response = view(request, *match.args, **match.kwargs)
+        if response.status_code != 200:
+            return None
+        response.render()
+        return response.content
+
+    def export(self, full=False):
+        """Export every live page, or only changed ones unless full. Returns the number
+        of pages exported, unchanged and removed"""
+        os.makedirs(self.pages_dir, exist_ok=True)
+        index = self.load_index()
+        new_index = {}
+        exported = unchanged = 0
+        pages = Page.objects.live().public().specific().order_by("pk")
+        chunk = list(pages[:CHUNK_SIZE])
+        while chunk:
+            for page in chunk:
+                ensure_page_dependencies(page)
+            # Read before serializing so a change during the export is picked up next
+            # time
+            stamps = get_dependency_stamps([page.pk for page in chunk])
+            for page in chunk:
+                key = str(page.pk)
+                entry = index.get(key)
+                state = {
+                    "last_published_at": str(page.last_published_at),
+                    "url_path": page.url_path,
+                    "dependencies": stamps[page.pk],
+                }
+                file_name = os.path.join("pages", f"{page.pk}.json.gz")
+                if (
+                    not full
+                    and entry
+                    and all(entry.get(name) == value for name, value in state.items())
+                    and os.path.exists(os.path.join(self.output_dir, file_name))
+                ):
+                    new_index[key] = entry
+                    unchanged += 1
+                    continue
+                content = self.serialize(page)
+                if content is None:
+                    continue
+                _write_gzip(os.path.join(self.output_dir, file_name), content)
+                new_index[key] = {
+                    "id": page.pk,
+                    "type": page.specific_class._meta.label,
+                    "slug": page.slug,
+                    "file": file_name,
+                    **state,
+                }
+                exported += 1
+            chunk = list(pages.filter(pk__gt=chunk[-1].pk)[:CHUNK_SIZE])
+
+        removed = 0
+        for key, entry in index.items():
+            if key not in new_index:
+                path = os.path.join(self.output_dir, entry["file"])
+                if os.path.exists(path):
+                    os.remove(path)
+                removed += 1
+
+        _write_gzip(
+            os.path.join(self.output_dir, INDEX_FILE),
+            json.dumps({"pages": new_index}, sort_keys=True).encode(),
+        )
+        return exported, unchanged, removed
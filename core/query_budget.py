@@ -0,0 +1,184 @@
+import json
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+from wagtail.api.v2.serializers import PageSerializer
+
+logger = logging.getLogger(__name__)
+
+_current_recorder = ContextVar("query_recorder", default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def get_current_recorder():
+    """The QueryRecorder recording the current request, if any"""
+    return _current_recorder.get()
+
+
+class QueryRecorder:
+    """Records the queries run while recording, attributed to the innermost scope.
+
+    Scopes are the API fields being serialized, so a report shows which field is
+    responsible for which queries. Works without DEBUG, through execute wrappers.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.scopes = []
+        self.scope_times = Counter()
+        self.page = None
+        self.elapsed = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            scope = self.scopes[-1] if self.scopes else None
+            self.queries.append((scope, sql, time.perf_counter() - start))
+
+    @contextmanager
+    def record(self):
+        token = _current_recorder.set(self)
+        start = time.perf_counter()
+        try:
+            with self.wrap_connections():
+                yield self
+        finally:
+            self.elapsed = time.perf_counter() - start
+            _current_recorder.reset(token)
+
+    @contextmanager
+    def wrap_connections(self):
+        """Record the queries of this thread's connections. Threads running part of a
+        request, eg. core.async_views' pool, use it to report to the request's recorder
+        """
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield
+
+    @contextmanager
+    def scope(self, name):
+        self.scopes.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.scopes.pop()
+            self.scope_times[name] += time.perf_counter() - start
+
+    @property
+    def budget(self):
+        return getattr(self.page, "api_query_budget", None)
+
+    def report(self):
+        """Query count, time, duplicate SQL and a per field breakdown as a dict"""
+        sql_counts = Counter(sql for _, sql, _ in self.queries)
+        fields = {}
+        for scope, _, duration in self.queries:
+            if scope is None:
+                continue
+            field = fields.setdefault(scope, {"queries": 0, "query_time_ms": 0})
+            field["queries"] += 1
+            field["query_time_ms"] += duration * 1000
+        for scope, duration in self.scope_times.items():
+            field = fields.setdefault(scope, {"queries": 0, "query_time_ms": 0})
+            field["time_ms"] = round(duration * 1000, 2)
+            field["query_time_ms"] = round(field["query_time_ms"], 2)
+        return {
+            "page_type": self.page._meta.label if self.page else None,
+            "queries": len(self.queries),
+            "query_time_ms": round(sum(d for _, _, d in self.queries) * 1000, 2),
+            "time_ms": round(self.elapsed * 1000, 2),
+            "budget": self.budget,
+            "over_budget": self.budget is not None and len(self.queries) > self.budget,
+            "duplicates": [
+                {"sql": sql, "count": count}
+                for sql, count in sql_counts.most_common()
+                if count > 1
+            ],
+            "fields": fields,
+        }
+
+
+def record_page(page):
+    """Note the page being serialized, for its type and query budget"""
+    recorder = get_current_recorder()
+    if recorder is not None:
+        recorder.page = page
+
+
+def _instrument_field(field, recorder):
+    if getattr(field, "_query_recorder", None) is recorder:
+        return
+    get_attribute = field.get_attribute
+    to_representation = field.to_representation
+
+    def instrumented_get_attribute(instance):
+        with recorder.scope(field.field_name):
+            return get_attribute(instance)
+
+    def instrumented_to_representation(value):
+        with recorder.scope(field.field_name):
+            return to_representation(value)
+
+    field.get_attribute = instrumented_get_attribute
+    field.to_representation = instrumented_to_representation
+    field._query_recorder = recorder
+
+
+class InstrumentedPageSerializer(PageSerializer):
+    """PageSerializer that attributes queries to the API field that ran them while a
+    QueryRecorder is recording"""
+
+    def to_representation(self, instance):
+        recorder = get_current_recorder()
+        if recorder is not None:
+            for field in self.fields.values():
+                _instrument_field(field, recorder)
+        return super().to_representation(instance)
+
+
+class QueryBudgetMiddleware:
+    """Logs the queries of every API request as JSON when API_QUERY_LOGGING is on, and
+    appends them to API_QUERY_REPORT if set. Requests over their page type's
+    api_query_budget are logged as warnings, or raise QueryBudgetExceeded with
+    API_QUERY_BUDGET_STRICT on, which fails any test making them"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        strict = getattr(settings, "API_QUERY_BUDGET_STRICT", False)
+        enabled = strict or getattr(settings, "API_QUERY_LOGGING", False)
+        if not enabled or not request.path.startswith("/api/"):
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        report = {
+            "method": request.method,
+            "path": request.path,
+            "view": getattr(request.resolver_match, "view_name", None),
+            "status": response.status_code,
+            **recorder.report(),
+        }
+        level = logging.WARNING if report["over_budget"] else logging.INFO
+        logger.log(level, json.dumps(report))
+        report_path = getattr(settings, "API_QUERY_REPORT", None)
+        if report_path:
+            with open(report_path, "a") as f:
+                f.write(json.dumps(report) + "\n")
+        if strict and report["over_budget"]:
+            raise QueryBudgetExceeded(json.dumps(report, indent=2))
+        return response
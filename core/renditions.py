@@ -0,0 +1,321 @@
+from django.db import close_old_connections
+from modelcluster.models import get_all_child_relations
+from wagtail import blocks
+from wagtail.fields import StreamField
+from wagtail.images import get_image_model
+from wagtail.images.blocks import ImageChooserBlock
+from wagtail.images.models import Filter
+
+# Filter specs returned by the API image serializers and stream blocks. Renditions for
+# these are generated when an image is saved. Add new specs here when adding them to a
+# serializer.
+BASE_RENDITION_SPECS = [
+    "original",
+    "fill-1024x640",
+    "fill-1024x1024",
+    "fill-1400x1800",
+    "fill-740x740",
+    "fill-560x350",
+    "fill-560x560",
+    "fill-560x720",
+    "fill-450x450",
+    "fill-400x400",
+]
+
+# Widths of the srcset ladders returned for header and stream block images, each in the
+# original format and in every modern format. Browsers use the first supported source
+SRCSET_WIDTHS = [560, 1024, 1600]
+SRCSET_ASPECT_RATIOS = {"landscape": (16, 10), "square": (1, 1)}
+MODERN_FORMATS = {"avif": "image/avif", "webp": "image/webp"}
+
+
+def get_srcset_specs(aspect_ratio, image_format=None):
+    """Filter specs of the srcset ladder for aspect_ratio, converted to image_format"""
+    ratio_w, ratio_h = SRCSET_ASPECT_RATIOS[aspect_ratio]
+    specs = [f"fill-{w}x{w * ratio_h // ratio_w}" for w in SRCSET_WIDTHS]
+    if image_format:
+        specs = [f"{spec}|format-{image_format}" for spec in specs]
+    return specs
+
+
+# The srcset ladders, too many and too slow to encode, AVIF especially, to generate
+# while an image is saved or during a request. They are left out of API responses
+# until the generate_renditions command, run in the background by the Dockerfile, has
+# created them
+SRCSET_RENDITION_SPECS = [
+    spec
+    for aspect_ratio in SRCSET_ASPECT_RATIOS
+    for image_format in [None, *MODERN_FORMATS]
+    for spec in get_srcset_specs(aspect_ratio, image_format)
+    if spec not in BASE_RENDITION_SPECS
+]
+
+# Every spec used by the API, generated by the generate_renditions command
+API_RENDITION_SPECS = BASE_RENDITION_SPECS + SRCSET_RENDITION_SPECS
+
+
+def generate_renditions(image, specs=None):
+    """Create any missing renditions of image for specs. Returns the renditions by spec"""
+    return image.get_renditions(*(specs or API_RENDITION_SPECS))
+
+
+def generate_renditions_for_ids(image_ids, specs=None):
+    """Generate renditions for a batch of image ids. Run in the command's worker
+    processes, so it loads the images itself. Returns the number of images processed
+    """
+    close_old_connections()
+    count = 0
+    for image in get_image_model().objects.filter(pk__in=image_ids):
+        generate_renditions(image, specs)
+        count += 1
+    close_old_connections()
+    return count
+
+
+class RenditionMemo:
+    """Per request store of images with their API renditions attached.
+
+    prefetch() loads many images in one query and their API renditions from wagtail's
+    rendition cache, with one more query for any not cached. Images that were not
+    prefetched are handled the same way on first use, so an image costs at most one
+    query however many specs are used.
+    """
+
+    def __init__(self, specs=None):
+        self.specs = specs or API_RENDITION_SPECS
+        self.images = {}
+        self.attrs = {}
+
+    def _load_renditions(self, images):
+        Rendition = get_image_model().get_rendition_model()
+        filters = [Filter(spec) for spec in self.specs]
+        images_by_pk = {image.pk: image for image in images}
+        found = {pk: [] for pk in images_by_pk}
+        cache_keys = {}
+        for image in images:
+            for f in filters:
+                key = Rendition.construct_cache_key(
+                    image, f.get_cache_key(image), f.spec
+                )
+                cache_keys[key] = image.pk
+        for key, rendition in Rendition.cache_backend.get_many(cache_keys).items():
+            found[cache_keys[key]].append(rendition)
+        missing = [
+            pk for pk, renditions in found.items() if len(renditions) < len(filters)
+        ]
+        if missing:
+            renditions = Rendition.objects.filter(
+                image_id__in=missing, filter_spec__in=self.specs
+            )
+            cache_additions = {}
+            for rendition in renditions:
+                found[rendition.image_id].append(rendition)
+                image = images_by_pk[rendition.image_id]
+                rendition.image = image
+                cache_additions[
+                    Rendition.construct_cache_key(
+                        image, rendition.focal_point_key, rendition.filter_spec
+                    )
+                ] = rendition
+            Rendition.cache_backend.set_many(cache_additions)
+        for image in images:
+            for rendition in found[image.pk]:
+                rendition.image = image
+            # Used by image.get_rendition() instead of querying
+            image.prefetched_renditions = found[image.pk]
+            self.images[image.pk] = image
+
+    def prefetch(self, image_ids, loaded=None):
+        """Load renditions for image_ids. loaded maps ids to images already in memory"""
+        loaded = loaded or {}
+        ids = set(image_ids) - set(self.images)
+        images = [loaded[pk] for pk in ids if pk in loaded]
+        to_fetch = [pk for pk in ids if pk not in loaded]
+        if to_fetch:
+            images += list(get_image_model().objects.filter(pk__in=to_fetch))
+        if images:
+            self._load_renditions(images)
+
+    def has_rendition(self, image, spec):
+        """Whether the spec rendition of image exists, without creating it"""
+        if image.pk not in self.images:
+            self._load_renditions([image])
+        return any(
+            rendition.filter_spec == spec
+            for rendition in self.images[image.pk].prefetched_renditions
+        )
+
+    def get_attrs(self, image, spec):
+        key = (image.pk, spec)
+        if key not in self.attrs:
+            if image.pk not in self.images:
+                self._load_renditions([image])
+            self.attrs[key] = self.images[image.pk].get_rendition(spec).attrs_dict
+        return self.attrs[key]
+
+
+def get_rendition_memo(context):
+    """Return the RenditionMemo for the request in a serializer context, creating it on
+    first use. Without a request a new memo is returned"""
+    request = context.get("request") if context else None
+    if request is None:
+        return RenditionMemo()
+    memo = getattr(request, "_rendition_memo", None)
+    if memo is None:
+        memo = RenditionMemo()
+        request._rendition_memo = memo
+    return memo
+
+
+def get_rendition_attrs(image, spec, context=None):
+    """attrs_dict of the spec rendition of image, through the request's RenditionMemo"""
+    return get_rendition_memo(context).get_attrs(image, spec)
+
+
+def get_responsive_attrs(image, aspect_ratio, context=None):
+    """srcset ladder of image in its original format plus a source per modern format,
+    ready for a <picture> element. Widths are the real rendition widths, as small
+    images are not upscaled.
+
+    Only existing renditions are used, so requests never encode the ladders. A ladder
+    is left out until all its renditions are generated, and an empty dict is returned
+    until the original format's ladder is.
+    """
+    memo = get_rendition_memo(context)
+
+    def srcset(image_format=None):
+        specs = get_srcset_specs(aspect_ratio, image_format)
+        if not all(memo.has_rendition(image, spec) for spec in specs):
+            return None
+        widths = {}
+        for spec in specs:
+            attrs = memo.get_attrs(image, spec)
+            widths.setdefault(attrs["width"], attrs["src"])
+        return ", ".join(f"{src} {width}w" for width, src in widths.items())
+
+    original = srcset()
+    if original is None:
+        return {}
+    sources = [
+        {"type": mime_type, "srcset": srcset(image_format)}
+        for image_format, mime_type in MODERN_FORMATS.items()
+    ]
+    return {
+        "srcset": original,
+        "sources": [source for source in sources if source["srcset"] is not None],
+    }
+
+
+def _is_own_field(field):
+    # Skip the fields wagtail defines on Page itself (owner, revisions etc.)
+    return field.model._meta.app_label != "wagtailcore"
+
+
+def _image_fields(model):
+    image_model = get_image_model()
+    return [
+        f
+        for f in model._meta.concrete_fields
+        if f.is_relation and f.related_model is image_model
+    ]
+
+
+def _hop_fields(model):
+    """Foreign keys to models that themselves have image foreign keys"""
+    return [
+        f
+        for f in model._meta.concrete_fields
+        if f.many_to_one and _is_own_field(f) and _image_fields(f.related_model)
+    ]
+
+
+def _stream_images(block, value):
+    if isinstance(block, ImageChooserBlock):
+        return [value] if value else []
+    images = []
+    if isinstance(block, blocks.StreamBlock):
+        for child in value:
+            images += _stream_images(child.block, child.value)
+    elif isinstance(block, blocks.ListBlock):
+        for child in value:
+            images += _stream_images(block.child_block, child)
+    elif isinstance(block, blocks.StructBlock):
+        for name, child_block in block.child_blocks.items():
+            images += _stream_images(child_block, value.get(name))
+    return images
+
+
+class PageImages:
+    """The images a serialized page is likely to use.
+
+    Covers image fields and stream fields on the page, its orderables, and one foreign
+    key hop from either (eg. a related staff member's profile image). Orderables and
+    hop objects are loaded once and kept on the page, so the serializers reuse them.
+    """
+
+    def __init__(self, page):
+        self.image_ids = set()
+        # Images already in memory, eg. loaded by a stream field
+        self.loaded = {}
+        # (instance, image foreign key) pairs, filled in once the images are loaded
+        self.image_refs = []
+        self.hops = {}
+        self._add_instance(page)
+        for field in page._meta.concrete_fields:
+            if isinstance(field, StreamField) and _is_own_field(field):
+                value = getattr(page, field.attname)
+                for image in _stream_images(field.stream_block, value):
+                    self.image_ids.add(image.pk)
+                    self.loaded[image.pk] = image
+        for relation in get_all_child_relations(page):
+            if not _is_own_field(relation.field):
+                continue
+            # get_object_list keeps the children on the page for later .all() calls
+            manager = getattr(page, relation.get_accessor_name())
+            for child in manager.get_object_list():
+                self._add_instance(child)
+        self._load_hops()
+
+    def _add_instance(self, instance, hop=True):
+        for field in _image_fields(type(instance)):
+            image_id = getattr(instance, field.attname)
+            if not image_id:
+                continue
+            self.image_ids.add(image_id)
+            if field.is_cached(instance):
+                self.loaded[image_id] = field.get_cached_value(instance)
+            else:
+                self.image_refs.append((instance, field))
+        if not hop:
+            return
+        for field in _hop_fields(type(instance)):
+            if not getattr(instance, field.attname):
+                continue
+            if field.is_cached(instance):
+                self._add_instance(field.get_cached_value(instance), hop=False)
+            else:
+                refs = self.hops.setdefault(field.related_model, {})
+                refs.setdefault(getattr(instance, field.attname), []).append(
+                    (instance, field)
+                )
+
+    def _load_hops(self):
+        for model, refs in self.hops.items():
+            for obj in model._default_manager.filter(pk__in=refs):
+                for instance, field in refs[obj.pk]:
+                    field.set_cached_value(instance, obj)
+                self._add_instance(obj, hop=False)
+
+    def set_images(self, images):
+        for instance, field in self.image_refs:
+            image = images.get(getattr(instance, field.attname))
+            if image is not None:
+                field.set_cached_value(instance, image)
+
+
+def prefetch_page_renditions(page, request):
+    """Prefetch the API renditions of every image used by page into the request memo"""
+    memo = get_rendition_memo({"request": request})
+    page_images = PageImages(page)
+    memo.prefetch(page_images.image_ids, page_images.loaded)
+    page_images.set_images(memo.images)
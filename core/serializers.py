@@ -1,4 +1,5 @@
 from rest_framework.fields import Field
+from core.renditions import get_rendition_attrs, get_responsive_attrs
 
 
 class HeaderImageFieldSerializer(Field):
@@ -6,8 +7,9 @@ class HeaderImageFieldSerializer(Field):
         return {
             "id": value.id,
             "title": value.title,
-            "original": value.get_rendition("original").attrs_dict,
-            "medium": value.get_rendition("fill-1024x640").attrs_dict,
-            "thumbnail": value.get_rendition("fill-560x350").attrs_dict,
+            "original": get_rendition_attrs(value, "original", self.context),
+            "medium": get_rendition_attrs(value, "fill-1024x640", self.context),
+            "thumbnail": get_rendition_attrs(value, "fill-560x350", self.context),
             "alt": value.title,
+            **get_responsive_attrs(value, "landscape", self.context),
         }
@@ -0,0 +1,88 @@
+import logging
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from wagtail.images import get_image_model
+from wagtail.models import Page
+from wagtail.signals import page_published, page_unpublished, post_page_move
+
+from .api_cache import (
+    API_CACHE_DEPENDENCIES,
+    API_VERSIONED_MODELS,
+    invalidate_api_cache,
+    invalidate_models,
+    invalidate_pages,
+)
+from .dependencies import (
+    get_dependent_page_ids,
+    get_instance_dependent_page_ids,
+    update_page_dependencies,
+)
+from .renditions import BASE_RENDITION_SPECS, generate_renditions
+
+logger = logging.getLogger(__name__)
+
+
+def _generate_renditions_or_log(image):
+    try:
+        generate_renditions(image, BASE_RENDITION_SPECS)
+    except OSError:
+        # Not fatal, the generate_renditions command or the first request will retry
+        logger.exception(f"Could not generate API renditions for image {image.pk}")
+
+
+@receiver(post_save, sender=get_image_model())
+def generate_api_renditions_on_save(sender, instance, *args, **kwargs):
+    """Pre-generate the base API renditions once the image is committed, so the first
+    API request that uses it does not have to resize it. The srcset renditions are left
+    to the generate_renditions command"""
+    transaction.on_commit(lambda: _generate_renditions_or_log(instance))
+
+
+@receiver(page_published)
+def update_dependencies_on_publish(sender, instance, **kwargs):
+    update_page_dependencies(instance)
+    invalidate_pages({instance.pk} | get_dependent_page_ids(Page, [instance.pk]))
+
+
+@receiver(page_unpublished)
+def invalidate_api_cache_on_unpublish(sender, instance, **kwargs):
+    invalidate_pages({instance.pk} | get_dependent_page_ids(Page, [instance.pk]))
+
+
+@receiver(post_page_move)
+def invalidate_api_cache_on_move(sender, **kwargs):
+    # The urls of the page and all its descendants change, along with every page
+    # linking to them
+    invalidate_api_cache()
+
+
+def invalidate_dependent_pages(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: invalidate_pages(get_instance_dependent_page_ids(instance))
+    )
+
+
+for model in [*API_CACHE_DEPENDENCIES, get_image_model()]:
+    post_save.connect(invalidate_dependent_pages, sender=model)
+    post_delete.connect(invalidate_dependent_pages, sender=model)
+
+
+def invalidate_model_version(sender, **kwargs):
+    label = sender._meta.label
+    transaction.on_commit(lambda: invalidate_models([label]))
+
+
+for model in API_VERSIONED_MODELS:
+    post_save.connect(invalidate_model_version, sender=model)
+    post_delete.connect(invalidate_model_version, sender=model)
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def invalidate_user_version_on_group_change(sender, action, **kwargs):
+    if not action.startswith("post_"):
+        return
+    label = get_user_model()._meta.label
+    transaction.on_commit(lambda: invalidate_models([label]))
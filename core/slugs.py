@@ -0,0 +1,39 @@
+from django.db import IntegrityError, transaction
+
+
+def allocate_unique_slug(instance, slug, field="slug"):
+    """slug, or slug-1, slug-2... whichever is first not used by another row of
+    instance's model. Fetches the colliding slugs in one query"""
+    taken = set(
+        type(instance)
+        ._default_manager.filter(**{f"{field}__startswith": slug})
+        .exclude(pk=instance.pk)
+        .values_list(field, flat=True)
+    )
+    unique_slug = slug
+    counter = 1
+    while unique_slug in taken:
+        unique_slug = f"{slug}-{counter}"
+        counter += 1
+    return unique_slug
+
+
+def save_with_unique_slug(
+    instance, get_slug, save, *args, attempts=3, field="slug", **kwargs
+):
+    """Set instance's slug field from get_slug() and save. If a concurrent save takes
+    the slug first the unique constraint fails, and the slug is allocated again"""
+    for attempt in range(attempts):
+        setattr(instance, field, get_slug())
+        try:
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            taken = (
+                type(instance)
+                ._default_manager.filter(**{field: getattr(instance, field)})
+                .exclude(pk=instance.pk)
+                .exists()
+            )
+            if not taken or attempt == attempts - 1:
+                raise
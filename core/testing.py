@@ -0,0 +1,24 @@
+import json
+
+from .query_budget import QueryRecorder
+
+
+class QueryBudgetTestMixin:
+    """TestCase mixin checking page API responses against the api_query_budget of
+    their page type"""
+
+    def assertWithinQueryBudget(self, url, **extra):
+        """GET url and fail if the page served has no budget or goes over it. Returns
+        the query report. Responses served from the API cache make no queries, so
+        clear or disable it first"""
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        report = recorder.report()
+        self.assertIsNotNone(
+            report["budget"], f"{report['page_type']} has no api_query_budget"
+        )
+        if report["over_budget"]:
+            self.fail(f"Query budget exceeded:\n{json.dumps(report, indent=2)}")
+        return report
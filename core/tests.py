@@ -1,3 +1,696 @@
-from django.test import TestCase
+import gzip
+import json
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.contenttypes.models import ContentType
+from django.core import mail
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import connection
+from django.test import (
+    AsyncRequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.utils import timezone
+from wagtail.images import get_image_model
+from wagtail.models import Page, Site
+from wagtail.rich_text import RichText
+from wagtail.images.tests.utils import get_test_image_file
+
+from core.renditions import (
+    API_RENDITION_SPECS,
+    BASE_RENDITION_SPECS,
+    RenditionMemo,
+    get_responsive_attrs,
+    get_srcset_specs,
+    PageImages,
+    generate_renditions,
+)
+from core.async_views import run_sync
+from core.db_pool import ConnectionPool, PoolTimeout, connection_checked_out
+from core.models import Language, OutboxEmail, PageDependency
+from core.outbox import OutboxWorker, enqueue_email
+from core.throttles import LOCK_TIMEOUT, TokenBucket
+from core.query_budget import QueryRecorder
+from core.testing import QueryBudgetTestMixin
+from home.models import HomePage
+from lessons.models import LessonCategory, LessonDetailPage
+from products.models import (
+    ClassPricesDetailPage,
+    ClassPricesListPage,
+    ProductService,
+)
+from products.testing import create_price, create_product_service, create_tax
+from singles.models import PrivacyPage
+from taxes.models import Tax
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenditionPregenerationTests(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Wagtail caches renditions by image id, which is reused between tests
+        cache.clear()
+
+    def create_image(self):
+        return get_image_model().objects.create(
+            title="Test", file=get_test_image_file(size=(1600, 1800))
+        )
+
+    def test_renditions_are_generated_on_image_save(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = self.create_image()
+        self.assertEqual(image.renditions.count(), len(BASE_RENDITION_SPECS))
+
+    def test_responsive_attrs_wait_for_generated_renditions(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            image = self.create_image()
+        self.assertEqual(get_responsive_attrs(image, "landscape"), {})
+        self.assertEqual(image.renditions.count(), len(BASE_RENDITION_SPECS))
+        generate_renditions(image, get_srcset_specs("landscape"))
+        image = get_image_model().objects.get(pk=image.pk)
+        attrs = get_responsive_attrs(image, "landscape")
+        self.assertTrue(attrs["srcset"].endswith(" 1600w"))
+        self.assertEqual(attrs["sources"], [])
+
+    def test_generate_renditions_command(self):
+        image = self.create_image()
+        self.assertEqual(image.renditions.count(), 0)
+        out = StringIO()
+        call_command("generate_renditions", workers=0, stdout=out)
+        self.assertEqual(image.renditions.count(), len(API_RENDITION_SPECS))
+        self.assertIn("for 1 image(s)", out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RenditionMemoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # Renditions cached by an earlier test's image with a reused id would be found
+        # instead of generated
+        cache.clear()
+        cls.images = []
+        for i in range(3):
+            image = get_image_model().objects.create(
+                title=f"Test {i}", file=get_test_image_file(size=(1600, 1800))
+            )
+            generate_renditions(image)
+            cls.images.append(image)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_prefetched_images_need_no_queries(self):
+        memo = RenditionMemo()
+        with self.assertNumQueries(2):
+            # images, then renditions as they are not in the rendition cache yet
+            memo.prefetch([image.id for image in self.images])
+        with self.assertNumQueries(0):
+            for image in self.images:
+                memo.get_attrs(image, "original")
+                memo.get_attrs(image, "fill-560x350")
+
+    def test_image_not_prefetched_costs_one_query(self):
+        memo = RenditionMemo()
+        image = get_image_model().objects.get(pk=self.images[0].pk)
+        with self.assertNumQueries(1):
+            memo.get_attrs(image, "original")
+            memo.get_attrs(image, "fill-1024x640")
+            memo.get_attrs(image, "fill-560x350")
+
+    def test_page_images(self):
+        page = LessonDetailPage(
+            title="Lesson",
+            header_image=self.images[0],
+            lesson_content=[
+                ("full_width_img", {"image": self.images[1]}),
+                ("text_width_img", {"image": self.images[2]}),
+            ],
+        )
+        self.assertEqual(
+            PageImages(page).image_ids, {image.id for image in self.images}
+        )
+
+    def test_responsive_attrs(self):
+        attrs = get_responsive_attrs(self.images[0], "landscape")
+        self.assertEqual(len(attrs["srcset"].split(", ")), 3)
+        self.assertTrue(attrs["srcset"].endswith(" 1600w"))
+        self.assertEqual(
+            [source["type"] for source in attrs["sources"]],
+            ["image/avif", "image/webp"],
+        )
+        self.assertIn(".avif 1600w", attrs["sources"][0]["srcset"])
+        self.assertIn(".webp 560w", attrs["sources"][1]["srcset"])
+
+
+@override_settings(API_CACHE_TIMEOUT=60)
+class PageAPICacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        root = Site.objects.get(is_default_site=True).root_page
+        self.page = root.add_child(
+            instance=PrivacyPage(
+                title="Privacy", display_title="Privacy", content="<p>Old</p>"
+            )
+        )
+        self.url = f"/api/v2/pages/{self.page.id}/"
+
+    def test_response_is_cached(self):
+        response = self.client.get(self.url)
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(response.json(), cached.json())
+
+    def test_publish_invalidates(self):
+        self.client.get(self.url)
+        self.page.content = "<p>New</p>"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.save_revision().publish()
+        self.assertIn("New", self.client.get(self.url).json()["content"])
+
+    def test_unrelated_model_save_keeps_cache(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_tax()
+        with self.assertNumQueries(0):
+            self.client.get(self.url)
+
+    def test_draft_bypasses_cache(self):
+        self.client.get(self.url)
+        self.page.content = "<p>Draft</p>"
+        self.page.save_revision()
+        response = self.client.get(self.url, {"draft": "true"})
+        self.assertIn("Draft", response.json()["content"])
+        self.assertIn("Old", self.client.get(self.url).json()["content"])
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(self.url).headers["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.page.content = "<p>New</p>"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.save_revision().publish()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_draft_has_no_validators(self):
+        response = self.client.get(self.url, {"draft": "true"})
+        self.assertNotIn("ETag", response.headers)
+
+
+class ModelVersionConditionTests(TestCase):
+    url = "/api/v2/lesson-categories/"
+
+    def setUp(self):
+        cache.clear()
+
+    def test_model_save_changes_validators(self):
+        response = self.client.get(self.url)
+        etag = response.headers["ETag"]
+        self.assertIn("Last-Modified", response.headers)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            LessonCategory.objects.create(name="Grammar", ja_name="文法", slug="grammar")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, API_CACHE_TIMEOUT=60)
+class PageDependencyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tax = create_tax()
+        self.product_service = create_product_service(self.tax)
+        image = get_image_model().objects.create(
+            title="Header", file=get_test_image_file()
+        )
+        root = Site.objects.get(is_default_site=True).root_page
+        self.page = root.add_child(
+            instance=ClassPricesDetailPage(
+                title="Private Lesson",
+                class_service=self.product_service,
+                display_title="Private",
+                display_tagline="Private lessons",
+                header_image=image,
+                class_intro=[("rich_text", RichText("<p>Intro</p>"))],
+            )
+        )
+        self.page.save_revision().publish()
+        self.url = f"/api/v2/pages/{self.page.id}/"
+
+    def dependencies(self):
+        return {
+            (d.content_type.model_class(), d.object_id)
+            for d in PageDependency.objects.filter(page=self.page)
+        }
+
+    def test_dependencies_recorded_on_publish(self):
+        dependencies = self.dependencies()
+        self.assertIn((ProductService, str(self.product_service.pk)), dependencies)
+        self.assertIn((Tax, str(self.tax.pk)), dependencies)
+        self.assertIn((get_image_model(), str(self.page.header_image_id)), dependencies)
+
+    def test_price_change_invalidates_dependent_page_only(self):
+        root = Site.objects.get(is_default_site=True).root_page
+        other_page = root.add_child(
+            instance=PrivacyPage(
+                title="Privacy", display_title="Privacy", content="<p>Privacy</p>"
+            )
+        )
+        other_page.save_revision().publish()
+        other_url = f"/api/v2/pages/{other_page.id}/"
+        self.client.get(self.url)
+        self.client.get(other_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            create_price(self.product_service, "5000", timezone.now())
+        response = self.client.get(self.url)
+        self.assertEqual(
+            response.json()["class_service"]["price_info"]["posttax_price"], "5500"
+        )
+        # Still served from the cache
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(other_url).status_code, 200)
+
+
+class PrebakeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.output = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output, ignore_errors=True)
+        root = Site.objects.get(is_default_site=True).root_page
+        self.page = root.add_child(
+            instance=PrivacyPage(
+                title="Privacy", display_title="Privacy", content="<p>Old</p>"
+            )
+        )
+
+    def prebake(self):
+        out = StringIO()
+        call_command("prebake_api", output=self.output, host="testserver", stdout=out)
+        return out.getvalue()
+
+    def read(self, name):
+        with gzip.open(f"{self.output}/{name}") as f:
+            return json.load(f)
+
+    def test_export_is_incremental(self):
+        self.prebake()
+        entry = self.read("index.json.gz")["pages"][str(self.page.pk)]
+        self.assertEqual(self.read(entry["file"])["content"], "<p>Old</p>")
+        self.assertIn("0 page(s)", self.prebake())
+
+        self.page.content = "<p>New</p>"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.save_revision().publish()
+        self.assertIn("Exported 1 page(s)", self.prebake())
+        self.assertEqual(self.read(entry["file"])["content"], "<p>New</p>")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.unpublish()
+        self.assertIn("1 removed", self.prebake())
+        self.assertNotIn(str(self.page.pk), self.read("index.json.gz")["pages"])
+
+    def test_changes_are_read_from_the_database(self):
+        language = Language.objects.create(name_en="English", slug="english")
+        PageDependency.objects.create(
+            page=self.page,
+            content_type=ContentType.objects.get_for_model(Language),
+            object_id=str(language.pk),
+        )
+        self.prebake()
+        # Nothing is lost with the cache, eg. a restart
+        cache.clear()
+        self.assertIn("Exported 0 page(s)", self.prebake())
+
+        language.name_en = "British English"
+        language.save()
+        self.assertIn("Exported 1 page(s)", self.prebake())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, API_CACHE_TIMEOUT=0)
+class QueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    # The most price plans the admin allows per section
+    plan_count = 8
+
+    @classmethod
+    def setUpTestData(cls):
+        cache.clear()
+        now = timezone.now()
+        tax = create_tax()
+        image = get_image_model().objects.create(
+            title="Header", file=get_test_image_file()
+        )
+        generate_renditions(image)
+        tree_root = Page.get_first_root_node()
+        cls.home = tree_root.add_child(
+            instance=HomePage(
+                title="Home",
+                slug="test-home",
+                why_image=image,
+                why_content="<p>Why</p>",
+                **{
+                    f"{section}_{lang}_title": section.title()
+                    for section in [
+                        "why",
+                        "service",
+                        "testimonial",
+                        "price",
+                        "teacher",
+                        "bloglesson",
+                    ]
+                    for lang in ["en", "jp"]
+                },
+            )
+        )
+        site = Site.objects.get(is_default_site=True)
+        site.root_page = cls.home
+        site.save()
+        cls.list_page = cls.home.add_child(
+            instance=ClassPricesListPage(
+                title="Prices",
+                display_title="Prices",
+                private_en_title="Private",
+                private_jp_title="Private",
+                private_intro="<p>Private</p>",
+                regular_en_title="Regular",
+                regular_jp_title="Regular",
+                regular_intro="<p>Regular</p>",
+            )
+        )
+        for i in range(cls.plan_count):
+            product_service = create_product_service(tax, name=f"Class {i}")
+            create_price(product_service, "5000", now)
+            plan = cls.list_page.add_child(
+                instance=ClassPricesDetailPage(
+                    title=f"Class {i}",
+                    class_service=product_service,
+                    display_title=f"Class {i}",
+                    display_tagline="Class",
+                    header_image=image,
+                    class_intro=[("rich_text", RichText("<p>Intro</p>"))],
+                )
+            )
+            cls.home.home_class_prices.create(class_price=plan)
+            cls.list_page.private_price_plans.create(price_plan=plan)
+            cls.list_page.regular_price_plans.create(price_plan=plan)
+        cls.home.save_revision().publish()
+        cls.list_page.save_revision().publish()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_home_page(self):
+        self.assertWithinQueryBudget(f"/api/v2/pages/{self.home.id}/")
+
+    def test_class_prices_list_page(self):
+        self.assertWithinQueryBudget(f"/api/v2/pages/{self.list_page.id}/")
+
+    def test_listing_loads_requested_relations(self):
+        recorder = QueryRecorder()
+        with recorder.record():
+            response = self.client.get(
+                "/api/v2/pages/",
+                {"type": "products.ClassPricesDetailPage", "fields": "class_service"},
+            )
+        self.assertEqual(len(response.json()["items"]), self.plan_count)
+        duplicates = [d["sql"] for d in recorder.report()["duplicates"]]
+        self.assertFalse([sql for sql in duplicates if "products_" in sql])
+
+    @override_settings(API_QUERY_LOGGING=True)
+    def test_middleware_logs_report(self):
+        with self.assertLogs("core.query_budget", "INFO") as logs:
+            self.client.get(f"/api/v2/pages/{self.home.id}/")
+        report = json.loads(logs.records[0].getMessage())
+        self.assertEqual(report["page_type"], "home.HomePage")
+        self.assertIn("home_class_prices", report["fields"])
+        self.assertFalse(report["over_budget"])
+
+
+class OutboxTests(TestCase):
+    def setUp(self):
+        for i in range(3):
+            enqueue_email(
+                f"Subject {i}", "Body", "from@example.com", ["to@example.com"]
+            )
+        self.now = timezone.now()
+        self.worker = OutboxWorker(
+            max_attempts=3, base_delay=60, clock=lambda: self.now
+        )
+
+    def test_enqueue_does_not_send(self):
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.PENDING).count(), 3
+        )
+
+    def test_sends_batch_over_one_connection(self):
+        with mock.patch("core.outbox.get_connection", wraps=mail.get_connection) as get:
+            self.assertEqual(self.worker.run_once(), 3)
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].to, ["to@example.com"])
+        self.assertFalse(
+            OutboxEmail.objects.exclude(status=OutboxEmail.Status.SENT).exists()
+        )
+        self.assertEqual(self.worker.run_once(), 0)
+
+    def test_failures_retry_with_backoff(self):
+        with mock.patch("core.outbox.EmailMessage.send", side_effect=OSError("down")):
+            self.assertEqual(self.worker.run_once(), 0)
+            email = OutboxEmail.objects.first()
+            self.assertEqual(email.attempts, 1)
+            self.assertEqual(email.last_error, "down")
+            self.assertEqual(email.next_attempt_at, self.now + timedelta(seconds=60))
+            # Not due yet
+            self.assertEqual(self.worker.run_once(), 0)
+            self.assertEqual(OutboxEmail.objects.first().attempts, 1)
+
+            self.now += timedelta(seconds=60)
+            self.worker.run_once()
+            email = OutboxEmail.objects.first()
+            self.assertEqual(email.next_attempt_at, self.now + timedelta(seconds=120))
+
+            self.now += timedelta(seconds=120)
+            self.worker.run_once()
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.FAILED).count(), 3
+        )
+
+    def test_claimed_before_sending(self):
+        statuses = []
+
+        def send(message):
+            statuses.append(set(OutboxEmail.objects.values_list("status", flat=True)))
+
+        with mock.patch("core.outbox.EmailMessage.send", send):
+            self.worker.run_once()
+        self.assertEqual(statuses, [{OutboxEmail.Status.SENDING}] * 3)
+        self.assertEqual(
+            set(OutboxEmail.objects.values_list("modified", flat=True)), {self.now}
+        )
+
+    def test_abandoned_claims_are_retried(self):
+        self.worker.claim(self.now)
+        self.assertEqual(self.worker.run_once(), 0)
+        self.now += timedelta(seconds=self.worker.claim_timeout)
+        self.assertEqual(self.worker.run_once(), 3)
+
+    def test_abandoned_claims_count_as_attempts(self):
+        for _ in range(self.worker.max_attempts):
+            self.worker.claim(self.now)
+            self.now += timedelta(seconds=self.worker.claim_timeout)
+        self.assertEqual(self.worker.run_once(), 0)
+        self.assertEqual(
+            OutboxEmail.objects.filter(status=OutboxEmail.Status.FAILED).count(), 3
+        )
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_command_sends_queue(self):
+        out = StringIO()
+        call_command("send_outbox", batch_size=2, stdout=out)
+        self.assertEqual(out.getvalue().strip(), "Sent 3 email(s)")
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(API_SYNC_THREADS=0)
+    async def test_async_views_under_asgi(self):
+        response = await self.async_client.get("/api/v2/lesson-categories/")
+        self.assertEqual(response.status_code, 200)
+        response = await self.async_client.get(
+            "/api/v2/lesson-categories/",
+            headers={"If-None-Match": response.headers["ETag"]},
+        )
+        self.assertEqual(response.status_code, 304)
+        root = await Page.objects.aget(depth=1)
+        response = await self.async_client.get(f"/api/v2/pages/{root.id}/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_run_sync_uses_pool_under_asgi(self):
+        def get_thread_name():
+            return threading.current_thread().name
+
+        request = AsyncRequestFactory().get("/")
+        self.assertTrue(
+            (await run_sync(request, get_thread_name)).startswith("api-sync")
+        )
+        with override_settings(API_SYNC_THREADS=0):
+            self.assertFalse(
+                (await run_sync(request, get_thread_name)).startswith("api-sync")
+            )
+
+    async def test_pool_queries_are_recorded(self):
+        def query():
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+
+        request = AsyncRequestFactory().get("/")
+        recorder = QueryRecorder()
+        with recorder.record():
+            await run_sync(request, query)
+        self.assertEqual([sql for _, sql, _ in recorder.queries], ["SELECT 1"])
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.now = 0
+        self.pool = ConnectionPool(
+            lambda: sqlite3.connect(":memory:", check_same_thread=False),
+            max_size=2,
+            max_age=600,
+            timeout=0,
+            health_check=lambda conn: conn.execute("SELECT 1"),
+            health_check_after=30,
+            clock=lambda: self.now,
+        )
+
+    def test_connections_are_reused(self):
+        first = self.pool.checkout()
+        self.pool.checkin(first)
+        self.assertIs(self.pool.checkout(), first)
+        self.assertEqual(self.pool.stats["opened"], 1)
+
+    def test_old_connections_are_replaced(self):
+        first = self.pool.checkout()
+        self.now = 600
+        self.pool.checkin(first)
+        self.assertIsNot(self.pool.checkout(), first)
+        self.assertEqual(self.pool.stats["discarded"], 1)
+        self.assertEqual(self.pool.size, 1)
+
+    def test_failed_health_check_replaces_connection(self):
+        first = self.pool.checkout()
+        self.pool.checkin(first)
+        first.close()
+        # Not checked until idle for health_check_after
+        self.now = 30
+        second = self.pool.checkout()
+        self.assertIsNot(second, first)
+        second.execute("SELECT 1")
+        self.assertEqual(self.pool.size, 1)
+
+    def test_broken_connections_are_discarded(self):
+        first = self.pool.checkout()
+        self.pool.checkin(first, broken=True)
+        self.assertEqual(self.pool.size, 0)
+        self.assertIsNot(self.pool.checkout(), first)
+
+    def test_full_pool_times_out_and_reports_waits(self):
+        waits = []
+
+        def receiver(sender, pool, wait, waited, opened, **kwargs):
+            waits.append((waited, opened))
+
+        connection_checked_out.connect(receiver)
+        self.addCleanup(connection_checked_out.disconnect, receiver)
+        first = self.pool.checkout()
+        self.pool.checkout()
+        with self.assertRaises(PoolTimeout):
+            self.pool.checkout()
+
+        self.pool.timeout = 5
+        thread = threading.Timer(0.05, self.pool.checkin, [first])
+        thread.start()
+        self.assertIs(self.pool.checkout(), first)
+        thread.join()
+        self.assertEqual(waits, [(False, True), (False, True), (True, False)])
+        self.assertEqual(self.pool.stats["waits"], 1)
+
+
+class SlowCache(LocMemCache):
+    """Cache with a slow get, widening the window between reading and writing a
+    bucket as a remote cache would"""
+
+    def get(self, *args, **kwargs):
+        value = super().get(*args, **kwargs)
+        time.sleep(0.005)
+        return value
+
+
+class TokenBucketTests(SimpleTestCase):
+    def test_concurrent_requests_take_at_most_capacity(self):
+        bucket = TokenBucket(5, 5 / 3600, cache=SlowCache("buckets", {}))
+        barrier = threading.Barrier(20)
+
+        def consume():
+            barrier.wait()
+            return bucket.consume("key")
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            results = list(executor.map(lambda _: consume(), range(20)))
+        # Requests that found the bucket locked were rejected without taking a token
+        taken = results.count(0)
+        while bucket.consume("key") == 0:
+            taken += 1
+        self.assertEqual(taken, 5)
+
+    def test_locked_buckets_reject_at_once(self):
+        cache = LocMemCache("locked", {})
+        bucket = TokenBucket(5, 5 / 3600, cache=cache)
+        token = bucket.lock("key")
+        self.assertEqual(bucket.consume("key"), LOCK_TIMEOUT)
+        bucket.unlock("key", token)
+        self.assertEqual(bucket.consume("key"), 0)
+
+    def test_expired_locks_taken_by_others_are_kept(self):
+        cache = LocMemCache("expired", {})
+        bucket = TokenBucket(5, 5 / 3600, cache=cache)
+        token = bucket.lock("key")
+        # The lock expired and another request took it
+        cache.set("key:lock", "other")
+        bucket.unlock("key", token)
+        self.assertEqual(cache.get("key:lock"), "other")
+
+    def test_tokens_refill(self):
+        now = [0]
+        bucket = TokenBucket(
+            2, 1 / 60, cache=LocMemCache("refill", {}), timer=lambda: now[0]
+        )
+        self.assertEqual([bucket.consume("key") for _ in range(2)], [0, 0])
+        self.assertEqual(bucket.consume("key"), 60)
+        now[0] = 60
+        self.assertEqual(bucket.consume("key"), 0)
@@ -0,0 +1,165 @@
+import hashlib
+import math
+import time
+import uuid
+
+from django.core.cache import cache as default_cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .custom_permissions import get_client_ip
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+# Keys remembered as empty by a bucket before it forgets them all
+MAX_BLOCKED_KEYS = 10000
+# Seconds a bucket's lock is held at most, in case its holder dies, and the wait
+# returned to requests that find it taken
+LOCK_TIMEOUT = 1
+
+
+def parse_rate(rate):
+    """(capacity, seconds) of a DRF rate string, eg. 10/hour is (10, 3600)"""
+    num, period = rate.split("/")
+    return int(num), PERIODS[period[0]]
+
+
+class TokenBucket:
+    """
+    Token buckets of capacity tokens, each refilled at refill_rate
+    tokens a second and stored in the cache so all workers share them.
+
+    A bucket is read and written under a lock taken with cache.add, so
+    concurrent requests from any worker each see the tokens left by the
+    last. A request that finds the lock taken is rejected at once rather
+    than waiting for it, as only requests for the same key contend.
+
+    Keys found empty are also remembered in a local dict until their
+    next token is due, so repeat rejections never touch the cache.
+    The dict is only read and replaced, not locked, as a race at worst
+    lets one extra request through to the shared bucket.
+    """
+
+    def __init__(
+        self,
+        capacity,
+        refill_rate,
+        cache=default_cache,
+        timer=time.time,
+    ):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.cache = cache
+        self.timer = timer
+        self.timeout = math.ceil(capacity / refill_rate)
+        self.blocked = {}
+
+    def lock(self, key):
+        """Take key's lock, returning the token it holds, or None if it is taken"""
+        token = uuid.uuid4().hex
+        if self.cache.add(f"{key}:lock", token, LOCK_TIMEOUT):
+            return token
+        return None
+
+    def unlock(self, key, token):
+        """Release key's lock if it still holds token, not if it expired and was taken
+        by another request"""
+        if self.cache.get(f"{key}:lock") == token:
+            self.cache.delete(f"{key}:lock")
+
+    def consume(self, key):
+        """Take a token from key's bucket. Returns 0 if one was taken,
+        else the seconds until one is due"""
+        now = self.timer()
+        blocked_until = self.blocked.get(key)
+        if blocked_until is not None:
+            if now < blocked_until:
+                return blocked_until - now
+            self.blocked.pop(key, None)
+
+        token = self.lock(key)
+        if token is None:
+            return LOCK_TIMEOUT
+        try:
+            now = self.timer()
+            tokens, updated = self.cache.get(key) or (self.capacity, now)
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+            if tokens >= 1:
+                self.cache.set(key, (tokens - 1, now), self.timeout)
+                return 0
+        finally:
+            self.unlock(key, token)
+        wait = (1 - tokens) / self.refill_rate
+        if len(self.blocked) >= MAX_BLOCKED_KEYS:
+            self.blocked = {}
+        self.blocked[key] = now + wait
+        return wait
+
+
+# Buckets by scope and rate, kept for the life of the process for their blocked keys
+_buckets = {}
+
+
+def get_bucket(scope, rate):
+    bucket = _buckets.get((scope, rate))
+    if bucket is None:
+        capacity, seconds = parse_rate(rate)
+        bucket = _buckets[(scope, rate)] = TokenBucket(capacity, capacity / seconds)
+    return bucket
+
+
+def reset_buckets():
+    """Forget the local blocked keys, eg. between tests. Clear the cache as well to
+    refill the shared buckets"""
+    for bucket in _buckets.values():
+        bucket.blocked = {}
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Throttle taking a token from the bucket of the request's key,
+    with the size and refill period of DEFAULT_THROTTLE_RATES[scope].
+    Requests without a key, or scopes without a rate, are not throttled.
+    """
+
+    scope = None
+
+    def __init__(self):
+        self.wait_time = None
+
+    def get_key(self, request):
+        raise NotImplementedError(".get_key() must be overridden")
+
+    def allow_request(self, request, view):
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+        key = rate and self.get_key(request)
+        if not key:
+            return True
+        self.wait_time = get_bucket(self.scope, rate).consume(
+            f"throttle_{self.scope}_{key}"
+        )
+        return not self.wait_time
+
+    def wait(self):
+        return self.wait_time
+
+
+class ContactIPThrottle(TokenBucketThrottle):
+    scope = "contact_ip"
+
+    def get_key(self, request):
+        return get_client_ip(request)
+
+
+class ContactEmailThrottle(TokenBucketThrottle):
+    """Throttles by the first contact email, hashed to keep cache keys valid"""
+
+    scope = "contact_email"
+
+    def get_key(self, request):
+        try:
+            email = request.data["contact_emails"][0]["email"]
+        except (KeyError, IndexError, TypeError):
+            return None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return hashlib.md5(email.strip().lower().encode()).hexdigest()
@@ -9,6 +9,8 @@ from wagtail.snippets.models import register_snippet
 from rest_framework.fields import Field
 from wagtail_headless_preview.models import HeadlessMixin
 from wagtail.fields import StreamField
+from wagtail.search import index
+from products.pricing import get_price_plan_product_service_ids
 from products.serializers import ClassPricePlanSerializer
 
 from core.models import (
@@ -17,7 +19,9 @@ from core.models import (
     LevelChoices,
     CourseCategoryChoices,
 )
+from core.renditions import get_rendition_attrs
 from core.serializers import HeaderImageFieldSerializer
+from search.tokenize import TextSearchField, cjk_index_text
 from streams import customblocks
 
 COURSE_CHOICES_DICT = dict(CourseCategoryChoices.choices)
@@ -66,9 +70,9 @@ class CourseRelatedFieldSerializer(Field):
             "image": {
                 "id": image.id,
                 "title": image.title,
-                "original": image.get_rendition("original").attrs_dict,
-                "medium": image.get_rendition("fill-1024x640").attrs_dict,
-                "thumbnail": image.get_rendition("fill-560x350").attrs_dict,
+                "original": get_rendition_attrs(image, "original", self.context),
+                "medium": get_rendition_attrs(image, "fill-1024x640", self.context),
+                "thumbnail": get_rendition_attrs(image, "fill-560x350", self.context),
             },
         }
 
@@ -335,6 +339,15 @@ class CourseDisplayDetailPage(Page):
         APIField("related_courses"),
     ]
 
+    # Search configuration
+    search_fields = Page.search_fields + [
+        index.SearchField("display_title", boost=2),
+        index.SearchField("display_tagline"),
+        TextSearchField("course_content_points"),
+        TextSearchField("course_description"),
+        index.SearchField("cjk_search_text"),
+    ]
+
     # Page limitations, Meta and methods
     parent_page_types = [
         "courses.CourseDisplayListPage",
@@ -348,6 +361,15 @@ class CourseDisplayDetailPage(Page):
     def __str__(self):
         return self.title
 
+    def cjk_search_text(self):
+        return cjk_index_text(
+            self.title,
+            self.display_title,
+            self.display_tagline,
+            self.course_content_points,
+            self.course_description,
+        )
+
     def full_clean(self, *args, **kwargs):
         """Use full clean to manipulate subject_slug, title and slug so as to be consistent
         with the base course django model"""
@@ -361,6 +383,12 @@ class CourseDisplayDetailPage(Page):
         if not self.slug == slugify(self.course.title_en):
             self.slug = slugify(self.course.title_en)
 
+    def get_priced_product_service_ids(self):
+        """Product Services priced on this page, used to prime the PricingEngine"""
+        return get_price_plan_product_service_ids(
+            [plan.price_plan_id for plan in self.common_price_plans.all()]
+        )
+
 
 # =============== Orderables ====================
 
@@ -1,7 +1,4 @@
-from decimal import Decimal
-
 from django.db import models
-from django.utils import timezone
 from rest_framework.fields import Field
 from wagtail_headless_preview.models import HeadlessMixin
 from wagtail.models import Page, Orderable
@@ -12,7 +9,9 @@ from wagtail.api import APIField
 from wagtail.fields import StreamField
 
 from streams import customblocks
+from core.renditions import get_rendition_attrs
 from core.serializers import HeaderImageFieldSerializer
+from products.pricing import get_pricing_engine, get_price_plan_product_service_ids
 
 
 class HomePage(HeadlessMixin, Page):
@@ -215,14 +214,31 @@ class HomePage(HeadlessMixin, Page):
         APIField("bloglesson_en_title"),
         APIField("bloglesson_jp_title"),
     ]
+    # Relations walked by the API field serializers, see core.api_relations
+    api_field_relations = {
+        "home_testimonials": ["testimonial"],
+        "home_class_prices": [
+            "class_price__class_service__tax_rate",
+            "class_price__class_service__current_price",
+        ],
+        "home_teachers": ["teacher"],
+    }
 
     # Page limitations
     max_count = 1
     parent_page_types = ["wagtailcore.Page"]
+    # Queries allowed for an uncached API detail response, see core.query_budget
+    api_query_budget = 20
 
     def __str__(self):
         return self.title
 
+    def get_priced_product_service_ids(self):
+        """Product Services priced on this page, used to prime the PricingEngine"""
+        return get_price_plan_product_service_ids(
+            [price.class_price_id for price in self.home_class_prices.all()]
+        )
+
 
 # Testimonials section for home page
 class HomeTestimonialSerializer(Field):
@@ -239,7 +255,7 @@ class HomeTestimonialSerializer(Field):
             "image": {
                 "id": img.id,
                 "title": img.title,
-                "medium": img.get_rendition("fill-1400x1800").attrs_dict,
+                "medium": get_rendition_attrs(img, "fill-1400x1800", self.context),
             },
         }
 
@@ -272,39 +288,6 @@ class HomeTestimonials(Orderable):
 
 
 class HomeClassPriceSerializer(Field):
-    def calculate_taxed_amount(self, price, tax_rate):
-        if not isinstance(price, Decimal) or not isinstance(tax_rate, Decimal):
-            return None
-        return str(round(price + (price * (tax_rate / Decimal("100.00")))))
-
-    def get_price(self, prices, tax_rate):
-        filtered_prices = []
-        now = int(timezone.now().timestamp())
-        for price in prices:
-            if now < int(price.start_date.timestamp()):
-                continue
-            if price.end_date and now > int(price.end_date.timestamp()):
-                continue
-            filtered_prices.append(price)
-        filtered_prices.sort(reverse=True, key=lambda x: x.start_date)
-        if len(filtered_prices) > 0:
-            p = filtered_prices[0]
-            return {
-                "name": p.name,
-                "display_name": p.display_name,
-                "pretax_price": str(p.price),
-                "posttax_price": self.calculate_taxed_amount(p.price, tax_rate),
-                "is_sale": p.is_limited_sale,
-                "start_date": p.start_date,
-                "is_limited_sale": p.is_limited_sale,
-                "before_sale_pretax_price": str(p.before_sale_price),
-                "before_sale_posttax_price": self.calculate_taxed_amount(
-                    p.before_sale_price, tax_rate
-                ),
-                "end_date": p.end_date,
-            }
-        return {}
-
     def to_representation(self, value):
         cs = value.class_service
         return {
@@ -322,7 +305,7 @@ class HomeClassPriceSerializer(Field):
             "is_inperson": cs.is_inperson,
             "has_onlinenotes": cs.has_onlinenotes,
             "bookable_online": cs.bookable_online,
-            "price_info": self.get_price(cs.prices.all(), cs.tax_rate.rate),
+            "price_info": get_pricing_engine(self.context).class_price_info(cs),
         }
 
 
@@ -367,8 +350,8 @@ class HomeTeacherSerializer(Field):
             "image": {
                 "id": img.id,
                 "title": img.title,
-                "original": img.get_rendition("original").attrs_dict,
-                "thumbnail": img.get_rendition("fill-400x400").attrs_dict,
+                "original": get_rendition_attrs(img, "original", self.context),
+                "thumbnail": get_rendition_attrs(img, "fill-400x400", self.context),
             },
         }
 
@@ -8,8 +8,11 @@ from wagtail.snippets.models import register_snippet
 from wagtail_headless_preview.models import HeadlessMixin
 from wagtail.api import APIField
 from wagtail.fields import StreamField
+from wagtail.search import index
 
+from search.tokenize import TextSearchField, cjk_index_text
 from streams import customblocks
+from core.renditions import get_rendition_attrs
 from core.serializers import HeaderImageFieldSerializer
 
 
@@ -25,8 +28,12 @@ class LessonAuthorFieldSerializer(Field):
             "image": {
                 "id": profile_image.id,
                 "title": profile_image.title,
-                "original": profile_image.get_rendition("original").attrs_dict,
-                "thumbnail": profile_image.get_rendition("fill-400x400").attrs_dict,
+                "original": get_rendition_attrs(
+                    profile_image, "original", self.context
+                ),
+                "thumbnail": get_rendition_attrs(
+                    profile_image, "fill-400x400", self.context
+                ),
             },
         }
 
@@ -204,6 +211,14 @@ class LessonDetailPage(HeadlessMixin, Page):
         APIField("related_lessons"),
     ]
 
+    # Search configuration
+    search_fields = Page.search_fields + [
+        index.SearchField("display_title", boost=2),
+        index.SearchField("display_tagline"),
+        TextSearchField("lesson_content"),
+        index.SearchField("cjk_search_text"),
+    ]
+
     # Page limitations, Meta and methods
     parent_page_types = [
         "lessons.LessonListPage",
@@ -218,6 +233,11 @@ class LessonDetailPage(HeadlessMixin, Page):
     def __str__(self):
         return self.title
 
+    def cjk_search_text(self):
+        return cjk_index_text(
+            self.title, self.display_title, self.display_tagline, self.lesson_content
+        )
+
     def __repr__(self) -> str:
         return f"{self.__class__.__name__}({self.title!r})"
 
@@ -284,8 +304,8 @@ class LessonRelatedFieldSerializer(Field):
             "image": {
                 "id": image.id,
                 "title": image.title,
-                "original": image.get_rendition("original").attrs_dict,
-                "thumbnail": image.get_rendition("fill-560x350").attrs_dict,
+                "original": get_rendition_attrs(image, "original", self.context),
+                "thumbnail": get_rendition_attrs(image, "fill-560x350", self.context),
             },
         }
 
@@ -1,21 +1,25 @@
 from django.shortcuts import render
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
-from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from core.api_cache import async_versioned_condition, get_model_versions
+from core.async_views import AsyncAPIView
 from lessons.models import LessonCategory
 from lessons.serializers import LessonCategorySerializer
 
 
-class LessonCategoryList(APIView):
+class LessonCategoryList(AsyncAPIView):
     """
     List all lesson categories.
     """
 
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-    def get(self, request, format=None):
-        snippets = LessonCategory.objects.all()
+    @async_versioned_condition(
+        lambda request, **kwargs: get_model_versions(["lessons.LessonCategory"])
+    )
+    async def get(self, request, format=None):
+        snippets = [category async for category in LessonCategory.objects.all()]
         serializer = LessonCategorySerializer(snippets, many=True)
         return Response(serializer.data)
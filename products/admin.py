@@ -34,6 +34,8 @@ class ProductServiceAdmin(admin.ModelAdmin):
         "created",
         "modified",
         "price_summary",
+        "current_price",
+        "next_price_change",
     ]
     fieldsets = [
         (
@@ -48,6 +50,7 @@ class ProductServiceAdmin(admin.ModelAdmin):
                     "ptype",
                     "tax_rate",
                     "price_summary",
+                    ("current_price", "next_price_change"),
                     "description",
                     ("min_num", "max_num"),
                     ("length", "length_unit"),
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from products.scheduler import PriceTransitionScheduler
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh price summaries of products whose prices have started or ended. "
+        "Run from cron, or with --loop to sleep until each price boundary."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and refresh products as each price boundary passes",
+        )
+        parser.add_argument(
+            "--max-sleep",
+            type=int,
+            default=3600,
+            help="Max seconds to sleep between checks in --loop mode. Default 3600",
+        )
+
+    def handle(self, *args, **options):
+        scheduler = PriceTransitionScheduler()
+        if options["loop"]:
+            scheduler.run(max_sleep=options["max_sleep"])
+            return
+        refreshed = scheduler.run_once()
+        self.stdout.write(f"Refreshed price summaries for {len(refreshed)} product(s)")
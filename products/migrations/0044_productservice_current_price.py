@@ -0,0 +1,59 @@
+# Generated by Django 4.2.1 on 2026-10-18 09:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.utils import timezone
+
+
+def populate_current_price(apps, schema_editor):
+    ProductService = apps.get_model("products", "ProductService")
+    now = timezone.now()
+    for product_service in ProductService.objects.prefetch_related("prices"):
+        prices = list(product_service.prices.all())
+        active = [
+            p
+            for p in prices
+            if p.start_date <= now and not (p.end_date and now > p.end_date)
+        ]
+        boundaries = [p.start_date for p in prices if p.start_date > now] + [
+            p.end_date for p in prices if p.end_date and p.end_date >= now
+        ]
+        product_service.current_price = max(
+            active, key=lambda p: p.start_date, default=None
+        )
+        product_service.next_price_change = min(boundaries, default=None)
+        product_service.save(update_fields=["current_price", "next_price_change"])
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("products", "0043_alter_learningexperiencelistpage_gallery_en_title_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productservice",
+            name="current_price",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                help_text="Autogenerated. The price currently displayed to the public",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="products.productserviceprice",
+            ),
+        ),
+        migrations.AddField(
+            model_name="productservice",
+            name="next_price_change",
+            field=models.DateTimeField(
+                blank=True,
+                editable=False,
+                help_text="Autogenerated. The next start or end date at which the current price changes",
+                null=True,
+                verbose_name="Next price change",
+            ),
+        ),
+        migrations.RunPython(populate_current_price, migrations.RunPython.noop),
+    ]
@@ -16,8 +16,16 @@ from wagtail_headless_preview.models import HeadlessMixin
 
 from streams import customblocks
 from core.models import TimeStampedModel
+from core.renditions import get_rendition_attrs
 from core.serializers import HeaderImageFieldSerializer
 from lessons.models import LessonRelatedFieldSerializer
+from .pricing import (
+    build_le_price_info,
+    get_price_plan_product_service_ids,
+    get_next_price_change,
+    get_pricing_engine,
+    select_current_price,
+)
 
 # =====================
 # Model Choices
@@ -217,26 +225,56 @@ class ProductService(TimeStampedModel):
         choices=ClassTypeChoices.choices,
         help_text="Class field only. Class composition is controlled privately or by Xlingual",
     )
+    # Denormalized price fields, kept up to date by products.signals
+    current_price = models.ForeignKey(
+        "products.ProductServicePrice",
+        on_delete=models.SET_NULL,
+        blank=True,
+        null=True,
+        editable=False,
+        related_name="+",
+        help_text="Autogenerated. The price currently displayed to the public",
+    )
+    next_price_change = models.DateTimeField(
+        _("Next price change"),
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Autogenerated. The next start or end date at which the current price changes",
+    )
 
     def __str__(self):
         return self.name
 
+    def get_current_price(self, now=None):
+        """Return the currently active price. Uses the denormalized current_price while it is
+        still valid and only falls back to filtering all prices once next_price_change has passed
+        """
+        if now is None:
+            now = timezone.now()
+        if self.next_price_change is None or now < self.next_price_change:
+            return self.current_price
+        return select_current_price(self.prices.all(), now)
+
+    def refresh_current_price(self, prices=None, now=None):
+        """Recalculate current_price and next_price_change from prices. Does not save"""
+        if prices is None:
+            prices = self.prices.all()
+        if now is None:
+            now = timezone.now()
+        self.current_price = select_current_price(prices, now)
+        self.next_price_change = get_next_price_change(prices, now)
+
     def _get_slug_or_raise_custom_error(self):
         slug = slugify(self.name)
-        unique_slug = slug
-
-        if not ProductService.objects.filter(slug=unique_slug).exists():
-            return unique_slug
-        else:
-            # Is own slug
-            if ProductService.objects.filter(slug=unique_slug)[0].id == self.id:
-                return unique_slug
-
-            else:
-                similar_object = ProductService.objects.filter(slug=unique_slug)[0]
-                raise ValidationError(
-                    f"The slug value {unique_slug} indicates this product is not unique. It is similar to the product with name: {similar_object.name}  and id:  {similar_object.id}"
-                )
+        similar_object = (
+            ProductService.objects.filter(slug=slug).exclude(pk=self.pk).first()
+        )
+        if similar_object:
+            raise ValidationError(
+                f"The slug value {slug} indicates this product is not unique. It is similar to the product with name: {similar_object.name}  and id:  {similar_object.id}"
+            )
+        return slug
 
     def clean(self):
         self.slug = self._get_slug_or_raise_custom_error()
@@ -516,30 +554,11 @@ class LearningExperienceListPage(HeadlessMixin, Page):
 
 
 class LESerializer(Field):
-    def calculate_taxed_amount(self, price, tax_rate):
-        if not isinstance(price, Decimal) or not isinstance(tax_rate, Decimal):
-            return None
-        return str(round(price + (price * (tax_rate / Decimal("100.00")))))
-
     def to_representation(self, value):
-        prices = []
         tax_rate = value.product_service.tax_rate.rate
-        for p in value.product_service.prices.all():
-            price_dict = {
-                "id": p.id,
-                "name": p.name,
-                "display_name": p.display_name,
-                "pretax_price": str(p.price),
-                "posttax_price": self.calculate_taxed_amount(p.price, tax_rate),
-                "start_date": p.start_date,
-                "is_limited_sale": p.is_limited_sale,
-                "before_sale_pretax_price": p.before_sale_price,
-                "before_sale_posttax_price": self.calculate_taxed_amount(
-                    p.before_sale_price, tax_rate
-                ),
-                "end_date": p.end_date,
-            }
-            prices.append(price_dict)
+        prices = [
+            build_le_price_info(p, tax_rate) for p in value.product_service.prices.all()
+        ]
 
         return {
             "id": value.id,
@@ -566,8 +585,8 @@ class StaffMembersFieldSerializer(Field):
             "image": {
                 "id": image.id,
                 "title": image.title,
-                "original": image.get_rendition("original").attrs_dict,
-                "thumbnail": image.get_rendition("fill-450x450").attrs_dict,
+                "original": get_rendition_attrs(image, "original", self.context),
+                "thumbnail": get_rendition_attrs(image, "fill-450x450", self.context),
             },
         }
 
@@ -740,6 +759,16 @@ class LearningExperienceDetailPage(HeadlessMixin, Page):
         APIField("address", serializer=ExperienceAddressFieldSerializer()),
         APIField("related_lessons"),
     ]
+    # Relations walked by the API field serializers, see core.api_relations
+    api_field_relations = {
+        "learning_experience": [
+            "product_service__tax_rate",
+            "product_service__prices",
+        ],
+        "address": [],
+        "staff_members": ["staff"],
+        "related_lessons": ["lesson"],
+    }
 
     # Page limitations, Meta and methods
     parent_page_types = [
@@ -912,51 +941,38 @@ class ClassPricesListPage(HeadlessMixin, Page):
         APIField("regular_intro"),
         APIField("regular_price_plans"),
     ]
+    # Relations walked by the API field serializers, see core.api_relations
+    api_field_relations = {
+        "private_price_plans": [
+            "price_plan__class_service__tax_rate",
+            "price_plan__class_service__current_price",
+        ],
+        "regular_price_plans": [
+            "price_plan__class_service__tax_rate",
+            "price_plan__class_service__current_price",
+        ],
+    }
 
     # Page limitations, Meta and methods
     max_count = 1
     parent_page_types = [
         "home.HomePage",
     ]
+    # Queries allowed for an uncached API detail response, see core.query_budget
+    api_query_budget = 20
 
     def __str__(self):
         return self.title
 
+    def get_priced_product_service_ids(self):
+        """Product Services priced on this page, used to prime the PricingEngine"""
+        return get_price_plan_product_service_ids(
+            [plan.price_plan_id for plan in self.private_price_plans.all()]
+            + [plan.price_plan_id for plan in self.regular_price_plans.all()]
+        )
 
-class ClassServiceFieldSerializer(Field):
-    def calculate_taxed_amount(self, price, tax_rate):
-        if not isinstance(price, Decimal) or not isinstance(tax_rate, Decimal):
-            return None
-        return str(round(price + (price * (tax_rate / Decimal("100.00")))))
-
-    def get_price(self, prices, tax_rate):
-        filtered_prices = []
-        now = int(timezone.now().timestamp())
-        for price in prices:
-            if now < int(price.start_date.timestamp()):
-                continue
-            if price.end_date and now > int(price.end_date.timestamp()):
-                continue
-            filtered_prices.append(price)
-        filtered_prices.sort(reverse=True, key=lambda x: x.start_date)
-        if len(filtered_prices) > 0:
-            p = filtered_prices[0]
-            return {
-                "name": p.name,
-                "display_name": p.display_name,
-                "pretax_price": str(p.price),
-                "posttax_price": self.calculate_taxed_amount(p.price, tax_rate),
-                "is_sale": p.is_limited_sale,
-                "start_date": p.start_date,
-                "is_limited_sale": p.is_limited_sale,
-                "before_sale_pretax_price": str(p.before_sale_price),
-                "before_sale_posttax_price": self.calculate_taxed_amount(
-                    p.before_sale_price, tax_rate
-                ),
-                "end_date": p.end_date,
-            }
-        return {}
 
+class ClassServiceFieldSerializer(Field):
     def to_representation(self, value):
         return {
             "id": value.id,
@@ -975,48 +991,12 @@ class ClassServiceFieldSerializer(Field):
             "is_inperson": value.is_inperson,
             "has_onlinenotes": value.has_onlinenotes,
             "bookable_online": value.bookable_online,
-            "price_info": self.get_price(value.prices.all(), value.tax_rate.rate),
+            "price_info": get_pricing_engine(self.context).class_price_info(value),
         }
 
 
 # Orderables for List page and serializers
 class ListPagePricePlanSerializer(Field):
-    def calculate_taxed_amount(self, price, tax_rate):
-        if not isinstance(price, Decimal) or not isinstance(tax_rate, Decimal):
-            return None
-        return str(round(price + (price * (tax_rate / Decimal("100.00")))))
-
-    def get_price(self, prices, tax_rate):
-        filtered_prices = []
-        now = int(timezone.now().timestamp())
-        for price in prices:
-            if now < int(price.start_date.timestamp()):
-                continue
-            if price.end_date and now > int(price.end_date.timestamp()):
-                continue
-            filtered_prices.append(price)
-        filtered_prices.sort(reverse=True, key=lambda x: x.start_date)
-        if len(filtered_prices) > 0:
-            p = filtered_prices[0]
-            return {
-                "name": p.name,
-                "display_name": p.display_name,
-                "pretax_price": str(p.price),
-                "posttax_price": self.calculate_taxed_amount(p.price, tax_rate),
-                "is_sale": p.is_limited_sale,
-                "before_sale_pretax_price": (
-                    str(p.before_sale_price)
-                    if p.before_sale_price
-                    else p.before_sale_price
-                ),
-                "before_sale_posttax_price": self.calculate_taxed_amount(
-                    p.before_sale_price, tax_rate
-                ),
-                "start_date": p.start_date,
-                "end_date": p.end_date,
-            }
-        return {}
-
     def to_representation(self, value):
         cs = value.class_service
         return {
@@ -1034,7 +1014,7 @@ class ListPagePricePlanSerializer(Field):
             "is_inperson": cs.is_inperson,
             "has_onlinenotes": cs.has_onlinenotes,
             "bookable_online": cs.bookable_online,
-            "price_info": self.get_price(cs.prices.all(), cs.tax_rate.rate),
+            "price_info": get_pricing_engine(self.context).price_info(cs),
         }
 
 
@@ -1161,6 +1141,10 @@ class ClassPricesDetailPage(HeadlessMixin, Page):
         APIField("header_image", serializer=HeaderImageFieldSerializer()),
         APIField("class_intro"),
     ]
+    # Relations walked by the API field serializers, see core.api_relations
+    api_field_relations = {
+        "class_service": ["tax_rate", "current_price"],
+    }
 
     # Page limitations, Meta and methods
     parent_page_types = [
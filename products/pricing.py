@@ -0,0 +1,163 @@
+from decimal import Decimal
+
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+
+HUNDRED = Decimal("100.00")
+
+
+def calculate_taxed_amount(price, tax_rate):
+    """Post tax amount as a rounded string, or None if price or tax rate is missing"""
+    if not isinstance(price, Decimal) or not isinstance(tax_rate, Decimal):
+        return None
+    return str(round(price + (price * (tax_rate / HUNDRED))))
+
+
+def is_price_active(price, now):
+    """A price is active from its start date up to and including its end date, if any"""
+    if now < price.start_date:
+        return False
+    if price.end_date and now > price.end_date:
+        return False
+    return True
+
+
+def select_current_price(prices, now):
+    """Return the active price with the latest start date or None"""
+    active_prices = [p for p in prices if is_price_active(p, now)]
+    if not active_prices:
+        return None
+    return max(active_prices, key=lambda p: p.start_date)
+
+
+def get_next_price_change(prices, now):
+    """Return the earliest future start or end date of prices, ie. the next time the
+    current price needs to be recalculated, or None if there is none"""
+    boundaries = []
+    for p in prices:
+        if p.start_date > now:
+            boundaries.append(p.start_date)
+        if p.end_date and p.end_date >= now:
+            boundaries.append(p.end_date)
+    return min(boundaries, default=None)
+
+
+def build_price_info(price, tax_rate):
+    """The price_info of the price plan endpoints, or an empty dict if there is no
+    price: name, display_name, pretax_price, posttax_price, is_sale, the
+    before_sale_pretax_price and before_sale_posttax_price (both null without a before
+    sale price), start_date and end_date. Prices are strings, post tax ones rounded"""
+    if price is None:
+        return {}
+    before_sale_price = price.before_sale_price
+    return {
+        "name": price.name,
+        "display_name": price.display_name,
+        "pretax_price": str(price.price),
+        "posttax_price": calculate_taxed_amount(price.price, tax_rate),
+        "is_sale": price.is_limited_sale,
+        "before_sale_pretax_price": (
+            str(before_sale_price) if before_sale_price else before_sale_price
+        ),
+        "before_sale_posttax_price": calculate_taxed_amount(
+            before_sale_price, tax_rate
+        ),
+        "start_date": price.start_date,
+        "end_date": price.end_date,
+    }
+
+
+def build_class_price_info(info):
+    """price_info of the class service endpoints, from build_price_info's. Adds
+    is_limited_sale, and before_sale_pretax_price is always a string, "None" without a
+    before sale price"""
+    if not info:
+        return {}
+    return {
+        **info,
+        "is_limited_sale": info["is_sale"],
+        "before_sale_pretax_price": str(info["before_sale_pretax_price"]),
+    }
+
+
+def build_le_price_info(price, tax_rate):
+    """A learning experience's price, keeping that endpoint's shape: is_limited_sale
+    rather than is_sale, and before_sale_pretax_price as a number"""
+    info = build_price_info(price, tax_rate)
+    info["is_limited_sale"] = info.pop("is_sale")
+    info["before_sale_pretax_price"] = price.before_sale_price
+    return {"id": price.id, **info}
+
+
+class PricingEngine:
+    """Prices Product Services against a single fixed now.
+
+    One engine is shared by all serializers for a request (see get_pricing_engine), so
+    every plan on a page is priced at the same instant. prime() prices a whole list of
+    Product Services with one query, plus one for any whose denormalized current price
+    has expired, so listing pages do not price each plan separately.
+    """
+
+    def __init__(self, now=None):
+        self.now = now if now is not None else timezone.now()
+        self.price_infos = {}
+
+    def prime(self, product_service_ids):
+        from .models import ProductService
+
+        ids = set(product_service_ids) - set(self.price_infos)
+        if not ids:
+            return
+        product_services = list(
+            ProductService.objects.filter(pk__in=ids).select_related(
+                "tax_rate", "current_price"
+            )
+        )
+        stale = [
+            ps
+            for ps in product_services
+            if ps.next_price_change is not None and self.now >= ps.next_price_change
+        ]
+        if stale:
+            prefetch_related_objects(stale, "prices")
+        for ps in product_services:
+            self.price_infos[ps.id] = build_price_info(
+                ps.get_current_price(self.now), ps.tax_rate.rate
+            )
+
+    def price_info(self, product_service):
+        """price_info for product_service, priced lazily if it was not primed"""
+        if product_service.id not in self.price_infos:
+            self.price_infos[product_service.id] = build_price_info(
+                product_service.get_current_price(self.now),
+                product_service.tax_rate.rate,
+            )
+        return self.price_infos[product_service.id]
+
+    def class_price_info(self, product_service):
+        """price_info for product_service in the class service endpoints' shape"""
+        return build_class_price_info(self.price_info(product_service))
+
+
+def get_pricing_engine(context):
+    """Return the PricingEngine for the request in a serializer context, creating it on
+    first use. Without a request a new engine is returned"""
+    request = context.get("request") if context else None
+    if request is None:
+        return PricingEngine()
+    engine = getattr(request, "_pricing_engine", None)
+    if engine is None:
+        engine = PricingEngine()
+        request._pricing_engine = engine
+    return engine
+
+
+def get_price_plan_product_service_ids(price_plan_ids):
+    """Class Product Service ids for a list of ClassPricesDetailPage ids, for priming"""
+    from .models import ClassPricesDetailPage
+
+    return list(
+        ClassPricesDetailPage.objects.filter(pk__in=price_plan_ids).values_list(
+            "class_service_id", flat=True
+        )
+    )
@@ -0,0 +1,79 @@
+import heapq
+import time
+
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ProductService, ProductServicePrice
+from .signals import recompute_price_summaries
+
+
+class PriceTransitionScheduler:
+    """Refreshes ProductService price summaries when a price starts or ends.
+
+    price_summary and current_price are only recalculated when a price is saved, so a sale
+    that ends leaves them stale. This keeps a heap of upcoming price start and end dates
+    across all products and refreshes only the products affected by each boundary.
+    clock and sleep are injectable so tests can use a fake clock.
+    """
+
+    def __init__(self, clock=timezone.now, sleep=time.sleep):
+        self.clock = clock
+        self.sleep = sleep
+        self.heap = []
+
+    def load(self, now):
+        """Build the heap of (boundary, product service id) for all boundaries after now"""
+        boundaries = []
+        prices = ProductServicePrice.objects.filter(
+            Q(start_date__gt=now) | Q(end_date__gte=now)
+        ).values_list("product_service_id", "start_date", "end_date")
+        for product_service_id, start_date, end_date in prices:
+            if start_date > now:
+                boundaries.append((start_date, product_service_id))
+            if end_date and end_date >= now:
+                boundaries.append((end_date, product_service_id))
+        heapq.heapify(boundaries)
+        self.heap = boundaries
+
+    def pop_due(self, now):
+        """Pop all boundaries that have passed and return the affected product service ids"""
+        due = set()
+        while self.heap and self.heap[0][0] <= now:
+            due.add(heapq.heappop(self.heap)[1])
+        return due
+
+    def refresh(self, product_service_ids, now):
+        if product_service_ids:
+            recompute_price_summaries(product_service_ids, now)
+
+    def stale_product_service_ids(self, now):
+        """Products whose next price change has passed, ie. boundaries missed since the last run"""
+        return set(
+            ProductService.objects.filter(next_price_change__lte=now).values_list(
+                "id", flat=True
+            )
+        )
+
+    def run_once(self):
+        """Refresh every product with a passed boundary. Used for cron runs"""
+        now = self.clock()
+        product_service_ids = self.stale_product_service_ids(now)
+        self.refresh(product_service_ids, now)
+        return product_service_ids
+
+    def run(self, max_sleep=3600, until=None):
+        """Sleep until each boundary and refresh the affected products. The heap is reloaded
+        after every wake up so prices added or changed in the meantime are picked up.
+        """
+        self.load(self.clock())
+        while until is None or self.clock() < until:
+            now = self.clock()
+            due = self.pop_due(now) | self.stale_product_service_ids(now)
+            if due:
+                self.refresh(due, now)
+            self.load(now)
+            wait = max_sleep
+            if self.heap:
+                wait = min(max_sleep, (self.heap[0][0] - now).total_seconds())
+            self.sleep(max(wait, 1))
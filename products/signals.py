@@ -1,23 +1,22 @@
-from decimal import Decimal
+import threading
 
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
+from core.api_cache import invalidate_pages
+from core.dependencies import get_dependent_page_ids
 from .models import ProductService, ProductServicePrice
 
 
-def update_price_summary(id):
-    """Function to update the related Product Service price summary field after
-    a change to the Product Service Price model
+def get_price_summary(product_service, prices, now):
+    """Function to build the Product Service price summary string from its prices
     - For products and classes there should only be one current price
     - For experiences there is a range of prices available depending on various conditions
     """
-    product_service = ProductService.objects.get(pk=id)
-    prices_query = product_service.prices.all()
-    now = timezone.now()
     valid_prices = []
-    for p in prices_query:
+    for p in prices:
         # Check to see that price falls within valid date range
         if p.start_date <= now and not p.end_date:
             valid_prices.append(p)
@@ -25,66 +24,110 @@ def update_price_summary(id):
             valid_prices.append(p)
     # If no valid prices create warning string
     if not valid_prices:
-        product_service.price_summary = "** WARNING: No valid price **"
-        product_service.save()
-        return
+        return "** WARNING: No valid price **"
 
     # check ProductService is an experience - which can have a range of various prices
     if product_service.ptype == "experience":
         if len(valid_prices) == 1:
-            product_service.price_summary = f"{str(valid_prices[0].price)}"
+            return f"{str(valid_prices[0].price)}"
+        mi = min(valid_prices, key=lambda x: x.price)
+        mx = max(valid_prices, key=lambda x: x.price)
+        return f"{str(mi.price)} ~ {str(mx.price)}"
+
+    # Product_service is not experience so should only have one current price or indicate
+    # Current price with sale price
+    if len(valid_prices) == 1:
+        return f"{str(valid_prices[0].price)}"
+    open_ended = []
+    sale_close_ended = []
+    sorted_valid_prices = sorted(valid_prices, reverse=True, key=lambda p: p.start_date)
+    for priceline in sorted_valid_prices:
+        # Split prices into open ended and on sale close ended (and sale without end date excluded)
+        if priceline.is_limited_sale and priceline.end_date:
+            sale_close_ended.append(priceline)
         else:
-            mi = min(valid_prices, key=lambda x: x.price)
-            mx = max(valid_prices, key=lambda x: x.price)
-            product_service.price_summary = f"{str(mi.price)} ~ {str(mx.price)}"
-        product_service.save()
+            open_ended.append(priceline)
+
+    if len(sale_close_ended) and len(open_ended):
+        # Sales price exists along with open standard price, so build string with current price
+        return f"SALE: ({open_ended[0].price}) -> {sale_close_ended[0].price}"
+    elif len(open_ended) and not len(sale_close_ended):
+        return f"{open_ended[0].price}"
+    elif len(sale_close_ended) and not len(open_ended):
+        # This is an error state, someone forgot to keep the long term price
+        return "** WARNING: No base price, please add one"
+    # SHould not be here so warn users
+    return "** WARNING: Error with pricing"
+
+
+def recompute_price_summaries(ids, now=None):
+    """Recompute price_summary and the denormalized current price for a batch of Product
+    Services. All prices are loaded in one query and the results written back with a
+    single bulk_update, so bulk edits and imports do not cost a round trip per product.
+    Returns the number of Product Services updated
+    """
+    if now is None:
+        now = timezone.now()
+    product_services = list(
+        ProductService.objects.filter(pk__in=ids).prefetch_related("prices")
+    )
+    for product_service in product_services:
+        prices = product_service.prices.all()
+        product_service.price_summary = get_price_summary(product_service, prices, now)
+        product_service.refresh_current_price(prices, now)
+    ProductService.objects.bulk_update(
+        product_services,
+        fields=["price_summary", "current_price", "next_price_change"],
+    )
+    if product_services:
+        # bulk_update sends no signals, and cached API responses show current prices
+        invalidate_pages(get_dependent_page_ids(ProductService, ids))
+    return len(product_services)
+
+
+def update_price_summary(id, now=None):
+    """Function to update the related Product Service price summary field after
+    a change to the Product Service Price model
+    """
+    recompute_price_summaries([id], now)
+
+
+# Product Services with changed prices in the current transaction, deduplicated so that
+# saving many prices of one product only recomputes it once on commit
+_pending = threading.local()
+
+
+def _get_pending_ids():
+    if not hasattr(_pending, "ids"):
+        _pending.ids = set()
+    return _pending.ids
+
+
+def flush_pending_price_summaries():
+    ids = _get_pending_ids()
+    if not ids:
         return
-    else:
-        # Product_service is not experience so should only have one current price or indicate
-        # Current price with sale price
-        if len(valid_prices) == 1:
-            product_service.price_summary = f"{str(valid_prices[0].price)}"
-        else:
-            product_service.price_summary = "Still in dev"
-            open_ended = []
-            sale_close_ended = []
-            sorted_valid_prices = sorted(
-                valid_prices, reverse=True, key=lambda p: p.start_date
-            )
-            for priceline in sorted_valid_prices:
-                # Split prices into open ended and on sale close ended (and sale without end date excluded)
-                if priceline.is_limited_sale and priceline.end_date:
-                    sale_close_ended.append(priceline)
-                else:
-                    open_ended.append(priceline)
-
-            if len(sale_close_ended) and len(open_ended):
-                s = f"SALE: ({open_ended[0].price}) -> {sale_close_ended[0].price}"
-                product_service.price_summary = s
-                # Check it sales price exists along with open standart price, if so build string with current price
-
-            elif len(open_ended) and not len(sale_close_ended):
-                s = f"{open_ended[0].price}"
-                product_service.price_summary = s
-
-            elif len(sale_close_ended) and not len(open_ended):
-                # This is an error state, someone forgot to keep the long term price
-                s = f"** WARNING: No base price, please add one"
-                product_service.price_summary = s
-
-            else:
-                # SHould not be here so warn users
-                s = f"** WARNING: Error with pricing"
-                product_service.price_summary = s
-
-        product_service.save()
+    pending_ids = set(ids)
+    recompute_price_summaries(pending_ids)
+    # Only once recomputed, so that a failure is retried by the next flush. Ids added
+    # meanwhile are kept
+    ids.difference_update(pending_ids)
+
+
+def schedule_price_summary_update(id):
+    """Defer the price summary update until the transaction commits. Every change registers
+    a flush callback but only the first one to run does any work. If the transaction is
+    rolled back the ids are recomputed harmlessly on the next flush.
+    """
+    _get_pending_ids().add(id)
+    transaction.on_commit(flush_pending_price_summaries)
 
 
 @receiver(post_save, sender=ProductServicePrice)
 def update_price_summary_on_save(sender, instance, *args, **kwargs):
-    update_price_summary(instance.product_service.id)
+    schedule_price_summary_update(instance.product_service_id)
 
 
 @receiver(post_delete, sender=ProductServicePrice)
 def update_price_summary_on_delete(sender, instance, *args, **kwargs):
-    update_price_summary(instance.product_service.id)
+    schedule_price_summary_update(instance.product_service_id)
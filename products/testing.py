@@ -0,0 +1,41 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.utils import timezone
+
+from taxes.models import Tax
+
+from .models import ProductService, ProductServicePrice
+
+
+def create_tax():
+    """A 10% consumption tax in effect since a year ago"""
+    return Tax.objects.create(
+        name="Consumption",
+        rate=Decimal("10.00"),
+        start_date=timezone.now() - timedelta(days=365),
+    )
+
+
+def create_product_service(tax, name="Private Lesson"):
+    """A class Product Service taxed at tax"""
+    return ProductService.objects.create(
+        name=name,
+        service_or_product="service",
+        ptype="class",
+        tax_rate=tax,
+        description="Test class",
+    )
+
+
+def create_price(product_service, price, start_date, name="Base", **kwargs):
+    """A price of product_service, displayed as name. kwargs are other price fields,
+    eg. end_date"""
+    return ProductServicePrice.objects.create(
+        product_service=product_service,
+        name=name,
+        display_name=name,
+        price=Decimal(price),
+        start_date=start_date,
+        **kwargs,
+    )
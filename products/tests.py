@@ -1,3 +1,248 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.db import DatabaseError
 from django.test import TestCase
+from django.utils import timezone
+
+from products.models import ProductServicePrice
+from products.pricing import (
+    PricingEngine,
+    build_class_price_info,
+    build_le_price_info,
+    build_price_info,
+)
+from products.scheduler import PriceTransitionScheduler
+from products.signals import (
+    flush_pending_price_summaries,
+    recompute_price_summaries,
+)
+from products.testing import create_price, create_product_service, create_tax
+
+
+class ProductServiceCurrentPriceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.product_service = create_product_service(create_tax())
+
+    def add_price(self, price, start, end=None, is_limited_sale=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            return create_price(
+                self.product_service,
+                price,
+                start,
+                name=f"Price {price}",
+                end_date=end,
+                is_limited_sale=is_limited_sale,
+            )
+
+    def test_current_price_is_denormalized_on_price_save(self):
+        base = self.add_price("5000", self.now - timedelta(days=10))
+        self.product_service.refresh_from_db()
+        self.assertEqual(self.product_service.current_price, base)
+        self.assertIsNone(self.product_service.next_price_change)
+
+    def test_sale_price_is_current_until_end_date(self):
+        self.add_price("5000", self.now - timedelta(days=10))
+        sale_end = self.now + timedelta(days=2)
+        sale = self.add_price(
+            "4000", self.now - timedelta(days=1), sale_end, is_limited_sale=True
+        )
+        self.product_service.refresh_from_db()
+        self.assertEqual(self.product_service.current_price, sale)
+        self.assertEqual(self.product_service.next_price_change, sale_end)
+
+    def test_get_current_price_falls_back_after_next_price_change(self):
+        base = self.add_price("5000", self.now - timedelta(days=10))
+        self.add_price(
+            "4000",
+            self.now - timedelta(days=1),
+            self.now + timedelta(days=2),
+            is_limited_sale=True,
+        )
+        self.product_service.refresh_from_db()
+        later = self.now + timedelta(days=3)
+        self.assertEqual(self.product_service.get_current_price(later), base)
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += timedelta(seconds=seconds)
+
+
+class PriceTransitionSchedulerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        cls.product_service = create_product_service(create_tax())
+        with cls.captureOnCommitCallbacks(execute=True):
+            cls.base = create_price(
+                cls.product_service, "5000", cls.now - timedelta(days=10)
+            )
+            cls.sale = create_price(
+                cls.product_service,
+                "4000",
+                cls.now - timedelta(days=1),
+                name="Sale",
+                end_date=cls.now + timedelta(days=2),
+                is_limited_sale=True,
+            )
+
+    def test_run_once_refreshes_after_sale_ends(self):
+        self.product_service.refresh_from_db()
+        self.assertEqual(self.product_service.price_summary, "SALE: (5000) -> 4000")
+        clock = FakeClock(self.now + timedelta(days=3))
+        refreshed = PriceTransitionScheduler(clock=clock).run_once()
+        self.assertEqual(refreshed, {self.product_service.id})
+        self.product_service.refresh_from_db()
+        self.assertEqual(self.product_service.price_summary, "5000")
+        self.assertEqual(self.product_service.current_price, self.base)
+
+    def test_run_once_skips_products_without_passed_boundary(self):
+        clock = FakeClock(self.now + timedelta(days=1))
+        self.assertEqual(PriceTransitionScheduler(clock=clock).run_once(), set())
+
+    def test_run_sleeps_until_boundary(self):
+        clock = FakeClock(self.now)
+        scheduler = PriceTransitionScheduler(clock=clock, sleep=clock.sleep)
+        scheduler.run(until=self.now + timedelta(days=2, hours=1))
+        self.product_service.refresh_from_db()
+        self.assertEqual(self.product_service.price_summary, "5000")
+        self.assertIsNone(self.product_service.next_price_change)
+
+
+class RecomputePriceSummariesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        tax = create_tax()
+        cls.product_services = [
+            create_product_service(tax, name=f"Class {i}") for i in range(3)
+        ]
+
+    def test_price_saves_are_deduplicated_per_product_on_commit(self):
+        product_service = self.product_services[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            for price in ("5000", "6000", "7000"):
+                create_price(
+                    product_service,
+                    price,
+                    self.now - timedelta(days=int(price) // 1000),
+                    name=price,
+                )
+            product_service.refresh_from_db()
+            self.assertEqual(product_service.price_summary, "")
+        product_service.refresh_from_db()
+        self.assertEqual(product_service.price_summary, "5000")
+
+    def test_failed_recompute_is_retried_by_next_flush(self):
+        product_service = self.product_services[0]
+        with mock.patch(
+            "products.signals.recompute_price_summaries", side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            with self.captureOnCommitCallbacks(execute=True):
+                create_price(product_service, "5000", self.now - timedelta(days=1))
+        flush_pending_price_summaries()
+        product_service.refresh_from_db()
+        self.assertEqual(product_service.price_summary, "5000")
+
+    def test_recompute_is_constant_queries(self):
+        for product_service in self.product_services:
+            create_price(product_service, "5000", self.now - timedelta(days=1))
+        ids = [p.id for p in self.product_services]
+        # select, prefetch prices, one bulk update and one dependent pages lookup
+        with self.assertNumQueries(4):
+            self.assertEqual(recompute_price_summaries(ids), 3)
+
+
+class PricingEngineTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.now = timezone.now()
+        tax = create_tax()
+        cls.product_services = []
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                product_service = create_product_service(tax, name=f"Class {i}")
+                create_price(product_service, "5000", cls.now - timedelta(days=10))
+                cls.product_services.append(product_service)
+            create_price(
+                cls.product_services[0],
+                "4000",
+                cls.now - timedelta(days=1),
+                name="Sale",
+                before_sale_price=Decimal("5000"),
+                end_date=cls.now + timedelta(days=2),
+                is_limited_sale=True,
+            )
+
+    def test_build_price_info(self):
+        price = ProductServicePrice(
+            name="Base",
+            display_name="Base",
+            price=Decimal("5000"),
+            start_date=self.now,
+        )
+        info = build_price_info(price, Decimal("10.00"))
+        self.assertEqual(info["pretax_price"], "5000")
+        self.assertEqual(info["posttax_price"], "5500")
+        self.assertIsNone(info["before_sale_pretax_price"])
+        self.assertIsNone(info["before_sale_posttax_price"])
+        self.assertEqual(build_price_info(None, Decimal("10.00")), {})
+
+    def test_build_class_price_info_keeps_its_shape(self):
+        price = ProductServicePrice(
+            name="Base",
+            display_name="Base",
+            price=Decimal("5000"),
+            start_date=self.now,
+        )
+        info = build_price_info(price, Decimal("10.00"))
+        self.assertNotIn("is_limited_sale", info)
+        info = build_class_price_info(info)
+        self.assertFalse(info["is_limited_sale"])
+        self.assertEqual(info["before_sale_pretax_price"], "None")
+        self.assertEqual(build_class_price_info({}), {})
+
+    def test_build_le_price_info_keeps_its_shape(self):
+        price = ProductServicePrice(
+            id=1,
+            name="Sale",
+            display_name="Sale",
+            price=Decimal("4000"),
+            before_sale_price=Decimal("5000"),
+            start_date=self.now,
+        )
+        info = build_le_price_info(price, Decimal("10.00"))
+        self.assertNotIn("is_sale", info)
+        self.assertFalse(info["is_limited_sale"])
+        self.assertEqual(info["id"], 1)
+        self.assertEqual(info["before_sale_pretax_price"], Decimal("5000"))
+        self.assertEqual(info["before_sale_posttax_price"], "5500")
+
+    def test_prime_prices_all_product_services_in_one_query(self):
+        engine = PricingEngine(self.now)
+        with self.assertNumQueries(1):
+            engine.prime([p.id for p in self.product_services])
+        with self.assertNumQueries(0):
+            infos = [engine.price_info(p) for p in self.product_services]
+        self.assertEqual(infos[0]["posttax_price"], "4400")
+        self.assertEqual(infos[0]["before_sale_posttax_price"], "5500")
+        self.assertEqual(infos[1]["posttax_price"], "5500")
 
-# Create your tests here.
+    def test_prime_uses_fixed_now_after_sale_ends(self):
+        engine = PricingEngine(self.now + timedelta(days=3))
+        # the expired sale needs the prices of its product loading
+        with self.assertNumQueries(2):
+            engine.prime([p.id for p in self.product_services])
+        info = engine.price_info(self.product_services[0])
+        self.assertEqual(info["posttax_price"], "5500")
+        self.assertFalse(info["is_sale"])
@@ -2,38 +2,57 @@ from django.shortcuts import render
 from django.http import JsonResponse, Http404
 
 from rest_framework.permissions import IsAuthenticated
-from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
+from core.api_cache import async_versioned_condition, get_model_versions
+from core.async_views import AsyncAPIView
 from .models import SuperSaasSchedule
 from .serializers import ScheduleSerializer
 
+# Models serialized by ScheduleSerializer
+SCHEDULE_MODELS = [
+    "schedules.SuperSaasSchedule",
+    "users.CustomUser",
+    "contacts.Contact",
+    "languageschools.LanguageSchool",
+]
 
-class ScheduleListView(APIView):
+
+def get_schedules():
+    # Everything ScheduleSerializer reads, so it can serialize in async views
+    return SuperSaasSchedule.objects.select_related(
+        "teacher__contact", "language_school"
+    )
+
+
+class ScheduleListView(AsyncAPIView):
     """Authenticated only list view for all supersass schedules"""
 
     permission_classes = [IsAuthenticated]
 
-    def get(self, request, format=None):
-        schedules = SuperSaasSchedule.objects.all()
+    @async_versioned_condition(
+        lambda request, **kwargs: get_model_versions(SCHEDULE_MODELS)
+    )
+    async def get(self, request, format=None):
+        schedules = [schedule async for schedule in get_schedules()]
         serializer = ScheduleSerializer(schedules, many=True)
         return Response(serializer.data)
 
 
-class ScheduleDetailView(APIView):
+class ScheduleDetailView(AsyncAPIView):
     """Authenticated only single supersaas schedule using slug"""
 
     permission_classes = [IsAuthenticated]
 
-    def get_object(self, slug):
+    async def get_object(self, slug):
         try:
-            schedule_obj = SuperSaasSchedule.objects.get(slug=slug)
+            schedule_obj = await get_schedules().aget(slug=slug)
             return schedule_obj
         except SuperSaasSchedule.DoesNotExist:
             raise Http404
 
-    def get(self, request, slug, format=None):
-        schedule = self.get_object(slug)
+    async def get(self, request, slug, format=None):
+        schedule = await self.get_object(slug)
         serializer = ScheduleSerializer(schedule)
         return Response(serializer.data)
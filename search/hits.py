@@ -0,0 +1,144 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import close_old_connections, models, transaction
+from django.utils import timezone
+from wagtail.contrib.search_promotions.models import Query, QueryDailyHits
+from wagtail.search.utils import normalise_query_string
+
+logger = logging.getLogger(__name__)
+
+# Failed saves in a row after which the pending hits are dropped, as they may be what
+# fails
+MAX_FLUSH_FAILURES = 3
+
+
+def save_hits(counts):
+    """Add counts of {(query string, date): hits} to the search promotions daily hits,
+    with a fixed number of queries however many there are"""
+    query_strings = {query_string for query_string, _ in counts}
+    with transaction.atomic():
+        Query.objects.bulk_create(
+            [Query(query_string=query_string) for query_string in query_strings],
+            ignore_conflicts=True,
+        )
+        query_ids = dict(
+            Query.objects.filter(query_string__in=query_strings).values_list(
+                "query_string", "id"
+            )
+        )
+        hits = Counter()
+        for (query_string, date), count in counts.items():
+            hits[query_ids[query_string], date] += count
+        QueryDailyHits.objects.bulk_create(
+            [QueryDailyHits(query_id=query_id, date=date) for query_id, date in hits],
+            ignore_conflicts=True,
+        )
+        daily_hits = [
+            daily
+            for daily in QueryDailyHits.objects.filter(
+                query_id__in={query_id for query_id, _ in hits},
+                date__in={date for _, date in hits},
+            ).order_by("id")
+            if (daily.query_id, daily.date) in hits
+        ]
+        for daily in daily_hits:
+            # Added in the database so flushes from other processes add up
+            daily.hits = models.F("hits") + hits[daily.query_id, daily.date]
+        QueryDailyHits.objects.bulk_update(daily_hits, ["hits"])
+
+
+class HitBuffer:
+    """
+    Counts search hits in memory, saving them every flush_interval seconds
+    or once max_pending queries and dates are counted. Saves run in a
+    background thread so searches do not wait on them, and hits left at
+    exit are saved then. Hits failing to save are kept for the next flush,
+    and dropped after MAX_FLUSH_FAILURES failures in a row.
+    """
+
+    def __init__(
+        self,
+        flush_interval=None,
+        max_pending=None,
+        background=True,
+        clock=time.monotonic,
+    ):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.background = background
+        self.clock = clock
+        self.counts = Counter()
+        self.lock = threading.Lock()
+        self.last_flush = clock()
+        self.flushing = False
+        self.failures = 0
+
+    def get_flush_interval(self):
+        if self.flush_interval is None:
+            return settings.SEARCH_HITS_FLUSH_INTERVAL
+        return self.flush_interval
+
+    def get_max_pending(self):
+        if self.max_pending is None:
+            return settings.SEARCH_HITS_MAX_PENDING
+        return self.max_pending
+
+    def add(self, query_string):
+        # Postgres rejects NUL characters in text
+        query_string = normalise_query_string(query_string.replace("\x00", ""))
+        if not query_string:
+            return
+        with self.lock:
+            self.counts[query_string, timezone.now().date()] += 1
+            due = not self.flushing and (
+                len(self.counts) >= self.get_max_pending()
+                or self.clock() - self.last_flush >= self.get_flush_interval()
+            )
+            if due:
+                self.flushing = True
+        if not due:
+            return
+        if self.background:
+            threading.Thread(target=self.flush_in_thread, daemon=True).start()
+        else:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, Counter()
+            self.last_flush = self.clock()
+        try:
+            if counts:
+                save_hits(counts)
+            self.failures = 0
+        except Exception:
+            logger.exception(f"Failed to save {sum(counts.values())} search hits")
+            self.failures += 1
+            if self.failures >= MAX_FLUSH_FAILURES:
+                logger.error(
+                    f"Dropped {sum(counts.values())} search hits after "
+                    f"{self.failures} failed saves"
+                )
+                self.failures = 0
+                return
+            with self.lock:
+                # Kept for the next flush
+                self.counts.update(counts)
+        finally:
+            with self.lock:
+                self.flushing = False
+
+    def flush_in_thread(self):
+        try:
+            self.flush()
+        finally:
+            close_old_connections()
+
+
+search_hits = HitBuffer()
+atexit.register(search_hits.flush)
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from search.queue import IndexWorker
+
+
+class Command(BaseCommand):
+    help = (
+        "Update the search index for pages and other objects queued when saved or "
+        "deleted. Run from cron, or with --loop to keep polling the queue."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep running and index objects as they are queued",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Max objects indexed in one transaction. Default 100",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=int,
+            default=5,
+            help="Seconds to sleep when the queue is empty in --loop mode. Default 5",
+        )
+
+    def handle(self, *args, **options):
+        worker = IndexWorker(batch_size=options["batch_size"])
+        if options["loop"]:
+            worker.run(poll_interval=options["poll_interval"])
+            return
+        indexed = 0
+        while count := worker.run_once():
+            indexed += count
+        self.stdout.write(f"Indexed {indexed} object(s)")
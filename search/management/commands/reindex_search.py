@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from search.queue import reindex
+
+
+class Command(BaseCommand):
+    help = (
+        "Index every page and other indexed object, sharing the work between "
+        "processes. Unlike update_index the index is not cleared first, so search "
+        "keeps working while it runs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--processes",
+            type=int,
+            default=None,
+            help="Processes to index with. Default the number of CPUs",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=200,
+            help="Objects indexed together by a process. Default 200",
+        )
+
+    def handle(self, *args, **options):
+        indexed = reindex(
+            processes=options["processes"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(f"Indexed {indexed} object(s)")
@@ -0,0 +1,30 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import models
+from django.utils import timezone
+
+
+class IndexQueueItem(models.Model):
+    """An object whose search index entries are updated by the index_search command,
+    queued when it is saved or deleted so that publishing does not wait on indexing.
+    See search.queue"""
+
+    content_type = models.ForeignKey(
+        ContentType, on_delete=models.CASCADE, related_name="+"
+    )
+    object_id = models.CharField(max_length=255)
+    queued_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    # Set while a worker indexes the object, so that others skip it
+    claimed_until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.content_type_id}:{self.object_id}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["content_type", "object_id"],
+                name="search_indexqueueitem_unique_object",
+            )
+        ]
@@ -0,0 +1,174 @@
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from itertools import groupby
+
+import django
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import connections, models, transaction
+from django.utils import timezone
+from wagtail.search.backends import get_search_backends
+from wagtail.search.index import get_indexed_models
+
+from .models import IndexQueueItem
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_objects(content_type_id, object_ids):
+    """Queue objects for the index worker. An object already queued is queued again,
+    releasing any worker's claim, so an update made while a worker indexes it is
+    picked up by the next batch"""
+    now = timezone.now()
+    IndexQueueItem.objects.bulk_create(
+        [
+            IndexQueueItem(
+                content_type_id=content_type_id,
+                object_id=str(object_id),
+                queued_at=now,
+            )
+            for object_id in dict.fromkeys(object_ids)
+        ],
+        update_conflicts=True,
+        unique_fields=["content_type", "object_id"],
+        update_fields=["queued_at", "attempts", "last_error", "claimed_until"],
+    )
+
+
+def index_objects(model, object_ids):
+    """Add the objects of model with object_ids to every search backend, and remove
+    those no longer indexed, eg. deleted. Returns the number added"""
+    objects = list(model.get_indexed_objects().filter(pk__in=object_ids))
+    found = {str(obj.pk) for obj in objects}
+    removed = [object_id for object_id in object_ids if str(object_id) not in found]
+    for backend in get_search_backends():
+        backend.add_bulk(model, objects)
+        for object_id in removed:
+            backend.delete(model(pk=object_id))
+    return len(objects)
+
+
+class IndexWorker:
+    """Updates the search index for queued objects, a batch at a time with one bulk add
+    per model. A batch is claimed for claim_timeout seconds in a short transaction,
+    skipping rows locked by other workers, and indexed after it commits, so queueing a
+    save never waits on indexing. Each claim counts as an attempt, and a model's
+    objects are retried by later batches if indexing them fails or the worker dies, up
+    to max_attempts times."""
+
+    def __init__(
+        self,
+        batch_size=100,
+        max_attempts=5,
+        claim_timeout=10 * 60,
+        clock=timezone.now,
+        sleep=time.sleep,
+    ):
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.claim_timeout = claim_timeout
+        self.clock = clock
+        self.sleep = sleep
+
+    def index_batch(self, items):
+        """Returns the items indexed, and updates the failed ones"""
+        indexed = []
+        for content_type_id, group in groupby(
+            sorted(items, key=lambda item: item.content_type_id),
+            key=lambda item: item.content_type_id,
+        ):
+            group = list(group)
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            if model is None:
+                # The model was removed
+                indexed.extend(group)
+                continue
+            try:
+                with transaction.atomic():
+                    index_objects(model, [item.object_id for item in group])
+            except Exception as error:
+                logger.exception(f"Failed to index {model._meta.label} objects")
+                for item in group:
+                    item.last_error = str(error)
+            else:
+                indexed.extend(group)
+        return indexed
+
+    def claim(self, now):
+        """Due items, claimed so that other workers skip them"""
+        claimed_until = now + timedelta(seconds=self.claim_timeout)
+        with transaction.atomic():
+            items = list(
+                IndexQueueItem.objects.select_for_update(skip_locked=True)
+                .filter(attempts__lt=self.max_attempts)
+                .filter(
+                    models.Q(claimed_until__isnull=True)
+                    | models.Q(claimed_until__lte=now)
+                )
+                .order_by("queued_at")[: self.batch_size]
+            )
+            IndexQueueItem.objects.filter(pk__in=[item.pk for item in items]).update(
+                attempts=models.F("attempts") + 1, claimed_until=claimed_until
+            )
+        for item in items:
+            item.claimed_until = claimed_until
+        return items
+
+    def run_once(self):
+        """Index one batch of queued objects. Returns the number indexed"""
+        items = self.claim(self.clock())
+        if not items:
+            return 0
+        indexed = self.index_batch(items)
+        # Items queued again while being indexed are no longer claimed, and are left
+        # for the next batch
+        claimed = IndexQueueItem.objects.filter(claimed_until=items[0].claimed_until)
+        claimed.filter(pk__in=[item.pk for item in indexed]).delete()
+        for item in items:
+            if item not in indexed:
+                claimed.filter(pk=item.pk).update(
+                    last_error=item.last_error, claimed_until=None
+                )
+        return len(indexed)
+
+    def run(self, poll_interval=5, until=None):
+        """Keep indexing, sleeping poll_interval seconds whenever the queue is empty"""
+        while until is None or self.clock() < until:
+            if not self.run_once():
+                self.sleep(poll_interval)
+
+
+def _setup_process():
+    # Needed when processes are spawned rather than forked
+    django.setup()
+
+
+def _index_chunk(model_label, object_ids):
+    return index_objects(apps.get_model(model_label), object_ids)
+
+
+def reindex(processes=None, chunk_size=200):
+    """Index every indexed object, in chunks of chunk_size shared between processes.
+    Entries of objects deleted without being queued are left, use update_index to
+    rebuild the index from scratch. Returns the number of objects indexed"""
+    chunks = []
+    for model in get_indexed_models():
+        object_ids = list(
+            model.get_indexed_objects().order_by("pk").values_list("pk", flat=True)
+        )
+        chunks.extend(
+            (model._meta.label, object_ids[start : start + chunk_size])
+            for start in range(0, len(object_ids), chunk_size)
+        )
+    processes = processes or os.cpu_count()
+    if processes == 1:
+        return sum(_index_chunk(*chunk) for chunk in chunks)
+    # Forked processes must not share the parent's database connections
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=processes, initializer=_setup_process
+    ) as executor:
+        return sum(executor.map(_index_chunk, *zip(*chunks))) if chunks else 0
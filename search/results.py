@@ -0,0 +1,45 @@
+from wagtail.models import Page
+
+from search.tokenize import tokenize_query
+
+
+def search_pages(query, model=None):
+    """Live pages matching every word of query, of model and its subclasses if given"""
+    pages = Page.objects.live()
+    if model is not None:
+        pages = pages.type(model)
+    return pages.search(tokenize_query(query), operator="and")
+
+
+class ResultsPage:
+    """
+    limit results from offset, for paging through search results. One more
+    result is fetched to tell if there is a next page, rather than counting
+    every result as Paginator does.
+    """
+
+    def __init__(self, results, offset, limit):
+        items = list(results[offset : offset + limit + 1])
+        self.object_list = items[:limit]
+        self.offset = offset
+        self.limit = limit
+        self.number = offset // limit + 1
+        self._has_next = len(items) > limit
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self.offset > 0
+
+    def next_page_number(self):
+        return self.number + 1
+
+    def previous_page_number(self):
+        return self.number - 1
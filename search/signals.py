@@ -0,0 +1,28 @@
+from functools import partial
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from wagtail.models import Page
+from wagtail.search.index import get_indexed_models
+
+from .queue import enqueue_objects
+
+
+def queue_for_indexing(sender, instance, **kwargs):
+    # A page's content_type is its specific type, which is the model indexed
+    if isinstance(instance, Page):
+        content_type_id = instance.content_type_id
+    else:
+        content_type_id = ContentType.objects.get_for_model(instance).id
+    # The pk is cleared once a delete finishes
+    transaction.on_commit(partial(enqueue_objects, content_type_id, [instance.pk]))
+
+
+# Replaces Wagtail's own handlers, which index inline and are disabled by AUTO_UPDATE
+# in WAGTAILSEARCH_BACKENDS unless SEARCH_INDEX_QUEUE is off
+for model in get_indexed_models():
+    if settings.SEARCH_INDEX_QUEUE and getattr(model, "search_auto_update", True):
+        post_save.connect(queue_for_indexing, sender=model)
+        post_delete.connect(queue_for_indexing, sender=model)
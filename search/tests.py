@@ -0,0 +1,297 @@
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from wagtail.contrib.search_promotions.models import Query, QueryDailyHits
+from wagtail.images import get_image_model
+from wagtail.images.tests.utils import get_test_image_file
+from wagtail.models import Site
+from wagtail.rich_text import RichText
+
+from core.models import Language
+from lessons.models import LessonCategory, LessonDetailPage
+import search.queue
+from search.hits import MAX_FLUSH_FAILURES, HitBuffer
+from search.models import IndexQueueItem
+from search.queue import IndexWorker, reindex
+from search.tokenize import cjk_index_text, tokenize_query
+from singles.models import PrivacyPage
+from staff.models import StaffDetailPage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class TokenizeTests(SimpleTestCase):
+    def test_cjk_text_is_indexed_as_characters_and_pairs(self):
+        self.assertEqual(cjk_index_text("東京都", "<p>Tokyo は</p>"), "東 京 都 東京 京都 は")
+
+    def test_query_cjk_runs_become_pairs(self):
+        self.assertEqual(tokenize_query("東京都 English 猫"), "東京 京都 english 猫")
+        # Full width letters are folded
+        self.assertEqual(tokenize_query("ＡＢＣ"), "abc")
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class PagesTestCase(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        # Hits are counted by a buffer of the test's own, saved when it flushes
+        self.hits = HitBuffer(flush_interval=3600, background=False)
+        patcher = mock.patch("search.views.search_hits", self.hits)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        # Pages are queued for indexing when the transaction commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_pages()
+
+    def create_pages(self):
+        root = Site.objects.get(is_default_site=True).root_page
+        image = get_image_model().objects.create(
+            title="Test", file=get_test_image_file()
+        )
+        author = root.add_child(
+            instance=StaffDetailPage(
+                title="Taro",
+                member=get_user_model().objects.create_user(
+                    email="taro@example.com", password="password", is_staff=True
+                ),
+                profile_image=image,
+                display_name="Taro",
+                display_tagline="Teacher",
+                intro="Intro",
+                role="Teacher",
+                country="Japan",
+                native_language=Language.objects.create(
+                    name_en="Japanese", name_ja="日本語", slug="japanese"
+                ),
+                hobbies="Reading",
+            )
+        )
+        lesson = {
+            "header_image": image,
+            "author": author,
+            "category": LessonCategory.objects.create(
+                name="Grammar", ja_name="文法", slug="grammar"
+            ),
+        }
+        self.lesson = root.add_child(
+            instance=LessonDetailPage(
+                **lesson,
+                title="Prepositions",
+                display_title="英語の前置詞の使い方",
+                display_tagline="Learn how to use in, on and at",
+                estimated_time=10,
+                lesson_content=[
+                    ("rich_text", RichText("<p>時間と場所を表す前置詞</p>")),
+                ],
+            )
+        )
+        self.other_lesson = root.add_child(
+            instance=LessonDetailPage(
+                **lesson,
+                title="Places",
+                display_title="場所の言い方",
+                display_tagline="Talk about places",
+                estimated_time=5,
+            )
+        )
+        root.add_child(
+            instance=PrivacyPage(
+                title="Privacy", display_title="Privacy", content="<p>Privacy</p>"
+            )
+        )
+
+    def search(self, **params):
+        response = self.client.get("/api/v2/search/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def search_ids(self, query):
+        return [item["id"] for item in self.search(query=query)["items"]]
+
+
+class SearchTests(PagesTestCase):
+    def setUp(self):
+        super().setUp()
+        IndexWorker().run_once()
+
+    def test_japanese_words_are_found_inside_text(self):
+        data = self.search(query="前置詞")
+        self.assertEqual([item["id"] for item in data["items"]], [self.lesson.id])
+        self.assertEqual(data["items"][0]["type"], "lessons.LessonDetailPage")
+        self.assertEqual(self.search(query="使い方")["items"][0]["id"], self.lesson.id)
+        self.assertEqual(self.search(query="後置詞")["items"], [])
+
+    def test_english_and_stream_field_text_is_found(self):
+        self.assertEqual(
+            self.search(query="prepositions")["items"][0]["id"], self.lesson.id
+        )
+        self.assertEqual(self.search(query="場所を表す")["items"][0]["id"], self.lesson.id)
+
+    def test_type_and_paging(self):
+        data = self.search(query="場所", limit=1)
+        self.assertEqual(len(data["items"]), 1)
+        self.assertTrue(data["has_next"])
+        data = self.search(query="場所", offset=1, limit=1)
+        self.assertEqual(len(data["items"]), 1)
+        self.assertFalse(data["has_next"])
+        self.assertEqual(
+            self.search(query="場所", type="singles.PrivacyPage")["items"], []
+        )
+        response = self.client.get("/api/v2/search/", {"query": "a", "type": "x.Y"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_hits_are_buffered(self):
+        self.search(query="前置詞")
+        self.client.get("/search/", {"query": "前置詞 "})
+        self.assertFalse(Query.objects.exists())
+        self.hits.flush()
+        self.assertEqual(Query.objects.get(query_string="前置詞").hits, 2)
+
+    def test_search_page(self):
+        response = self.client.get("/search/", {"query": "前置詞"})
+        self.assertEqual(
+            list(response.context["search_results"]), [self.lesson.page_ptr]
+        )
+
+
+class IndexQueueTests(PagesTestCase):
+    def test_saves_are_queued_until_indexed(self):
+        self.assertEqual(self.search_ids("前置詞"), [])
+        # The image, staff page, two lessons and privacy page
+        self.assertEqual(IndexQueueItem.objects.count(), 5)
+        self.assertEqual(IndexWorker().run_once(), 5)
+        self.assertEqual(self.search_ids("前置詞"), [self.lesson.id])
+        self.assertFalse(IndexQueueItem.objects.exists())
+
+    def test_objects_are_queued_once(self):
+        IndexWorker().run_once()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.display_title = "前置詞"
+            self.lesson.save()
+            self.lesson.save()
+        self.assertEqual(IndexQueueItem.objects.get().object_id, str(self.lesson.id))
+
+    def test_deleted_pages_are_removed(self):
+        IndexWorker().run_once()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.delete()
+        IndexWorker().run_once()
+        self.assertEqual(self.search_ids("前置詞"), [])
+
+    def test_failed_models_are_retried(self):
+        worker = IndexWorker(max_attempts=2)
+        with mock.patch(
+            "search.queue.index_objects", side_effect=ValueError("down")
+        ), self.assertLogs("search.queue", "ERROR"):
+            self.assertEqual(worker.run_once(), 0)
+            self.assertEqual(worker.run_once(), 0)
+        self.assertEqual(IndexQueueItem.objects.filter(attempts=2).count(), 5)
+        self.assertEqual(IndexQueueItem.objects.first().last_error, "down")
+        # Given up on until queued again by a save
+        self.assertEqual(worker.run_once(), 0)
+
+    def test_abandoned_claims_count_as_attempts(self):
+        now = timezone.now()
+        worker = IndexWorker(max_attempts=2, clock=lambda: now)
+        worker.claim(now)
+        # Claimed by a worker that died
+        self.assertEqual(worker.run_once(), 0)
+        now += timedelta(seconds=worker.claim_timeout)
+        worker.claim(now)
+        now += timedelta(seconds=worker.claim_timeout)
+        self.assertEqual(worker.run_once(), 0)
+        self.assertEqual(IndexQueueItem.objects.filter(attempts=2).count(), 5)
+
+    def test_saves_while_indexing_are_kept(self):
+        worker = IndexWorker()
+        index_objects = search.queue.index_objects
+
+        def save_while_indexing(model, object_ids):
+            if str(self.lesson.id) in object_ids:
+                with self.captureOnCommitCallbacks(execute=True):
+                    self.lesson.save()
+            return index_objects(model, object_ids)
+
+        with mock.patch("search.queue.index_objects", save_while_indexing):
+            self.assertEqual(worker.run_once(), 5)
+        item = IndexQueueItem.objects.get()
+        self.assertEqual(item.object_id, str(self.lesson.id))
+        self.assertIsNone(item.claimed_until)
+
+    def test_reindex(self):
+        IndexQueueItem.objects.all().delete()
+        # The site's existing pages too
+        self.assertGreater(reindex(processes=1), 5)
+        self.assertEqual(self.search_ids("前置詞"), [self.lesson.id])
+
+
+class HitBufferTests(TestCase):
+    def setUp(self):
+        self.now = 0
+        self.hits = HitBuffer(
+            flush_interval=60,
+            max_pending=3,
+            background=False,
+            clock=lambda: self.now,
+        )
+
+    def get_hits(self):
+        return dict(QueryDailyHits.objects.values_list("query__query_string", "hits"))
+
+    def test_hits_are_saved_every_flush_interval(self):
+        self.hits.add("Tokyo")
+        self.hits.add("tokyo  ")
+        self.hits.add("osaka")
+        self.assertEqual(self.get_hits(), {})
+        self.now = 60
+        self.hits.add("Tokyo")
+        self.assertEqual(self.get_hits(), {"tokyo": 3, "osaka": 1})
+
+    def test_hits_are_saved_once_max_pending_are_counted(self):
+        for query_string in ["a", "b", "c"]:
+            self.hits.add(query_string)
+        self.assertEqual(self.get_hits(), {"a": 1, "b": 1, "c": 1})
+
+    def test_hits_are_added_to_saved_hits(self):
+        query = Query.get("tokyo")
+        query.add_hit()
+        self.hits.add("tokyo")
+        self.hits.add("tokyo")
+        self.hits.flush()
+        self.assertEqual(self.get_hits(), {"tokyo": 3})
+        self.assertEqual(QueryDailyHits.objects.get().date, timezone.now().date())
+
+    def test_failed_saves_are_kept(self):
+        self.hits.add("tokyo")
+        with mock.patch(
+            "search.hits.save_hits", side_effect=ValueError
+        ), self.assertLogs("search.hits", "ERROR"):
+            self.hits.flush()
+        self.hits.flush()
+        self.assertEqual(self.get_hits(), {"tokyo": 1})
+
+    def test_hits_are_dropped_after_repeated_failures(self):
+        self.hits.add("tokyo")
+        with mock.patch(
+            "search.hits.save_hits", side_effect=ValueError
+        ), self.assertLogs("search.hits", "ERROR") as logs:
+            for _ in range(MAX_FLUSH_FAILURES):
+                self.hits.flush()
+        self.assertIn("Dropped 1 search hits", logs.output[-1])
+        self.hits.flush()
+        self.assertEqual(self.get_hits(), {})
+
+    def test_nul_characters_are_removed(self):
+        self.hits.add("tok\x00yo")
+        self.hits.flush()
+        self.assertEqual(self.get_hits(), {"tokyo": 1})
@@ -0,0 +1,74 @@
+import re
+import unicodedata
+
+from django.utils.html import strip_tags
+from wagtail.blocks import StreamValue
+from wagtail.rich_text import RichText
+from wagtail.search import index
+
+# Hiragana, katakana, CJK ideographs and half width katakana. Japanese has no spaces
+# between words, so runs of these are indexed as overlapping two character grams
+CJK_RUN = re.compile(
+    r"[\u3040-\u309f\u30a0-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]+"
+)
+
+
+def normalize(text):
+    # NFKC folds full width letters and digits, and half width katakana
+    return unicodedata.normalize("NFKC", text).lower()
+
+
+def get_text(value):
+    """Plain text of a string, rich text or stream field value"""
+    if value is None:
+        return ""
+    if isinstance(value, StreamValue):
+        # Walking the blocks is the slow part of indexing a page, so it is done once
+        # for both the field and cjk_search_text
+        if not hasattr(value, "search_text"):
+            value.search_text = " ".join(
+                get_text(text)
+                for child in value
+                for text in child.block.get_searchable_content(child.value)
+            )
+        return value.search_text
+    if isinstance(value, RichText):
+        value = value.source
+    return strip_tags(str(value))
+
+
+class TextSearchField(index.SearchField):
+    """SearchField for a stream field or rich text, indexed as its plain text"""
+
+    def get_value(self, obj):
+        return get_text(getattr(obj, self.field_name))
+
+
+def cjk_grams(text):
+    """The single characters and character pairs of each CJK run in text"""
+    grams = []
+    for run in CJK_RUN.findall(normalize(text)):
+        grams.extend(run)
+        grams.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return grams
+
+
+def cjk_index_text(*values):
+    """Text for a search field so CJK words can be found, see tokenize_query"""
+    return " ".join(dict.fromkeys(cjk_grams(" ".join(map(get_text, values)))))
+
+
+def tokenize_query(query):
+    """
+    query with each CJK run replaced by its character pairs, or the character
+    itself for a single character, matching cjk_index_text. Search with
+    operator="and" so every pair has to match.
+    """
+
+    def grams(match):
+        run = match.group()
+        if len(run) == 1:
+            return f" {run} "
+        return " " + " ".join(run[i : i + 2] for i in range(len(run) - 1)) + " "
+
+    return " ".join(CJK_RUN.sub(grams, normalize(query)).split())
@@ -0,0 +1,9 @@
+from django.urls import path
+from rest_framework.urlpatterns import format_suffix_patterns
+from search import views
+
+urlpatterns = [
+    path("", views.SearchAPIView.as_view()),
+]
+
+urlpatterns = format_suffix_patterns(urlpatterns)
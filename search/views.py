@@ -1,32 +1,39 @@
-from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.apps import apps
+from django.conf import settings
 from django.template.response import TemplateResponse
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
 
 from wagtail.models import Page
-from wagtail.contrib.search_promotions.models import Query
+
+from core.async_views import AsyncAPIView, run_sync
+from search.hits import search_hits
+from search.results import ResultsPage, search_pages
+
+RESULTS_PER_PAGE = 10
 
 
 def search(request):
     search_query = request.GET.get("query", None)
-    page = request.GET.get("page", 1)
+    try:
+        page = max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
 
     # Search
     if search_query:
-        search_results = Page.objects.live().search(search_query)
-        query = Query.get(search_query)
+        search_results = search_pages(search_query)
 
         # Record hit
-        query.add_hit()
+        search_hits.add(search_query)
     else:
         search_results = Page.objects.none()
 
     # Pagination
-    paginator = Paginator(search_results, 10)
-    try:
-        search_results = paginator.page(page)
-    except PageNotAnInteger:
-        search_results = paginator.page(1)
-    except EmptyPage:
-        search_results = paginator.page(paginator.num_pages)
+    search_results = ResultsPage(
+        search_results, (page - 1) * RESULTS_PER_PAGE, RESULTS_PER_PAGE
+    )
 
     return TemplateResponse(
         request,
@@ -36,3 +43,64 @@ def search(request):
             "search_results": search_results,
         },
     )
+
+
+def get_int_param(request, name, default, maximum=None):
+    try:
+        value = int(request.GET.get(name, default))
+    except ValueError:
+        raise ValidationError({name: "Must be a whole number"})
+    if value < 0 or (maximum is not None and value > maximum):
+        raise ValidationError({name: f"Must be from 0 to {maximum}"})
+    return value
+
+
+def get_search_model(request):
+    """The page model named by the type parameter, eg. lessons.LessonDetailPage"""
+    label = request.GET.get("type")
+    if not label:
+        return None
+    try:
+        model = apps.get_model(label)
+    except (LookupError, ValueError):
+        model = None
+    if model is None or not issubclass(model, Page):
+        raise ValidationError({"type": f"{label} is not a page type"})
+    return model
+
+
+def get_search_results(query, model, offset, limit):
+    results = ResultsPage(search_pages(query, model), offset, limit)
+    return {
+        "items": [
+            {
+                "id": page.id,
+                "type": page.specific_class._meta.label,
+                "title": page.title,
+                "slug": page.slug,
+                "search_description": page.search_description,
+            }
+            for page in results
+        ],
+        "has_next": results.has_next(),
+    }
+
+
+class SearchAPIView(AsyncAPIView):
+    """
+    Search live pages, with Japanese words matched by character pairs, see
+    search.tokenize. Takes query, with optional type, offset and limit.
+    """
+
+    permission_classes = [IsAuthenticatedOrReadOnly]
+
+    async def get(self, request, format=None):
+        query = request.GET.get("query", "").strip()
+        model = get_search_model(request)
+        offset = get_int_param(request, "offset", 0)
+        limit = get_int_param(request, "limit", 10, settings.WAGTAILAPI_LIMIT_MAX)
+        if not query or not limit:
+            return Response({"items": [], "has_next": False})
+        search_hits.add(query)
+        data = await run_sync(request, get_search_results, query, model, offset, limit)
+        return Response(data)
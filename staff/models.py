@@ -8,8 +8,11 @@ from wagtail.models import Page, Orderable
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel, InlinePanel
 from wagtail.fields import StreamField
 from wagtail.api import APIField
+from wagtail.search import index
 
 from core.models import Language
+from core.renditions import get_rendition_attrs
+from search.tokenize import TextSearchField, cjk_index_text
 from streams import customblocks
 
 # ======== Field Serializers ==========
@@ -40,8 +43,8 @@ class StaffProfileImageSerializer(Field):
         return {
             "id": value.id,
             "title": value.title,
-            "original": value.get_rendition("original").attrs_dict,
-            "thumbnail": value.get_rendition("fill-400x400").attrs_dict,
+            "original": get_rendition_attrs(value, "original", self.context),
+            "thumbnail": get_rendition_attrs(value, "fill-400x400", self.context),
         }
 
 
@@ -210,6 +213,17 @@ class StaffDetailPage(HeadlessMixin, Page):
         APIField("interview"),
     ]
 
+    # Search configuration
+    search_fields = Page.search_fields + [
+        index.SearchField("display_name", boost=2),
+        index.SearchField("display_tagline"),
+        index.SearchField("intro"),
+        index.SearchField("role"),
+        index.SearchField("hobbies"),
+        TextSearchField("interview"),
+        index.SearchField("cjk_search_text"),
+    ]
+
     # Page limitations
     parent_page_types = [
         "staff.StaffListPage",
@@ -219,6 +233,17 @@ class StaffDetailPage(HeadlessMixin, Page):
     def __str__(self):
         return self.title
 
+    def cjk_search_text(self):
+        return cjk_index_text(
+            self.title,
+            self.display_name,
+            self.display_tagline,
+            self.intro,
+            self.role,
+            self.hobbies,
+            self.interview,
+        )
+
 
 class LanguagesSpoken(Orderable):
     """Orderable field for languages the person speaks"""
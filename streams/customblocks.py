@@ -2,6 +2,8 @@ from wagtail import blocks
 
 from wagtail.images.blocks import ImageChooserBlock
 
+from core.renditions import get_rendition_attrs, get_responsive_attrs
+
 # =============== Simple Char Blocks ======================
 
 
@@ -23,30 +25,34 @@ class ShortCharBlock(blocks.StructBlock):
 
 
 class CustomImageChooserBlock(ImageChooserBlock):
-    """Customize api json response to include url string to image and thumbnail. Images are of 16/10 aspect ratio."""
+    """Customize api json response to include url string to image and thumbnail, plus srcset
+    ladders in WebP and AVIF. Images are of 16/10 aspect ratio."""
 
     def get_api_representation(self, value, context=None):
         if value:
             return {
                 "id": value.id,
                 "title": value.title,
-                "original": value.get_rendition("original").attrs_dict,
-                "medium": value.get_rendition("fill-1024x640").attrs_dict,
-                "thumbnail": value.get_rendition("fill-560x350").attrs_dict,
+                "original": get_rendition_attrs(value, "original", context),
+                "medium": get_rendition_attrs(value, "fill-1024x640", context),
+                "thumbnail": get_rendition_attrs(value, "fill-560x350", context),
+                **get_responsive_attrs(value, "landscape", context),
             }
 
 
 class CustomSquareImageChooserBlock(ImageChooserBlock):
-    """Customize api json response to include url string to image and thumbnail. Images are of 1/1 aspect ratio."""
+    """Customize api json response to include url string to image and thumbnail, plus srcset
+    ladders in WebP and AVIF. Images are of 1/1 aspect ratio."""
 
     def get_api_representation(self, value, context=None):
         if value:
             return {
                 "id": value.id,
                 "title": value.title,
-                "original": value.get_rendition("original").attrs_dict,
-                "medium": value.get_rendition("fill-1024x1024").attrs_dict,
-                "thumbnail": value.get_rendition("fill-560x560").attrs_dict,
+                "original": get_rendition_attrs(value, "original", context),
+                "medium": get_rendition_attrs(value, "fill-1024x1024", context),
+                "thumbnail": get_rendition_attrs(value, "fill-560x560", context),
+                **get_responsive_attrs(value, "square", context),
             }
 
 
@@ -7,8 +7,11 @@ from wagtail.models import Page
 from wagtail.admin.panels import FieldPanel, MultiFieldPanel
 from wagtail.fields import StreamField, RichTextField
 from wagtail.api import APIField
+from wagtail.search import index
 
+from search.tokenize import TextSearchField, cjk_index_text
 from streams import customblocks
+from core.renditions import get_rendition_attrs
 from django.db import models
 
 
@@ -17,9 +20,9 @@ class CustomerSquareImageSerializer(Field):
         return {
             "id": value.id,
             "title": value.title,
-            "original": value.get_rendition("original").attrs_dict,
-            "medium": value.get_rendition("fill-740x740").attrs_dict,
-            "thumbnail": value.get_rendition("fill-400x400").attrs_dict,
+            "original": get_rendition_attrs(value, "original", self.context),
+            "medium": get_rendition_attrs(value, "fill-740x740", self.context),
+            "thumbnail": get_rendition_attrs(value, "fill-400x400", self.context),
         }
 
 
@@ -28,9 +31,9 @@ class CustomerPortraitImageSerializer(Field):
         return {
             "id": value.id,
             "title": value.title,
-            "original": value.get_rendition("original").attrs_dict,
-            "medium": value.get_rendition("fill-1400x1800").attrs_dict,
-            "thumbnail": value.get_rendition("fill-560x720").attrs_dict,
+            "original": get_rendition_attrs(value, "original", self.context),
+            "medium": get_rendition_attrs(value, "fill-1400x1800", self.context),
+            "thumbnail": get_rendition_attrs(value, "fill-560x720", self.context),
         }
 
 
@@ -200,6 +203,17 @@ class TestimonialDetailPage(HeadlessMixin, Page):
         APIField("customer_interview"),
     ]
 
+    # Search configuration
+    search_fields = Page.search_fields + [
+        index.SearchField("customer_name", boost=2),
+        index.SearchField("occupation"),
+        index.SearchField("organization_name"),
+        index.SearchField("lead_sentence"),
+        TextSearchField("comment"),
+        TextSearchField("customer_interview"),
+        index.SearchField("cjk_search_text"),
+    ]
+
     # Page limitations, Meta and methods
     parent_page_types = [
         "testimonials.TestimonialListPage",
@@ -213,3 +227,14 @@ class TestimonialDetailPage(HeadlessMixin, Page):
 
     def __str__(self):
         return self.title
+
+    def cjk_search_text(self):
+        return cjk_index_text(
+            self.title,
+            self.customer_name,
+            self.occupation,
+            self.organization_name,
+            self.lead_sentence,
+            self.comment,
+            self.customer_interview,
+        )
@@ -8,6 +8,10 @@ class CustomUserManager(BaseUserManager):
     for authentication instead of username.
     """
 
+    def get_by_natural_key(self, email):
+        """Find users for login by email ignoring case, using the Lower("email") index"""
+        return self.get(email__lower=email.lower())
+
     def create_user(self, email, password, **extra_fields):
         """
         Create and save a user with the given email and password.
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.1 on 2026-10-18 17:40
+
+from django.db import migrations, models
+import django.db.models.functions.text
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def report_case_duplicates(apps, schema_editor):
+    # normalize_email only lowercases the domain, so users may exist whose emails
+    # differ only in case. Accounts are not merged automatically, so list them to be
+    # resolved before the constraint is added
+    CustomUser = apps.get_model("users", "CustomUser")
+    duplicates = (
+        CustomUser.objects.annotate(email_lower=Lower("email"))
+        .values("email_lower")
+        .annotate(count=Count("pk"))
+        .filter(count__gt=1)
+        .values_list("email_lower", flat=True)
+    )
+    if duplicates:
+        users = CustomUser.objects.annotate(email_lower=Lower("email")).filter(
+            email_lower__in=list(duplicates)
+        )
+        raise RuntimeError(
+            "Users have emails differing only in case. Merge or change these "
+            "accounts, then migrate again:\n"
+            + "\n".join(f"{user.email} (user {user.pk})" for user in users)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("users", "0003_add_permission_groups"),
+    ]
+
+    operations = [
+        migrations.RunPython(report_case_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="customuser",
+            constraint=models.UniqueConstraint(
+                django.db.models.functions.text.Lower("email"),
+                name="users_customuser_email_lower_unique",
+            ),
+        ),
+    ]
@@ -2,6 +2,7 @@ import uuid
 
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
@@ -47,6 +48,11 @@ class CustomUser(AbstractBaseUser, PermissionsMixin):
         verbose_name = "User"
         verbose_name_plural = "Users"
         abstract = False
+        constraints = [
+            models.UniqueConstraint(
+                Lower("email"), name="users_customuser_email_lower_unique"
+            ),
+        ]
 
     objects = CustomUserManager()
 
@@ -132,7 +132,9 @@ class CustomLoginSerializer(serializers.Serializer):
     def get_auth_user_using_orm(self, username, email, password):
         if email:
             try:
-                username = UserModel.objects.get(email__iexact=email).get_username()
+                username = UserModel.objects.get(
+                    email__lower=email.lower()
+                ).get_username()
             except UserModel.DoesNotExist:
                 pass
 
@@ -1,5 +1,7 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 
 NORMAL = {
     "email": "normal@user.com",
@@ -47,3 +49,12 @@ class UsersManagersTests(TestCase):
             pass
         with self.assertRaises(ValueError):
             User.objects.create_superuser(is_superuser=False, **SUPER)
+
+    def test_email_is_unique_ignoring_case(self):
+        User = get_user_model()
+        user = User.objects.create_user(**NORMAL)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(User.objects.get_by_natural_key("Normal@User.com"), user)
+        self.assertIn("LOWER(", queries[0]["sql"].upper())
+        with self.assertRaises(IntegrityError):
+            User.objects.create_user(email="NORMAL@user.com", password="password")
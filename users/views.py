@@ -8,6 +8,8 @@ from django.contrib.auth import get_user_model
 from rest_framework.permissions import IsAuthenticated
 
 from contacts.serializers import GetUpdateContactSerializer
+from core.api_cache import async_versioned_condition, get_model_versions
+from core.async_views import AsyncAPIView
 from users.serializers import CustomUserDetailsSerializer
 from contacts.models import Contact
 
@@ -15,21 +17,31 @@ from contacts.models import Contact
 UserModel = get_user_model()
 
 
-class GetUserInfo(APIView):
+class GetUserInfo(AsyncAPIView):
     """
     Get current user information relevant to permissions, names and staff status
     """
 
     permission_classes = [IsAuthenticated]
 
-    def get_object(self, pk):
+    async def get_object(self, pk):
         try:
-            return UserModel.objects.get(pk=pk)
+            # Everything CustomUserDetailsSerializer reads
+            return await (
+                UserModel.objects.select_related("contact")
+                .prefetch_related("groups")
+                .aget(pk=pk)
+            )
         except UserModel.DoesNotExist:
             raise Http404
 
-    def get(self, request, pk, format=None):
-        user = self.get_object(pk)
+    @async_versioned_condition(
+        lambda request, **kwargs: get_model_versions(
+            ["users.CustomUser", "contacts.Contact", "auth.Group"]
+        )
+    )
+    async def get(self, request, pk, format=None):
+        user = await self.get_object(pk)
         serializer = CustomUserDetailsSerializer(user)
         return Response(serializer.data)
 
@@ -3,6 +3,7 @@ from django.utils.text import slugify
 from django.utils.translation import gettext_lazy as _
 
 from core.models import TimeStampedModel
+from core.slugs import allocate_unique_slug, save_with_unique_slug
 
 
 class VideoCall(TimeStampedModel):
@@ -44,25 +45,12 @@ class VideoCall(TimeStampedModel):
         return f"{self.teacher.contact.name_en} video call"
 
     def _get_unique_slug(self):
-        slug = slugify(f"{self.teacher.contact.name_en}")
-        unique_slug = slug
-
-        if not VideoCall.objects.filter(slug=unique_slug).exists():
-            return unique_slug
-        else:
-            if VideoCall.objects.filter(slug=unique_slug)[0].id == self.id:
-                return unique_slug
-            # create unique slug
-            else:
-                counter = 1
-                while VideoCall.objects.filter(slug=unique_slug).exists():
-                    unique_slug = f"{slug}-{counter}"
-                    counter += 1
-                return unique_slug
+        return allocate_unique_slug(self, slugify(f"{self.teacher.contact.name_en}"))
 
     def clean(self):
         self.slug = self._get_unique_slug()
 
     def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+        save_with_unique_slug(
+            self, self._get_unique_slug, super().save, *args, **kwargs
+        )
@@ -1,3 +1,63 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
 from django.test import TestCase
 
-# Create your tests here.
+from core.slugs import allocate_unique_slug
+from videocalls.models import VideoCall
+
+User = get_user_model()
+
+
+class VideoCallSlugTests(TestCase):
+    def create_call(self, email, name_en="Taro Yamada"):
+        teacher = User.objects.create_user(
+            email=email, password="password", is_staff=True
+        )
+        teacher.contact.name_en = name_en
+        teacher.contact.save()
+        return VideoCall.objects.create(
+            teacher=teacher,
+            host_room_url="https://example.com/host",
+            room_url="https://example.com/room",
+        )
+
+    def test_slugs_are_suffixed_in_one_query(self):
+        calls = [self.create_call(f"teacher{i}@example.com") for i in range(4)]
+        self.assertEqual(
+            [call.slug for call in calls],
+            ["taro-yamada", "taro-yamada-1", "taro-yamada-2", "taro-yamada-3"],
+        )
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                allocate_unique_slug(VideoCall(), "taro-yamada"), "taro-yamada-4"
+            )
+
+    def test_resave_keeps_own_slug(self):
+        self.create_call("teacher0@example.com")
+        call = self.create_call("teacher1@example.com")
+        call.room_url = "https://example.com/other"
+        call.save()
+        call.refresh_from_db()
+        self.assertEqual(call.slug, "taro-yamada-1")
+
+    def test_concurrently_taken_slug_is_allocated_again(self):
+        first = self.create_call("teacher0@example.com")
+        # As if another process saved first's slug after this one checked
+        with mock.patch(
+            "videocalls.models.allocate_unique_slug",
+            side_effect=["taro-yamada", "taro-yamada-1"],
+        ):
+            second = self.create_call("teacher1@example.com")
+        self.assertEqual(second.slug, "taro-yamada-1")
+        self.assertEqual(first.slug, "taro-yamada")
+
+    def test_other_integrity_errors_are_raised(self):
+        first = self.create_call("teacher0@example.com")
+        with self.assertRaises(IntegrityError):
+            VideoCall.objects.create(
+                teacher=first.teacher,
+                host_room_url="https://example.com/host",
+                room_url="https://example.com/room",
+            )